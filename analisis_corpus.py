@@ -0,0 +1,62 @@
+# analisis_corpus.py
+"""
+Estadísticas de descartes y melds de todos los datasets de la carpeta de datos
+
+Uso:
+    python analisis_corpus.py [carpeta] [--workers N]
+"""
+
+import argparse
+import time
+
+from config import CONFIG, SYMBOLS
+from corpus_stats import aggregate_corpus
+
+
+def print_corpus_statistics(stats):
+    """Imprime el resumen de las estadísticas del corpus"""
+    print(f"\n{SYMBOLS['TABLA']} CORPUS: {stats['total_datasets']} datasets, {stats['total_games']} estados")
+    print(f"Descartes: {stats['total_discards']} ({stats['average_discards_per_game']} por estado)")
+    print(f"Melds: {stats['total_melds']} ({stats['average_melds_per_game']} por estado)")
+    distribution = stats['meld_distribution']
+    print(f"  PON: {distribution['pon']}  CHII: {distribution['chii']}  KAN: {distribution['kan']}")
+
+    print(f"\n{SYMBOLS['DESCARTE']} Fichas más descartadas:")
+    for entry in stats['discard_distribution'][:CONFIG['max_tipos_mostrar']]:
+        print(f"  {entry['tile']:<8} {entry['count']:8d} ({entry['percentage']}%)")
+
+    for category in ('pon', 'chii', 'kan'):
+        print(f"\n{SYMBOLS['PATRON']} {category.upper()} más comunes:")
+        for entry in stats[f'most_common_{category}']:
+            print(f"  {entry['meld']:<24} {entry['count']:8d}")
+
+    print(f"\n{SYMBOLS['RESUMEN']} Por dataset:")
+    for entry in stats['datasets']:
+        print(f"  {entry['dataset']:<40} {entry['games']:6d} estados "
+              f"{entry['discards']:8d} descartes {entry['melds']:6d} melds")
+
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description="Estadísticas agregadas de todos los datasets")
+    parser.add_argument('folder', nargs='?', default=CONFIG['data_folder'], help="Carpeta de datasets .npz")
+    parser.add_argument('--workers', type=int, default=None, help="Número de procesos")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    try:
+        stats = aggregate_corpus(args.folder, args.workers)
+    except KeyboardInterrupt:
+        print(f"\n⚠️ Análisis interrumpido por el usuario")
+        return
+    except Exception as e:
+        print(f"\n❌ Error durante el análisis del corpus: {e}")
+        return
+
+    print_corpus_statistics(stats)
+    print(f"\n{SYMBOLS['TIEMPO']} {len(stats['reprocessed'])} archivos reprocesados "
+          f"en {time.perf_counter() - start:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
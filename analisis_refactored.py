@@ -7,6 +7,8 @@ import numpy as np
 from config import CONFIG, SYMBOLS
 from matrix_analyzer import MatrixAnalyzer
 from matrix_comparator import MatrixComparator
+from vector_parser import MahjongBatchParser
+from diff_engine import SequentialDiff
 
 class MahjongAnalysisManager:
     """Gestor principal para el análisis de matrices de Mahjong"""
@@ -72,7 +74,9 @@ class MahjongAnalysisManager:
             print("❌ No hay resúmenes para comparar")
             return False
         
-        comparator = MatrixComparator(self.summaries)
+        # Los cambios entre matrices consecutivas se calculan una sola vez
+        diff = SequentialDiff.from_batch(MahjongBatchParser(self.matrix[:len(self.summaries)]))
+        comparator = MatrixComparator(self.summaries, diff)
         
         # Comparación básica
         comparator.print_basic_comparison()
@@ -0,0 +1,488 @@
+# benchmarks.py
+"""
+Mediciones de rendimiento del dashboard de Mahjong
+
+Uso:
+    python benchmarks.py [nombre_benchmark ...]
+
+Sin argumentos ejecuta todos los benchmarks registrados en BENCHMARKS.
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from config import CONFIG, INDICES
+from matrix_loader import load_npz_matrix
+
+
+def _dataset_paths():
+    """Lista las rutas de los datasets .npz disponibles"""
+    folder = CONFIG['data_folder']
+    return [os.path.join(folder, f) for f in sorted(os.listdir(folder)) if f.endswith('.npz')]
+
+
+def _measure(func, repeat=5):
+    """
+    Mide tiempo medio y pico de memoria de una función
+
+    Returns:
+        Tupla (resultado, segundos por llamada, pico de memoria en bytes)
+    """
+    result = func()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    elapsed = (time.perf_counter() - start) / repeat
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def _load_dense_legacy(filepath):
+    """Ruta de carga original: densificar el CSR y copiar para quitar la columna 510"""
+    with np.load(filepath) as npz:
+        matrix = csr_matrix((npz['data'], npz['indices'], npz['indptr']), shape=npz['shape']).toarray()
+    if matrix.shape[1] > 510:
+        matrix = np.delete(matrix, 510, axis=1)
+    return matrix
+
+
+def bench_load():
+    """Carga de datasets: densificado original frente a carga dispersa"""
+    print(f"{'Dataset':<40} {'Ruta':<10} {'Tiempo (ms)':>12} {'Pico (KiB)':>12} {'Retenido (KiB)':>15}")
+    for filepath in _dataset_paths():
+        name = os.path.basename(filepath)
+        dense, t_legacy, peak_legacy = _measure(lambda: _load_dense_legacy(filepath))
+        store, t_sparse, peak_sparse = _measure(lambda: load_npz_matrix(filepath))
+        print(f"{name:<40} {'denso':<10} {t_legacy * 1e3:12.2f} {peak_legacy / 1024:12.1f} "
+              f"{dense.nbytes / 1024:15.1f}")
+        print(f"{'':<40} {'disperso':<10} {t_sparse * 1e3:12.2f} {peak_sparse / 1024:12.1f} "
+              f"{store.nbytes / 1024:15.1f}")
+
+
+def bench_render():
+    """Renderizado de heatmaps: seaborn frente a raster"""
+    from maps import render_mahjong_heatmap_png
+
+    matrix = load_npz_matrix(_dataset_paths()[0])
+    boards = [matrix.row(i).reshape(15, 34) for i in range(0, len(matrix), max(1, len(matrix) // 10))]
+    timings = {}
+    for renderer in ('seaborn', 'raster'):
+        render_mahjong_heatmap_png(boards[0], renderer)
+        start = time.perf_counter()
+        for board in boards:
+            render_mahjong_heatmap_png(board, renderer)
+        timings[renderer] = (time.perf_counter() - start) / len(boards)
+        print(f"{renderer:<10} {timings[renderer] * 1e3:10.1f} ms/tablero")
+    print(f"Aceleración raster: {timings['seaborn'] / timings['raster']:.1f}x")
+
+
+def _rss_mib():
+    """Memoria residente del proceso en MiB (Linux)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except OSError:
+        return float('nan')
+
+
+def _rss_anon_mib():
+    """Memoria residente anónima (propia, sin páginas de archivos mapeados) en MiB (Linux)"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('RssAnon:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return float('nan')
+
+
+def bench_mmap(copies=20):
+    """Datasets abiertos a la vez: matriz dispersa en memoria frente a int8 mapeado"""
+    import gc
+
+    from matrix_loader import load_matrix, write_dense_store
+    from statistics_engine import compute_general_statistics
+    from vector_parser import MahjongBatchParser
+
+    paths = _dataset_paths()
+    for filepath in paths:
+        write_dense_store(filepath)
+
+    for mode in ('disperso', 'mapeado'):
+        load = load_npz_matrix if mode == 'disperso' else load_matrix
+        gc.collect()
+        before = _rss_anon_mib()
+        start = time.perf_counter()
+        opened = [load(filepath) for _ in range(copies) for filepath in paths]
+        elapsed = time.perf_counter() - start
+        loaded = _rss_anon_mib()
+        # Recorrer todas las secciones como lo hacen las estadísticas
+        batches = [MahjongBatchParser(matrix) for matrix in opened]
+        for batch in batches:
+            compute_general_statistics(batch, str)
+        used = _rss_anon_mib()
+        print(f"{mode:<9} {len(opened):4d} datasets  carga {elapsed / len(opened) * 1e3:7.2f} ms/dataset  "
+              f"RSS anónima +{loaded - before:7.1f} MiB tras abrir, +{used - before:7.1f} MiB con parsers")
+        del opened, batches
+
+
+def bench_figure_pool(num_renders=500):
+    """Memoria residente durante renders repetidos con el pool de figuras"""
+    from maps import render_mahjong_heatmap_png
+
+    matrix = load_npz_matrix(_dataset_paths()[0])
+    step = max(1, num_renders // 5)
+    start = time.perf_counter()
+    for i in range(num_renders):
+        render_mahjong_heatmap_png(matrix.row(i % len(matrix)).reshape(15, 34), 'seaborn')
+        if (i + 1) % step == 0:
+            print(f"{i + 1:6d} renders: RSS {_rss_mib():8.1f} MiB")
+    print(f"{(time.perf_counter() - start) / num_renders * 1e3:.1f} ms/tablero")
+
+
+def bench_statistics(max_rows=100_000):
+    """Estadísticas generales vectorizadas: escalado con el número de filas"""
+    from statistics_engine import compute_general_statistics
+    from vector_parser import MahjongBatchParser
+
+    matrix = load_npz_matrix(_dataset_paths()[0]).toarray()
+    reps = 1
+    while True:
+        batch = MahjongBatchParser(np.tile(matrix, (reps, 1)))
+        _, elapsed, peak = _measure(lambda: compute_general_statistics(batch, str), repeat=3)
+        print(f"{len(batch):8d} filas {elapsed * 1e3:10.1f} ms "
+              f"{elapsed / len(batch) * 1e6:8.2f} us/fila  pico {peak / 2**20:8.1f} MiB")
+        if len(batch) >= max_rows:
+            break
+        reps *= 10
+
+
+def _parse_eager_legacy(vector):
+    """Parseo original: las siete secciones se calculaban en el constructor (referencia)"""
+    from vector_parser import SECTIONS, MahjongVectorParser
+
+    parser = MahjongVectorParser(vector)
+    for name in SECTIONS:
+        getattr(parser, name)
+    return parser
+
+
+def bench_parser():
+    """Coste por fila de MahjongVectorParser: parseo completo frente a secciones perezosas"""
+    import sys as _sys
+
+    from vector_parser import MahjongBatchParser, MahjongVectorParser
+
+    matrix = load_npz_matrix(_dataset_paths()[0]).toarray()
+    rows = list(matrix)
+    uses = {
+        # /api/matrices y la lista del índice: solo metadata y control
+        'listado': lambda parser: (parser.metadata, parser.control),
+        # /api/matrix/<n>: resumen, metadata y dora
+        'detalle': lambda parser: (parser.get_summary(), parser.metadata, parser.dora),
+    }
+    print(f"{len(rows)} filas")
+    for use, access in uses.items():
+        _, t_eager, _ = _measure(lambda: [access(_parse_eager_legacy(v)) for v in rows], repeat=3)
+        _, t_lazy, _ = _measure(lambda: [access(MahjongVectorParser(v)) for v in rows], repeat=3)
+        print(f"{use:<8} completo {t_eager / len(rows) * 1e6:8.1f} us/fila   perezoso "
+              f"{t_lazy / len(rows) * 1e6:8.1f} us/fila   {t_eager / t_lazy:5.1f}x")
+
+    batch = MahjongBatchParser(matrix)
+    view = batch.row(0)
+    view.metadata
+    print(f"Tamaño de la instancia: MahjongVectorParser {_sys.getsizeof(MahjongVectorParser(rows[0]))} B, "
+          f"vista de fila {_sys.getsizeof(view)} B")
+
+
+def bench_row_records():
+    """Memoria retenida por fila tras consultar análisis, resumen y tablero de todas las filas"""
+    from dashboard_app import MahjongDashboard
+
+    def visit_all(dashboard):
+        for i in range(len(dashboard.analyzers)):
+            dashboard.get_matrix_analysis(i)
+            dashboard.matrices_data[i]
+
+    for filepath in _dataset_paths():
+        dashboard = MahjongDashboard()
+        dashboard.load_data(os.path.basename(filepath))
+        num_rows = len(dashboard.analyzers)
+        dashboard.batch
+        start = time.perf_counter()
+        visit_all(dashboard)
+        elapsed = time.perf_counter() - start
+
+        dashboard.analyze_matrices()
+        dashboard.batch
+        tracemalloc.start()
+        visit_all(dashboard)
+        retained, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{os.path.basename(filepath):<40} {num_rows:5d} filas {retained / num_rows:8.0f} B/fila "
+              f"{elapsed / num_rows * 1e6:8.1f} us/fila")
+
+
+def bench_similarity(scales=(1, 30, 300), k=10):
+    """Búsqueda de estados similares: k-NN exacto por bloques frente a comparar fila a fila"""
+    from similarity_index import FEATURE_WEIGHTS, SimilarityIndex
+
+    index, _ = SimilarityIndex.build()
+    base = index.columns.T
+    query = base[len(base) // 2]
+
+    def row_by_row(features):
+        # Referencia: recorrer los estados uno a uno como se haría cargando cada .npz
+        weights = FEATURE_WEIGHTS.astype(np.float64)
+        distances = [float(((row.astype(np.float64) - query) ** 2) @ weights) for row in features]
+        return np.argsort(distances)[:k]
+
+    for scale in scales:
+        tiled = SimilarityIndex(['corpus'], [np.tile(base, (scale, 1))])
+        _, t_query, _ = _measure(lambda: tiled.query(query, k), repeat=5)
+        line = f"{len(tiled):9d} estados  índice {t_query * 1e3:8.2f} ms  ({tiled.nbytes / 2**20:6.1f} MiB)"
+        if scale == 1:
+            _, t_legacy, _ = _measure(lambda: row_by_row(base), repeat=1)
+            line += f"  fila a fila {t_legacy * 1e3:8.1f} ms"
+        print(line)
+
+
+def bench_filter(scales=(1, 100)):
+    """Filtros de estados: script fila a fila y máscaras completas frente a evaluación con pushdown"""
+    from matrix_loader import load_matrix
+    from state_filter import FilterError, FilterSource, StateFilter
+    from summary_index import build_summary_index
+    from vector_parser import MahjongBatchParser, MahjongVectorParser
+
+    expression = 'wall_tiles < 20 and any(riichi) and honors >= 3'
+    state_filter = StateFilter(expression)
+    matrices = [load_matrix(filepath) for filepath in _dataset_paths()]
+    matrix = np.concatenate([m.toarray() if hasattr(m, 'toarray') else np.asarray(m) for m in matrices])
+    summary = build_summary_index(MahjongBatchParser(matrix))
+
+    def row_by_row(rows):
+        # Referencia: el script ad hoc sobre MahjongVectorParser
+        matches = []
+        for i, vector in enumerate(rows):
+            parser = MahjongVectorParser(vector)
+            meta = parser.metadata
+            if (meta['wall_tiles'] < 20 and any(meta['riichi_status'])
+                    and sum(count for tile, count in parser.hand['tiles'] if tile >= 27) >= 3):
+                matches.append(i)
+        return np.array(matches)
+
+    def full_masks(rows):
+        # Todas las condiciones sobre todas las filas de la matriz, sin pushdown
+        riichi = rows[:, INDICES['RIICHI_STATUS_START']:INDICES['RIICHI_STATUS_END'] + 1]
+        honors = rows[:, INDICES['HAND_START'] + 27:INDICES['HAND_END'] + 1]
+        mask = (rows[:, INDICES['WALL_TILES']] < 20) & riichi.any(axis=1) & (honors.sum(axis=1) >= 3)
+        return np.flatnonzero(mask)
+
+    print(f"Expresión: {expression}")
+    for scale in scales:
+        tiled = np.tile(matrix, (scale, 1))
+        tiled_summary = np.tile(summary, scale)
+        source = FilterSource(tiled_summary, tiled)
+        result, t_filter, _ = _measure(lambda: state_filter.rows(source), repeat=5)
+        expected, t_masks, _ = _measure(lambda: full_masks(tiled), repeat=3)
+        assert np.array_equal(result, expected)
+        line = (f"{len(tiled):8d} estados  {len(result):6d} coincidencias  pushdown {t_filter * 1e3:8.2f} ms  "
+                f"máscaras completas {t_masks * 1e3:8.2f} ms")
+        if scale == 1:
+            _, t_legacy, _ = _measure(lambda: row_by_row(tiled), repeat=1)
+            line += f"  fila a fila {t_legacy * 1e3:8.1f} ms"
+        print(line)
+        del tiled, tiled_summary, source
+
+    # Las divisiones entre cero (constante o por fila) se rechazan en lugar
+    # de coincidir con todas las filas
+    source = FilterSource(summary, matrix)
+    for zero_division in ('wall_tiles // 0 == 0', 'wall_tiles % (wall_tiles - wall_tiles) == 0'):
+        try:
+            StateFilter(zero_division).rows(source)
+        except FilterError:
+            continue
+        raise AssertionError(f"'{zero_division}' no se rechazó")
+
+
+def bench_shanten(scales=(1, 100)):
+    """Shanten con tablas por palo: generación/carga de tablas, lote vectorizado frente a fila a fila"""
+    import shanten as shanten_module
+    from matrix_loader import load_matrix
+    from vector_parser import MahjongBatchParser
+
+    start = time.perf_counter()
+    shanten_module.build_table(shanten_module.SUIT_SIZE, True)
+    shanten_module.build_table(shanten_module.HONOR_SIZE, False)
+    print(f"Generar tablas {time.perf_counter() - start:8.2f} s")
+    shanten_module._tables = None
+    start = time.perf_counter()
+    shanten_module.load_tables()
+    print(f"Cargar tablas  {(time.perf_counter() - start) * 1e3:8.1f} ms")
+
+    hands = np.concatenate([MahjongBatchParser(load_matrix(filepath)).hand for filepath in _dataset_paths()])
+    for scale in scales:
+        tiled = np.tile(hands, (scale, 1))
+        _, t_batch, _ = _measure(lambda: shanten_module.shanten(tiled), repeat=3)
+        line = f"{len(tiled):8d} manos  lote {t_batch * 1e3:8.2f} ms ({t_batch / len(tiled) * 1e6:6.2f} µs/mano)"
+        if scale == 1:
+            _, t_rows, _ = _measure(lambda: [shanten_module.shanten(hand) for hand in tiled], repeat=1)
+            line += f"  fila a fila {t_rows * 1e3:8.1f} ms"
+        print(line)
+
+
+def bench_ukeire(scales=(1, 20)):
+    """Ukeire por lotes de todas las filas frente a evaluar cada fila por separado"""
+    from matrix_loader import load_matrix
+    from ukeire import compute_ukeire, ukeire_detail, visible_tiles
+    from vector_parser import MahjongBatchParser
+
+    hands = []
+    visible = []
+    for filepath in _dataset_paths():
+        batch = MahjongBatchParser(load_matrix(filepath))
+        hands.append(batch.hand)
+        visible.append(visible_tiles(batch.discards, batch.melds, batch.dora))
+    hands = np.concatenate(hands)
+    visible = np.concatenate(visible)
+
+    for scale in scales:
+        tiled_hands = np.tile(hands, (scale, 1))
+        tiled_visible = np.tile(visible, (scale, 1))
+        _, t_batch, peak = _measure(lambda: compute_ukeire(tiled_hands, tiled_visible), repeat=3)
+        line = (f"{len(tiled_hands):8d} estados  lote {t_batch * 1e3:8.1f} ms "
+                f"({t_batch / len(tiled_hands) * 1e6:6.1f} µs/estado, pico {peak / 2**20:6.1f} MiB)")
+        if scale == 1:
+            _, t_rows, _ = _measure(
+                lambda: [ukeire_detail(hand, seen) for hand, seen in zip(hands, visible)], repeat=1
+            )
+            line += f"  fila a fila {t_rows * 1e3:8.1f} ms"
+        print(line)
+
+
+def bench_live(base_rows=(3000, 30000), new_rows=10):
+    """Dataset en vivo: refresh() con las filas añadidas frente a recargar el archivo completo"""
+    import shutil
+    import tempfile
+
+    from scipy.sparse import save_npz, vstack
+
+    import dashboard_app
+    from dashboard_app import MahjongDashboard
+
+    corpus = vstack([load_npz_matrix(filepath).tocsr() for filepath in _dataset_paths()]).tocsr()
+    folder = tempfile.mkdtemp()
+    filepath = os.path.join(folder, 'live.npz')
+    data_folder = dashboard_app.app.config['DATA_FOLDER']
+    dashboard_app.app.config['DATA_FOLDER'] = folder
+    try:
+        for num_rows in base_rows:
+            rows = corpus[np.arange(num_rows + 2 * new_rows) % corpus.shape[0]]
+            save_npz(filepath, rows[:num_rows])
+            dashboard = MahjongDashboard()
+            dashboard.load_data('live.npz')
+
+            # La primera actualización compara con la matriz cargada y pasa
+            # la matriz a memoria; las siguientes solo comparan el CSR
+            times = []
+            for end in (num_rows + new_rows, num_rows + 2 * new_rows):
+                save_npz(filepath, rows[:end])
+                start = time.perf_counter()
+                dashboard.refresh()
+                times.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            MahjongDashboard().load_data('live.npz')
+            t_reload = time.perf_counter() - start
+            print(f"{num_rows:7d} filas + {new_rows}  refresh {times[0] * 1e3:8.1f} ms (primera), "
+                  f"{times[1] * 1e3:8.1f} ms (siguientes)  recarga completa {t_reload * 1e3:8.1f} ms")
+    finally:
+        dashboard_app.app.config['DATA_FOLDER'] = data_folder
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+def _convert_np_legacy(obj):
+    """Conversión recursiva original de las respuestas JSON (referencia)"""
+    if isinstance(obj, dict):
+        return {str(k): _convert_np_legacy(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_convert_np_legacy(v) for v in obj]
+    if isinstance(obj, np.integer):
+        return int(obj)
+    if isinstance(obj, np.floating):
+        return float(obj)
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    return obj
+
+
+def bench_json(repetitions=50):
+    """Serialización de /api/comparison: _convert_np + json frente a NumpyJSONProvider"""
+    from flask.json.provider import DefaultJSONProvider
+
+    from dashboard_app import MahjongDashboard, app
+    from json_provider import NumpyJSONProvider, orjson
+    from summary_index import build_summary_index
+
+    # Dataset sintético largo: el primero repetido
+    dashboard = MahjongDashboard()
+    dashboard.load_data(os.path.basename(_dataset_paths()[0]))
+    matrix = dashboard.matrix.toarray() if hasattr(dashboard.matrix, 'toarray') else dashboard.matrix
+    dashboard.set_rows(np.tile(matrix, (repetitions, 1)))
+    dashboard.set_rows(dashboard.matrix, build_summary_index(dashboard.batch))
+    comparison = dashboard.get_comparison_analysis()
+    print(f"{len(dashboard.matrix)} filas, {len(comparison['meld_changes'])} cambios de melds, "
+          f"orjson {'disponible' if orjson is not None else 'no instalado'}")
+
+    legacy = DefaultJSONProvider(app)
+    provider = NumpyJSONProvider(app)
+    with app.app_context():
+        for debug in (False, True):
+            app.debug = debug
+            _, t_legacy, _ = _measure(lambda: legacy.response(_convert_np_legacy(comparison)), repeat=3)
+            response, t_new, _ = _measure(lambda: provider.response(comparison), repeat=3)
+            mode = 'debug' if debug else 'normal'
+            print(f"{mode:<7} _convert_np + json {t_legacy * 1e3:8.1f} ms   proveedor {t_new * 1e3:8.1f} ms   "
+                  f"{t_legacy / t_new:5.1f}x   {len(response.get_data()) / 2**20:.1f} MiB")
+        app.debug = False
+
+
+BENCHMARKS = {
+    'load': bench_load,
+    'render': bench_render,
+    'figure_pool': bench_figure_pool,
+    'statistics': bench_statistics,
+    'mmap': bench_mmap,
+    'parser': bench_parser,
+    'row_records': bench_row_records,
+    'similarity': bench_similarity,
+    'filter': bench_filter,
+    'shanten': bench_shanten,
+    'ukeire': bench_ukeire,
+    'live': bench_live,
+    'json': bench_json,
+}
+
+
+def main():
+    """Función principal"""
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"Benchmark desconocido: {name} (disponibles: {', '.join(BENCHMARKS)})")
+            continue
+        print(f"\n=== {name}: {BENCHMARKS[name].__doc__} ===")
+        BENCHMARKS[name]()
+
+
+if __name__ == "__main__":
+    main()
@@ -21,7 +21,50 @@ CONFIG = {
     'mostrar_debug': True,
     'max_tipos_mostrar': 10,
     'data_folder': DATA_FOLDER,
-    'allowed_extensions': {'npz'}
+    'allowed_extensions': {'npz'},
+    # Renderizador de heatmaps del dashboard: 'raster' (rápido) o 'seaborn'
+    'heatmap_renderer': 'raster',
+    # Caché de heatmaps: límite en memoria y capa opcional en disco (None la desactiva)
+    'heatmap_cache_max_bytes': 64 * 1024 * 1024,
+    'heatmap_cache_dir': None,
+    'heatmap_cache_max_disk_bytes': 512 * 1024 * 1024,
+    # Memoria estimada máxima de los datasets cargados a la vez (expulsión LRU)
+    'dataset_memory_budget': 512 * 1024 * 1024,
+    # Segundos que el navegador puede reutilizar un heatmap sin revalidarlo
+    'heatmap_max_age': 3600,
+    # Procesos para las estadísticas del corpus completo (None = número de CPUs)
+    'corpus_max_workers': None,
+    # Paginación de /api/matrices: tamaño de página por defecto y máximo
+    'matrices_page_size': 100,
+    'matrices_page_max': 1000,
+    # Eventos devueltos como máximo por /api/events
+    'events_max_limit': 10000,
+    # Crear al cargar un dataset su copia densa int8 mapeable (<dataset>.dense.npy)
+    'dense_store_convert_on_load': True,
+    # Precarga en segundo plano al arrancar el servidor: datasets indicados
+    # (nombres de archivo) más los N modificados más recientemente
+    'warmup_enabled': False,
+    'warmup_datasets': [],
+    'warmup_recent': 3,
+    'warmup_workers': 2,
+    # Heatmaps de las matrices vecinas (i±1 ... i±radio) que se renderizan en
+    # segundo plano al abrir un detalle (0 lo desactiva), máximo de pendientes
+    # y longitud máxima del identificador de pestaña (?view=) que los agrupa
+    'heatmap_prerender_radius': 2,
+    'heatmap_prerender_max_pending': 16,
+    'heatmap_prerender_view_max_length': 64,
+    # Búsqueda de estados similares: resultados por defecto y máximo por consulta
+    'similar_default_k': 10,
+    'similar_max_k': 100,
+    # Tablas de shanten por palo (se generan la primera vez que se necesitan)
+    'shanten_table_file': os.path.join(BASE_DIR, 'shanten_tables.npz'),
+    # Resultados por defecto y máximos de /api/filter
+    'filter_default_limit': 200,
+    'filter_max_limit': 5000,
+    # Modo en vivo (/api/live): segundos entre comprobaciones del archivo y
+    # duración máxima de cada conexión (el navegador reconecta solo)
+    'live_poll_interval': 1.0,
+    'live_stream_seconds': 300
 }
 
 # Constantes del vector de Mahjong
@@ -75,6 +118,21 @@ LABELS = {
         5: "Melds por jugador",
         6: "Descartes por jugador",
         7: "Pond completo"
+    },
+    # Nombres descriptivos de cada tipo de ficha
+    'FICHAS': {
+        # Man (Caracteres)
+        0: "1-man", 1: "2-man", 2: "3-man", 3: "4-man", 4: "5-man",
+        5: "6-man", 6: "7-man", 7: "8-man", 8: "9-man",
+        # Pin (Círculos)
+        9: "1-pin", 10: "2-pin", 11: "3-pin", 12: "4-pin", 13: "5-pin",
+        14: "6-pin", 15: "7-pin", 16: "8-pin", 17: "9-pin",
+        # Sou (Bambús)
+        18: "1-sou", 19: "2-sou", 20: "3-sou", 21: "4-sou", 22: "5-sou",
+        23: "6-sou", 24: "7-sou", 25: "8-sou", 26: "9-sou",
+        # Vientos y Dragones
+        27: "Este", 28: "Sur", 29: "Oeste", 30: "Norte",
+        31: "Blanco", 32: "Verde", 33: "Rojo"
     }
 }
 
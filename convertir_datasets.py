@@ -0,0 +1,83 @@
+# convertir_datasets.py
+"""
+Convierte los datasets .npz a su copia densa int8 mapeable en memoria
+
+Cada dataset se guarda como <dataset>.dense.npy, una matriz contigua (N, 510)
+de int8 que el dashboard abre con np.load(mmap_mode='r') en lugar de leer y
+densificar el .npz. Los datasets con una copia al día no se reconvierten.
+
+Uso:
+    python convertir_datasets.py [carpeta | archivo.npz ...] [--force]
+"""
+
+import argparse
+import os
+import time
+
+from config import CONFIG, SYMBOLS
+from matrix_loader import DENSE_STORE_KIND, load_dense_store, write_dense_store
+from sidecar import sidecar_path
+
+
+def _dataset_files(targets):
+    """Expande carpetas y archivos a la lista de datasets .npz"""
+    files = []
+    for target in targets:
+        if os.path.isdir(target):
+            files.extend(os.path.join(target, f) for f in sorted(os.listdir(target)) if f.endswith('.npz'))
+        elif target.endswith('.npz') and os.path.isfile(target):
+            files.append(target)
+        else:
+            print(f"{SYMBOLS['ALERTA']} Se ignora {target}: no es una carpeta ni un archivo .npz")
+    return files
+
+
+def convert_dataset(filepath, force=False):
+    """
+    Convierte un dataset si su copia densa no existe o no está al día
+
+    Args:
+        filepath: Ruta al archivo .npz
+        force: Reconvertir aunque la copia esté al día
+
+    Returns:
+        'al día', 'convertido' o 'error'
+    """
+    if not force and load_dense_store(filepath) is not None:
+        return 'al día'
+    return 'convertido' if write_dense_store(filepath) else 'error'
+
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description="Convierte datasets .npz a matrices int8 mapeables")
+    parser.add_argument('targets', nargs='*', default=[CONFIG['data_folder']],
+                        help="Carpetas o archivos .npz (por defecto la carpeta de datasets)")
+    parser.add_argument('--force', action='store_true', help="Reconvertir aunque la copia esté al día")
+    args = parser.parse_args()
+
+    files = _dataset_files(args.targets)
+    if not files:
+        print(f"{SYMBOLS['ALERTA']} No hay datasets .npz que convertir")
+        return
+
+    start = time.perf_counter()
+    print(f"{'Dataset':<40} {'Estado':<11} {'Filas':>8} {'.npz (KiB)':>11} {'.dense.npy (KiB)':>17}")
+    for filepath in files:
+        try:
+            status = convert_dataset(filepath, args.force)
+        except Exception as e:
+            print(f"❌ {os.path.basename(filepath)}: {e}")
+            continue
+        dense = load_dense_store(filepath)
+        rows = len(dense) if dense is not None else 0
+        dense_size = os.path.getsize(sidecar_path(filepath, DENSE_STORE_KIND)) if dense is not None else 0
+        print(f"{os.path.basename(filepath):<40} {status:<11} {rows:8d} "
+              f"{os.path.getsize(filepath) / 1024:11.1f} {dense_size / 1024:17.1f}")
+        del dense
+
+    print(f"\n{SYMBOLS['TIEMPO']} {len(files)} datasets en {time.perf_counter() - start:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
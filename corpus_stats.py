@@ -0,0 +1,131 @@
+# corpus_stats.py
+"""
+Estadísticas agregadas de todos los datasets de la carpeta de datos
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from config import CONFIG, LABELS
+from matrix_loader import load_matrix
+from sidecar import load_array, save_array
+from statistics_engine import MAX_MELD_AMOUNT, NUM_TILES, section_histograms, statistics_from_histograms
+from vector_parser import MahjongBatchParser
+
+CORPUS_PARTIAL_KIND = 'corpus'
+CORPUS_PARTIAL_VERSION = 1
+
+# Conteos parciales de un dataset; se suman campo a campo entre datasets
+PARTIAL_DTYPE = np.dtype([
+    ('games', np.int64),
+    ('discards', np.int64, (NUM_TILES,)),
+    ('melds', np.int64, (MAX_MELD_AMOUNT + 1, NUM_TILES)),
+])
+
+
+def compute_partial_counts(filepath):
+    """
+    Calcula y guarda los conteos parciales de un dataset
+
+    Se ejecuta en los procesos del pool, así que solo recibe y retorna datos
+    serializables.
+
+    Args:
+        filepath: Ruta al archivo .npz
+
+    Returns:
+        Array estructurado de un elemento con dtype PARTIAL_DTYPE
+    """
+    store = load_matrix(filepath)
+    partial = np.zeros(1, dtype=PARTIAL_DTYPE)
+    partial['games'] = len(store)
+    partial['discards'], partial['melds'] = section_histograms(MahjongBatchParser(store))
+    save_array(filepath, CORPUS_PARTIAL_KIND, CORPUS_PARTIAL_VERSION, partial)
+    return partial
+
+
+def _cached_partial(filepath):
+    """Conteos parciales guardados de un dataset, o None si hay que recalcularlos"""
+    partial = load_array(filepath, CORPUS_PARTIAL_KIND, CORPUS_PARTIAL_VERSION, mmap_mode=None)
+    if partial is None or partial.dtype != PARTIAL_DTYPE or partial.shape != (1,):
+        return None
+    return partial
+
+
+def collect_partials(folder=None, max_workers=None):
+    """
+    Obtiene los conteos parciales de cada dataset de la carpeta
+
+    Solo los archivos nuevos o modificados se procesan, repartidos entre un
+    pool de procesos; el resto se lee de su sidecar.
+
+    Args:
+        folder: Carpeta de datasets (por defecto CONFIG['data_folder'])
+        max_workers: Número de procesos (por defecto CONFIG['corpus_max_workers'])
+
+    Returns:
+        Tupla (diccionario nombre -> conteos parciales, nombres reprocesados)
+    """
+    folder = folder or CONFIG['data_folder']
+    max_workers = max_workers or CONFIG['corpus_max_workers']
+    filenames = sorted(f for f in os.listdir(folder) if f.endswith('.npz'))
+
+    partials = {}
+    stale = []
+    for filename in filenames:
+        partial = _cached_partial(os.path.join(folder, filename))
+        if partial is None:
+            stale.append(filename)
+        else:
+            partials[filename] = partial
+
+    if len(stale) == 1:
+        # Un solo archivo no compensa arrancar procesos
+        partials[stale[0]] = compute_partial_counts(os.path.join(folder, stale[0]))
+    elif stale:
+        paths = [os.path.join(folder, filename) for filename in stale]
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            for filename, partial in zip(stale, pool.map(compute_partial_counts, paths)):
+                partials[filename] = partial
+
+    return {filename: partials[filename] for filename in filenames}, stale
+
+
+def aggregate_corpus(folder=None, max_workers=None):
+    """
+    Calcula las estadísticas de descartes y melds de todo el corpus
+
+    Args:
+        folder: Carpeta de datasets (por defecto CONFIG['data_folder'])
+        max_workers: Número de procesos para los archivos a reprocesar
+
+    Returns:
+        Diccionario con las estadísticas agregadas, el desglose por dataset y
+        los archivos que se reprocesaron
+    """
+    partials, reprocessed = collect_partials(folder, max_workers)
+
+    total = np.zeros(1, dtype=PARTIAL_DTYPE)
+    for partial in partials.values():
+        for field in PARTIAL_DTYPE.names:
+            total[field] += partial[field]
+
+    tile_names = LABELS['FICHAS']
+    result = statistics_from_histograms(
+        total['games'][0], total['discards'][0], total['melds'][0],
+        lambda tile: tile_names.get(tile, f"T{tile}")
+    )
+    result['total_datasets'] = len(partials)
+    result['datasets'] = [
+        {
+            'dataset': filename,
+            'games': int(partial['games'][0]),
+            'discards': int(partial['discards'].sum()),
+            'melds': int(partial['melds'].sum())
+        }
+        for filename, partial in partials.items()
+    ]
+    result['reprocessed'] = reprocessed
+    return result
@@ -2,9 +2,12 @@
 Dashboard Web para Análisis de Matrices de Mahjong
 """
 
-from flask import Flask, render_template, request, jsonify, send_file, redirect, url_for
+from flask import Flask, Response, render_template, request, jsonify, send_file, redirect, url_for
+import atexit
 import os
 import json
+import threading
+import time
 import base64
 from io import BytesIO
 import matplotlib.pyplot as plt
@@ -12,76 +15,148 @@ import matplotlib
 matplotlib.use('Agg')  # Backend no interactivo para web
 import seaborn as sns
 import numpy as np
-from scipy.sparse import csr_matrix
 
 # Importar nuestros módulos de análisis
-from config import CONFIG, SYMBOLS
+from config import CONFIG, LABELS, SYMBOLS
 from matrix_analyzer import MatrixAnalyzer
 from matrix_comparator import MatrixComparator
-from maps import generate_mahjong_heatmap
+from vector_parser import MahjongBatchParser, LazyRowSequence, MappedSequence
+from matrix_loader import load_matrix
+from heatmap_cache import HeatmapCache
+from heatmap_prerender import HeatmapPrerenderQueue
+from sidecar import file_digest
+from live_tail import DatasetTail, GrowableRows, file_signature
+from summary_index import build_summary_index, load_summary_index
+from dataset_registry import DatasetRegistry, DatasetWarmup
+from statistics_engine import compute_general_statistics
+from diff_engine import SequentialDiff
+from event_timeline import EVENT_TYPES, EventTimeline
+from json_provider import NumpyJSONProvider
+from corpus_stats import aggregate_corpus
+from similarity_index import HAND_FEATURES, SimilarityIndex, folder_signature
+from state_filter import FilterError, FilterSource, StateFilter, filter_folder
+from maps import render_mahjong_heatmap_png
+from shanten import load_tables, shanten_detail
+from ukeire import build_ukeire_index, load_ukeire_index, ukeire_detail, visible_tiles
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'mahjong-dashboard-secret-key'
 app.config['DATA_FOLDER'] = CONFIG['data_folder']
+# Las respuestas JSON serializan tipos de NumPy directamente
+app.json = NumpyJSONProvider(app)
 
-class MahjongDashboard:
-    """Clase principal del dashboard"""
-    def __init__(self):
-        self.matrix_file = None
-        self.matrix = None
+# Caché de heatmaps compartida por todas las peticiones
+heatmap_cache = HeatmapCache(
+    max_bytes=CONFIG['heatmap_cache_max_bytes'],
+    disk_dir=CONFIG['heatmap_cache_dir'],
+    max_disk_bytes=CONFIG['heatmap_cache_max_disk_bytes']
+)
+# Renderizado especulativo de los heatmaps vecinos al abrir un detalle
+heatmap_prerender = HeatmapPrerenderQueue(heatmap_cache, CONFIG['heatmap_prerender_max_pending'])
+atexit.register(heatmap_prerender.shutdown)
+# Paletas de heatmap soportadas (valores aceptados de ?color=)
+HEATMAP_COLORS = ('black',)
+
+class _DatasetRows:
+    """Filas de un dataset con sus índices por fila y las vistas derivadas
+
+    MahjongDashboard la sustituye entera al cargar o añadir filas, así que
+    quien la lee ve la matriz y los índices de la misma versión. El parser
+    columnar, los cambios y los eventos se construyen sobre esta matriz en
+    el primer acceso.
+    """
+
+    def __init__(self, matrix=None, summary_index=None, ukeire_index=None):
+        """
+        Inicializa las filas
+
+        Args:
+            matrix: Matriz (N, columnas) densa o SparseMatrixStore, o None
+            summary_index: Índice de resúmenes (N,) o None
+            ukeire_index: Registros de ukeire (N,) o None
+        """
+        self.matrix = matrix
+        self.summary_index = summary_index
+        self.ukeire_index = ukeire_index
+        self._batch = None
+        self._diff = None
+        self._timeline = None
         self.analyzers = []
         self.summaries = []
         self.matrices_data = []
+
+        if matrix is None:
+            return
+
+        # Un único registro por fila (analizador sobre una vista del parser
+        # columnar, que solo se construye si se usa); resúmenes y tableros
+        # 15x34 se derivan de él al accederlos, sin guardar copias
+        self.analyzers = LazyRowSequence(
+            matrix.shape[0], lambda i: MatrixAnalyzer(None, i, parser=self.batch.row(i))
+        )
+        self.summaries = MappedSequence(self.analyzers, MatrixAnalyzer.get_summary)
+        self.matrices_data = MappedSequence(self.analyzers, lambda analyzer: analyzer.board)
+
+    @property
+    def batch(self):
+        """Parser columnar de la matriz (se construye en el primer acceso)"""
+        if self._batch is None and self.matrix is not None:
+            self._batch = MahjongBatchParser(self.matrix)
+        return self._batch
+
+    @property
+    def diff(self):
+        """Cambios entre matrices consecutivas (se calculan en el primer acceso)"""
+        if self._diff is None and self.batch is not None:
+            self._diff = SequentialDiff.from_batch(self.batch)
+        return self._diff
+
+    @property
+    def timeline(self):
+        """Eventos de la partida con índices por tipo, jugador y ficha (primer acceso)"""
+        if self._timeline is None and self.batch is not None:
+            self._timeline = EventTimeline.from_batch(self.batch)
+        return self._timeline
+
+    def memory_usage(self):
+        """Memoria estimada (bytes) de la matriz dispersa, el parser y los índices"""
+        total = 0
+        if self.matrix is not None and not isinstance(self.matrix, np.ndarray):
+            total += self.matrix.nbytes
+        if self._batch is not None:
+            total += self._batch.nbytes
+        if self._diff is not None:
+            total += self._diff.events.nbytes
+        if self._timeline is not None:
+            total += self._timeline.nbytes
+        if self.summary_index is not None:
+            total += self.summary_index.nbytes
+        if self.ukeire_index is not None:
+            total += self.ukeire_index.nbytes
+        return total
+
+
+class MahjongDashboard:
+    """Análisis de un dataset cargado (una instancia por archivo .npz)"""
+    def __init__(self):
+        self.matrix_file = None
+        self.dataset_digest = None
+        self._rows = _DatasetRows()
+        # Seguimiento del archivo en vivo (refresh) y buffers que crecen con él
+        self.file_signature = None
+        self.generation = 0
+        self.reloaded = None
+        self._tail = None
+        self._live = None
+        self._refresh_lock = threading.Lock()
         
         # Mapeo de números de fichas a nombres descriptivos
-        self.tile_names = {
-            # Man (Caracteres)
-            0: "1-man", 1: "2-man", 2: "3-man", 3: "4-man", 4: "5-man", 
-            5: "6-man", 6: "7-man", 7: "8-man", 8: "9-man",
-            # Pin (Círculos) 
-            9: "1-pin", 10: "2-pin", 11: "3-pin", 12: "4-pin", 13: "5-pin",
-            14: "6-pin", 15: "7-pin", 16: "8-pin", 17: "9-pin",
-            # Sou (Bambús)
-            18: "1-sou", 19: "2-sou", 20: "3-sou", 21: "4-sou", 22: "5-sou",
-            23: "6-sou", 24: "7-sou", 25: "8-sou", 26: "9-sou",
-            # Vientos y Dragones
-            27: "Este", 28: "Sur", 29: "Oeste", 30: "Norte",
-            31: "Blanco", 32: "Verde", 33: "Rojo"
-        }
+        self.tile_names = LABELS['FICHAS']
     
     def _get_tile_name(self, tile_number):
         """Obtiene el nombre descriptivo de una ficha"""
         return self.tile_names.get(tile_number, f"T{tile_number}")
     
-    def _is_sequence_possible(self, tile_list):
-        """Verifica si un conjunto de fichas puede formar una secuencia (CHII)"""
-        # Solo se pueden formar secuencias con fichas numeradas (man, pin, sou)
-        # Vientos y dragones no pueden formar secuencias
-        numeric_tiles = []
-        for tile_type, count in tile_list:
-            if tile_type < 27:  # Solo fichas numeradas (0-26)
-                numeric_tiles.extend([tile_type] * count)
-        
-        if len(numeric_tiles) < 3:
-            return False
-            
-        # Verificar si hay secuencias consecutivas del mismo palo
-        numeric_tiles.sort()
-        sequences = []
-        
-        i = 0
-        while i < len(numeric_tiles) - 2:
-            # Verificar secuencia de 3 fichas consecutivas del mismo palo
-            if (numeric_tiles[i+1] == numeric_tiles[i] + 1 and 
-                numeric_tiles[i+2] == numeric_tiles[i] + 2 and
-                numeric_tiles[i] // 9 == numeric_tiles[i+1] // 9 == numeric_tiles[i+2] // 9):
-                sequences.append((numeric_tiles[i], numeric_tiles[i+1], numeric_tiles[i+2]))
-                i += 3
-            else:
-                i += 1
-                
-        return len(sequences) > 0
-
     def load_data(self, filename):
         """Carga y procesa los datos de un archivo de matriz .npz"""
         filepath = os.path.join(app.config['DATA_FOLDER'], filename)
@@ -91,71 +166,198 @@ class MahjongDashboard:
         
         try:
             self.matrix_file = filename
+            # Firma tomada antes de leer: si el archivo cambia durante la carga,
+            # refresh() lo detecta en la siguiente consulta
+            self.file_signature = file_signature(filepath)
+            self.dataset_digest = file_digest(filepath)
+            self._tail = None
+            self._live = None
             
-            # Cargar el archivo .npz que contiene la matriz dispersa
-            with np.load(filepath) as npz:
-                # Reconstruir la matriz densa desde el formato disperso CSR
-                matrix = csr_matrix((npz['data'], npz['indices'], npz['indptr']), shape=npz['shape']).toarray()
-
-            # Quitar el elemento 510 de cada matriz (fila) si existe
-            if matrix.shape[1] > 510:
-                matrix = np.delete(matrix, 510, axis=1)
-            
-            self.matrix = matrix
-            self.analyze_matrices()
+            # Mapear la copia densa int8 del dataset (sin la columna 510); si no
+            # existe se crea o, si no se puede, se usa la matriz dispersa
+            rows = _DatasetRows(load_matrix(filepath, convert=CONFIG['dense_store_convert_on_load']))
+
+            # Índice de resúmenes persistido junto al .npz: si está al día se
+            # abre mapeado en memoria sin parsear las filas
+            rows.summary_index = load_summary_index(
+                filepath, lambda: build_summary_index(rows.batch)
+            )
+            # Mejor descarte y ukeire de cada fila, guardados igual que los resúmenes
+            rows.ukeire_index = load_ukeire_index(
+                filepath, lambda: build_ukeire_index(rows.batch)
+            )
+            self._rows = rows
             return True
         except Exception as e:
             print(f"Error cargando y procesando datos de {filename}: {e}")
             self.matrix_file = None
-            self.matrix = None
+            self.dataset_digest = None
+            self._rows = _DatasetRows()
             return False
     
-    def analyze_matrices(self):
-        """Analiza todas las matrices del archivo cargado"""
-        self.analyzers = []
-        self.summaries = []
-        self.matrices_data = []
+    def refresh(self):
+        """
+        Incorpora las filas añadidas al archivo desde la carga (partidas en vivo)
 
-        if self.matrix is None:
-            return
+        Solo se parsean las filas nuevas: la matriz, el índice de resúmenes y
+        el ukeire crecen por el final, y el parser columnar, los cambios y
+        los eventos se reconstruyen al volver a usarse. Si el archivo se
+        reescribió con otras filas se carga completo en otra instancia, con
+        generation + 1, que queda en reloaded y sustituye a esta en el
+        registro; esta instancia no cambia, así que si la carga falla quien
+        la usa sigue con los datos anteriores.
 
-        for i in range(self.matrix.shape[0]):
-            vector = self.matrix[i]
-            analyzer = MatrixAnalyzer(vector, i)
-            self.analyzers.append(analyzer)
-            self.summaries.append(analyzer.get_summary())
-        
-        for i in range(self.matrix.shape[0]):
-            single_row = self.matrix[i]
-            single_matrix = single_row.reshape(15, 34)
-            self.matrices_data.append(single_matrix)
+        Returns:
+            'unchanged', 'appended', 'reset' o 'failed' (no se pudo recargar;
+            se reintenta en la siguiente consulta)
+        """
+        with self._refresh_lock:
+            if self.matrix is None or self.reloaded is not None:
+                return 'unchanged'
+            if self._tail is None:
+                filepath = os.path.join(app.config['DATA_FOLDER'], self.matrix_file)
+                self._tail = DatasetTail(filepath, self.matrix, self.file_signature)
 
-    def generate_heatmap_image(self, matrix_index, color="black"):
-        """Genera imagen del heatmap para una matriz específica"""
+            state, rows = self._tail.poll()
+            if state == 'appended':
+                # Si falla, el seguimiento no avanza y se reintenta en la siguiente consulta
+                self._append_rows(rows)
+                self._tail.commit()
+                datasets.update_size(self.matrix_file, self)
+            elif state == 'reset':
+                reloaded = MahjongDashboard()
+                if not reloaded.load_data(self.matrix_file):
+                    # El seguimiento no avanzó: la siguiente consulta lo reintenta
+                    return 'failed'
+                reloaded.generation = self.generation + 1
+                datasets.replace(self.matrix_file, self, reloaded)
+                self.reloaded = reloaded
+            return state
+
+    def _append_rows(self, rows):
+        """Añade filas nuevas a la matriz y a los índices por fila"""
+        if self._live is None:
+            # Primera ampliación: matriz e índices pasan a buffers en memoria
+            matrix = self.matrix.toarray() if hasattr(self.matrix, 'toarray') else self.matrix
+            self._live = {
+                'matrix': GrowableRows(matrix),
+                'summary': GrowableRows(self.summary_index),
+                'ukeire': GrowableRows(self.ukeire_index)
+            }
+        batch = MahjongBatchParser(rows)
+        summaries = build_summary_index(batch)
+        ukeire = build_ukeire_index(batch)
+        rows = rows.astype(self._live['matrix'].rows.dtype, copy=False)
+        # Con todo calculado los buffers crecen juntos: un error antes de
+        # este punto no deja filas a medias. Las filas ya cargadas no
+        # cambian, así que el digest (y con él las claves de los heatmaps
+        # en caché) se mantiene
+        summary_index = self._live['summary'].append(summaries)
+        ukeire_index = self._live['ukeire'].append(ukeire)
+        matrix = self._live['matrix'].append(rows)
+        self.set_rows(matrix, summary_index, ukeire_index)
+
+    def set_rows(self, matrix, summary_index=None, ukeire_index=None):
+        """
+        Publica la matriz y sus índices por fila en una sola asignación
+
+        Las peticiones concurrentes ven la versión anterior o la nueva
+        completa, nunca una matriz con índices de otra versión.
+
+        Args:
+            matrix: Matriz (N, columnas) densa o SparseMatrixStore
+            summary_index: Índice de resúmenes (N,) o None
+            ukeire_index: Registros de ukeire (N,) o None
+        """
+        self._rows = _DatasetRows(matrix, summary_index, ukeire_index)
+
+    @property
+    def matrix(self):
+        """Matriz de estados cargada"""
+        return self._rows.matrix
+
+    @property
+    def summary_index(self):
+        """Índice de resúmenes de las filas"""
+        return self._rows.summary_index
+
+    @property
+    def ukeire_index(self):
+        """Mejor descarte y ukeire de las filas"""
+        return self._rows.ukeire_index
+
+    @property
+    def analyzers(self):
+        """Analizador de cada fila"""
+        return self._rows.analyzers
+
+    @property
+    def summaries(self):
+        """Resumen de cada fila"""
+        return self._rows.summaries
+
+    @property
+    def matrices_data(self):
+        """Tablero 15x34 de cada fila"""
+        return self._rows.matrices_data
+
+    @property
+    def batch(self):
+        """Parser columnar de la matriz cargada (se construye en el primer acceso)"""
+        return self._rows.batch
+
+    @property
+    def diff(self):
+        """Cambios entre matrices consecutivas (se calculan en el primer acceso)"""
+        return self._rows.diff
+
+    @property
+    def timeline(self):
+        """Eventos de la partida con índices por tipo, jugador y ficha (primer acceso)"""
+        return self._rows.timeline
+
+    def analyze_matrices(self):
+        """Analiza todas las matrices del archivo cargado (descarta las vistas ya construidas)"""
+        rows = self._rows
+        self.set_rows(rows.matrix, rows.summary_index, rows.ukeire_index)
+
+    def heatmap_etag(self, matrix_index, color="black"):
+        """ETag del heatmap: depende del contenido del dataset, la fila, el color y el renderizador"""
+        return f"{self.dataset_digest[:16]}-{matrix_index}-{color}-{CONFIG['heatmap_renderer']}"
+
+    def get_heatmap_png(self, matrix_index, color="black"):
+        """Retorna los bytes PNG del heatmap de una matriz (desde la caché si es posible)"""
         try:
             # Asegurarse de que el índice de la matriz es válido
             if matrix_index < 0 or matrix_index >= len(self.matrices_data):
                 return None
 
-            # Obtener la matriz específica
-            matrix_data = self.matrices_data[matrix_index]            # Generar heatmap usando la función simplificada de maps.py
-            output_path = f"./resources/mahjong_board_{matrix_index + 1}_{color}"
-            generate_mahjong_heatmap(
-                input_matrix=matrix_data,
-                title="",  # Título eliminado
-                output_path=output_path,
-                show_fig=False
-            )
-
-            # Leer la imagen generada e devolverla
-            with open(f"{output_path}.png", "rb") as f:
-                img_data = base64.b64encode(f.read()).decode('utf-8')
-            
-            return img_data
+            return heatmap_cache.get_or_render(*self.heatmap_job(matrix_index, color))
 
         except Exception as e:
             print(f"Error generando heatmap: {e}")
             return None
+
+    def heatmap_job(self, matrix_index, color="black"):
+        """Clave de caché y función de renderizado del heatmap de una matriz"""
+        key = heatmap_cache.make_key(
+            self.dataset_digest, matrix_index, color, CONFIG['heatmap_renderer']
+        )
+        return key, lambda: self._render_heatmap_png(matrix_index, color)
+
+    def generate_heatmap_image(self, matrix_index, color="black"):
+        """Genera imagen del heatmap para una matriz específica (PNG en base64)"""
+        png_bytes = self.get_heatmap_png(matrix_index, color)
+        if png_bytes is None:
+            return None
+        return base64.b64encode(png_bytes).decode('utf-8')
+
+    def _render_heatmap_png(self, matrix_index, color):
+        """Renderiza en memoria el heatmap de una matriz y retorna los bytes PNG"""
+        # El color se conserva en la clave de caché; la paleta es fija
+        return render_mahjong_heatmap_png(
+            self.matrices_data[matrix_index], renderer=CONFIG['heatmap_renderer']
+        )
     
     def get_matrix_analysis(self, matrix_index):
         """Obtiene análisis detallado de una matriz"""
@@ -198,10 +400,25 @@ class MahjongDashboard:
             'summary': summary,
             'metadata': analyzer.parser.metadata,
             'hand_composition': hand_composition,
+            'shanten': shanten_detail(self.batch.hand[matrix_index]),
+            'ukeire': self._ukeire_analysis(matrix_index),
             'melds_by_player': melds_by_player,
             'discards_by_player': discards_by_player
         }
     
+    def _ukeire_analysis(self, matrix_index):
+        """Mejor descarte del índice y ukeire de cada descarte posible de una fila"""
+        record = self.ukeire_index[matrix_index]
+        batch = self.batch
+        visible = visible_tiles(batch.discards[matrix_index], batch.melds[matrix_index], batch.dora[matrix_index])
+        return {
+            'discard': int(record['discard']) if record['discard'] >= 0 else None,
+            'shanten': int(record['shanten']),
+            'tile_types': int(record['tile_types']),
+            'tiles': int(record['tiles']),
+            'options': ukeire_detail(batch.hand[matrix_index], visible)
+        }
+
     def get_comparison_analysis(self):
         """Obtiene análisis comparativo entre matrices"""
         if len(self.summaries) < 2:
@@ -213,40 +430,20 @@ class MahjongDashboard:
             'meld_changes': []
         }
         
-        # Progresión temporal
-        for i, summary in enumerate(self.summaries):
+        # Progresión temporal (tipos de ficha descartados por fila)
+        discard_types = np.count_nonzero(self.batch.discards > 0, axis=(1, 2))
+        index = self.summary_index
+        for i in range(len(index)):
             comparison_data['progression'].append({
-                'matrix': i + 1,                'pov_player': summary['pov_player'],
-                'step_number': summary['step_number'],
-                'wall_tiles': summary['wall_tiles'],
-                'total_discards': sum(len(discards) for discards in summary['discards_detail'].values())
+                'matrix': i + 1,
+                'pov_player': int(index['pov_player'][i]),
+                'step_number': int(index['step_number'][i]),
+                'wall_tiles': int(index['wall_tiles'][i]),
+                'total_discards': int(discard_types[i])
             })
         
-        # Comparaciones de melds
-        for i in range(len(self.summaries) - 1):
-            current = self.summaries[i]
-            next_matrix = self.summaries[i + 1]
-            
-            for player_id in range(4):
-                current_melds = dict(current['melds_detail'].get(player_id, []))
-                next_melds = dict(next_matrix['melds_detail'].get(player_id, []))
-
-                if current_melds != next_melds:
-                    newly_formed_melds = []
-                    for tile_type, count in next_melds.items():
-                        if count > current_melds.get(tile_type, 0):
-                            newly_formed_melds.append({
-                                'type': tile_type,
-                                'count': count - current_melds.get(tile_type, 0)
-                            })
-                    
-                    if newly_formed_melds:
-                        comparison_data['meld_changes'].append({
-                            'from_matrix': i + 1,
-                            'to_matrix': i + 2,
-                            'player': player_id,
-                            'new_melds': newly_formed_melds
-                        })        
+        # Melds nuevos entre matrices consecutivas
+        comparison_data['meld_changes'] = self.diff.meld_changes()
         return comparison_data
     
     def get_general_statistics(self):
@@ -254,100 +451,11 @@ class MahjongDashboard:
         if not self.summaries:
             return None
         
-        # Contadores para estadísticas
-        discarded_tiles = {}
-        pon_melds = {}
-        chii_melds = {}
-        kan_melds = {}
         total_games = len(self.summaries)
         
-        try:            # Procesar cada matriz para recopilar estadísticas
-            for matrix_idx, analyzer in enumerate(self.analyzers):                # Contar descartes por tipo de ficha
-                try:
-                    for player_id in range(4):
-                        player_discards = analyzer.parser.discards[player_id]
-                        for tile_type, count in player_discards['tiles']:
-                            # Solo contar valores positivos
-                            if count > 0:
-                                tile_name = self._get_tile_name(tile_type)
-                                # Convertir 'count' a int de Python para prevenir overflow
-                                discarded_tiles[tile_name] = discarded_tiles.get(tile_name, 0) + int(count)
-                except (KeyError, IndexError, TypeError) as e:
-                    continue# Contar melds por tipo
-                try:
-                    for player_id in range(4):
-                        player_melds_data = analyzer.parser.melds.get(player_id, {'tiles': []})
-                          # Analizar todos los melds del jugador para clasificarlos correctamente
-                        all_tiles = player_melds_data['tiles']
-                        
-                        for tile_type, count in all_tiles:
-                            tile_name = self._get_tile_name(tile_type)
-                            
-                            if count == 4:
-                                # KAN: 4 fichas iguales
-                                meld_key = f"KAN de {tile_name}"
-                                if meld_key not in kan_melds:
-                                    kan_melds[meld_key] = {'count': 0, 'matrices': []}
-                                kan_melds[meld_key]['count'] += 1
-                                kan_melds[meld_key]['matrices'].append(matrix_idx + 1)
-                            elif count == 3:
-                                # PON: 3 fichas iguales
-                                meld_key = f"PON de {tile_name}"
-                                if meld_key not in pon_melds:
-                                    pon_melds[meld_key] = {'count': 0, 'matrices': []}
-                                pon_melds[meld_key]['count'] += 1
-                                pon_melds[meld_key]['matrices'].append(matrix_idx + 1)
-                            elif count == 1:
-                                # Fichas individuales - podrían ser parte de CHII
-                                meld_key = f"Ficha {tile_name} en meld"
-                                if meld_key not in chii_melds:
-                                    chii_melds[meld_key] = {'count': 0, 'matrices': []}
-                                chii_melds[meld_key]['count'] += 1
-                                chii_melds[meld_key]['matrices'].append(matrix_idx + 1)
-                            elif count == 2:
-                                # Par - no es un meld completo en Mahjong estándar, pero podría ser útil
-                                meld_key = f"Par de {tile_name}"
-                                if meld_key not in pon_melds:
-                                    pon_melds[meld_key] = {'count': 0, 'matrices': []}
-                                pon_melds[meld_key]['count'] += 1
-                                pon_melds[meld_key]['matrices'].append(matrix_idx + 1)
-                            else:                                # Cualquier otra cantidad inusual
-                                meld_key = f"{count}x {tile_name}"
-                                if meld_key not in pon_melds:
-                                    pon_melds[meld_key] = {'count': 0, 'matrices': []}
-                                pon_melds[meld_key]['count'] += 1
-                                pon_melds[meld_key]['matrices'].append(matrix_idx + 1)
-                except (KeyError, IndexError, TypeError) as e:
-                    continue
-            
-            # Ordenar y obtener los más comunes
-            most_discarded = sorted(discarded_tiles.items(), key=lambda x: x[1], reverse=True)[:10]
-            most_common_pon = sorted(pon_melds.items(), key=lambda x: x[1]['count'], reverse=True)[:5]
-            most_common_chii = sorted(chii_melds.items(), key=lambda x: x[1]['count'], reverse=True)[:5]
-            most_common_kan = sorted(kan_melds.items(), key=lambda x: x[1]['count'], reverse=True)[:5]            # Calcular promedios
-            total_discards = sum(discarded_tiles.values())
-            total_melds = sum(data['count'] for data in pon_melds.values()) + sum(data['count'] for data in chii_melds.values()) + sum(data['count'] for data in kan_melds.values())
-            
-            # Asegurar que los valores sean válidos
-            total_discards = max(0, total_discards)
-            total_melds = max(0, total_melds)
-            
-            return {
-                'total_games': total_games,
-                'total_discards': total_discards,
-                'total_melds': total_melds,
-                'average_discards_per_game': round(total_discards / total_games, 2) if total_games > 0 else 0,
-                'average_melds_per_game': round(total_melds / total_games, 2) if total_games > 0 else 0,
-                'most_discarded_tiles': [{'tile': tile, 'count': count, 'percentage': round((count/total_discards)*100, 2) if total_discards > 0 else 0} for tile, count in most_discarded],
-                'most_common_pon': [{'meld': meld, 'count': data['count'], 'matrices': data['matrices'][:5]} for meld, data in most_common_pon],
-                'most_common_chii': [{'meld': meld, 'count': data['count'], 'matrices': data['matrices'][:5]} for meld, data in most_common_chii],
-                'most_common_kan': [{'meld': meld, 'count': data['count'], 'matrices': data['matrices'][:5]} for meld, data in most_common_kan],
-                'meld_distribution': {
-                    'pon': sum(data['count'] for data in pon_melds.values()),
-                    'chii': sum(data['count'] for data in chii_melds.values()),
-                    'kan': sum(data['count'] for data in kan_melds.values())
-                }
-            }
+        try:
+            # Histogramas y clasificación de melds sobre las secciones (N, 4, 34)
+            return compute_general_statistics(self.batch, self._get_tile_name)
         except Exception as e:
             print(f"Error calculando estadísticas generales: {e}")
             return {
@@ -362,8 +470,113 @@ class MahjongDashboard:
                 'most_common_kan': [],
                 'meld_distribution': {'pon': 0, 'chii': 0, 'kan': 0}
             }
-  # Instancia global del dashboard
-dashboard = MahjongDashboard()
+
+    def warm_up(self):
+        """Construye por adelantado el parser columnar que usan el listado y el detalle"""
+        self.batch
+
+    def memory_usage(self):
+        """Memoria estimada (bytes) de la matriz y los arrays del parser"""
+        total = self._rows.memory_usage()
+        if self._live is not None:
+            total += self._live['matrix'].nbytes
+        return total
+
+
+def _load_dataset(filename):
+    """Carga un dataset para el registro; retorna None si no se pudo cargar"""
+    # Solo se aceptan nombres de archivo dentro de la carpeta de datos
+    if os.path.basename(filename) != filename or not filename.endswith('.npz'):
+        return None
+    dataset = MahjongDashboard()
+    if not dataset.load_data(filename):
+        return None
+    return dataset
+
+
+# Registro de datasets cargados, compartido por todas las peticiones
+datasets = DatasetRegistry(_load_dataset, CONFIG['dataset_memory_budget'])
+
+# Precarga en segundo plano (CONFIG['warmup_enabled']), ver start_warmup()
+warmup = DatasetWarmup(datasets, warm=MahjongDashboard.warm_up, max_workers=CONFIG['warmup_workers'])
+
+# Serializa las agregaciones del corpus (cada una puede lanzar un pool de procesos)
+_corpus_lock = threading.Lock()
+
+# Índice de estados similares del corpus; se reconstruye si cambian los datasets
+_similarity_index = None
+_similarity_lock = threading.Lock()
+
+
+def _get_similarity_index():
+    """Retorna el índice de similitud al día con la carpeta de datos"""
+    global _similarity_index
+    folder = app.config['DATA_FOLDER']
+    with _similarity_lock:
+        if _similarity_index is None or _similarity_index.signature != folder_signature(folder):
+            _similarity_index, reprocessed = SimilarityIndex.build(folder)
+            print(f"Índice de similitud: {len(_similarity_index)} estados, "
+                  f"{len(reprocessed)} datasets reprocesados")
+        return _similarity_index
+
+
+def _get_dataset():
+    """
+    Obtiene el dataset indicado con ?dataset= en la petición actual
+
+    Returns:
+        Tupla (dataset, None) o (None, respuesta de error)
+    """
+    dataset_name = request.args.get('dataset')
+    if not dataset_name:
+        return None, (jsonify({'error': 'Dataset no especificado'}), 400)
+
+    dataset = datasets.get(dataset_name)
+    if dataset is None:
+        return None, (jsonify({'error': f'No se pudo cargar el dataset {dataset_name}'}), 404)
+    return dataset, None
+
+def _dataset_files():
+    """Nombres de los datasets .npz de la carpeta de datos, ordenados"""
+    return sorted(f for f in os.listdir(app.config['DATA_FOLDER']) if f.endswith('.npz'))
+
+
+# Las tareas de arranque se lanzan una vez por proceso (_start_background_tasks)
+_background_started = False
+_background_lock = threading.Lock()
+
+
+def start_warmup():
+    """
+    Encola la precarga de los datasets configurados y de los más recientes
+
+    Returns:
+        Lista de nombres encolados
+    """
+    folder = app.config['DATA_FOLDER']
+    available = _dataset_files()
+    recent = sorted(available, key=lambda f: os.path.getmtime(os.path.join(folder, f)), reverse=True)
+    filenames = [f for f in CONFIG['warmup_datasets'] if f in available]
+    filenames += [f for f in recent[:CONFIG['warmup_recent']] if f not in filenames]
+    warmup.start(filenames)
+    return filenames
+
+def _prerender_neighbours(dashboard, matrix_index):
+    """
+    Encola el renderizado de los heatmaps vecinos de una matriz
+
+    El orden es i+1, i-1, i+2, i-2...; los trabajos pendientes de la misma
+    vista (dataset y ?view=, un identificador por pestaña que envía el
+    detalle) se cancelan. Sin ?view= no se prerenderiza: la dirección del
+    cliente no sirve, detrás de un proxy la comparten todos los usuarios.
+    """
+    radius = CONFIG['heatmap_prerender_radius']
+    view = request.args.get('view', '')
+    if radius <= 0 or not view or len(view) > CONFIG['heatmap_prerender_view_max_length']:
+        return
+    neighbours = [matrix_index + sign * distance for distance in range(1, radius + 1) for sign in (1, -1)]
+    jobs = [dashboard.heatmap_job(i) for i in neighbours if 0 <= i < len(dashboard.matrices_data)]
+    heatmap_prerender.schedule((dashboard.matrix_file, view), jobs)
 
 @app.route('/')
 def index():
@@ -374,68 +587,229 @@ def index():
 def api_datasets():
     """API: Lista de datasets NPZ disponibles en la carpeta de datos."""
     try:
-        files = [f for f in os.listdir(app.config['DATA_FOLDER']) 
-                 if f.endswith('.npz')]
-        return jsonify(sorted(files))
+        return jsonify(_dataset_files())
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/datasets/status')
+def api_datasets_status():
+    """
+    API: Estado de carga de cada dataset
+
+    Estados: 'queued' y 'loading' (precarga o petición en curso), 'ready'
+    (cargado), 'failed' (la precarga falló) y 'unloaded'.
+    """
+    try:
+        return jsonify({
+            'warmup_enabled': CONFIG['warmup_enabled'],
+            'datasets': {filename: warmup.state(filename) for filename in _dataset_files()}
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Campos del listado de matrices, calculados sobre un rango de filas del índice
+# de resúmenes: cada función recibe el índice recortado y los números de fila
+MATRIX_LIST_FIELDS = {
+    'index': lambda index, rows: rows,
+    'matrix_number': lambda index, rows: rows + 1,
+    'pov_player': lambda index, rows: index['pov_player'],
+    'step_number': lambda index, rows: index['step_number'],
+    'wall_tiles': lambda index, rows: index['wall_tiles'],
+    'hand_size': lambda index, rows: index['hand_tiles'],
+    'hand_unique': lambda index, rows: index['hand_unique'],
+    'shanten': lambda index, rows: index['shanten'],
+    'round_wind': lambda index, rows: index['round_wind'],
+    'round_number': lambda index, rows: index['round_number'],
+    'dealer': lambda index, rows: index['dealer'],
+    'honba_sticks': lambda index, rows: index['honba_sticks'],
+    'riichi_sticks': lambda index, rows: index['riichi_sticks'],
+    'active_dora': lambda index, rows: index['active_dora'],
+}
+DEFAULT_MATRIX_LIST_FIELDS = ('index', 'matrix_number', 'pov_player', 'step_number', 'wall_tiles', 'hand_size')
+
+
+def _matrix_list_summary(index):
+    """Resumen del dataset completo para la cabecera del listado"""
+    steps = index['step_number']
+    walls = index['wall_tiles']
+    return {
+        'total_matrices': int(len(index)),
+        'unique_players': int(len(np.unique(index['pov_player']))),
+        'turn_changes': int(np.count_nonzero(steps[1:] != steps[:-1])),
+        'wall_min': int(walls.min()) if len(walls) else None,
+        'wall_max': int(walls.max()) if len(walls) else None
+    }
+
+
 @app.route('/api/matrices')
 def api_matrices():
-    """API: Lista de matrices disponibles para un dataset"""
+    """
+    API: Lista de matrices disponibles para un dataset
+
+    Con offset y/o limit responde una página en formato columnar
+    ({'columns': {campo: [valores]}}, más el total y el resumen del dataset);
+    sin ellos, la lista completa con un diccionario por matriz. fields=
+    (separados por comas) elige los campos en ambos casos. filter= limita
+    el listado a las filas que cumplen una expresión de state_filter.
+    """
+    dashboard, error = _get_dataset()
+    if error:
+        return error
+
+    fields = request.args.get('fields')
+    fields = fields.split(',') if fields else list(DEFAULT_MATRIX_LIST_FIELDS)
+    unknown = [field for field in fields if field not in MATRIX_LIST_FIELDS]
+    if unknown:
+        return jsonify({'error': f"Campos desconocidos: {', '.join(unknown)}"}), 400
+
+    # Listado construido desde el índice de resúmenes, sin parsear filas
+    index = dashboard.summary_index
+    selected = None
+    expression = request.args.get('filter', '').strip()
+    if expression:
+        try:
+            selected = StateFilter(expression).rows(FilterSource(index, dashboard.matrix))
+        except FilterError as e:
+            return jsonify({'error': str(e)}), 400
+    total = len(index) if selected is None else len(selected)
+    paginated = 'offset' in request.args or 'limit' in request.args
+    offset = max(0, request.args.get('offset', 0, type=int))
+    limit = request.args.get('limit', CONFIG['matrices_page_size'] if paginated else total, type=int)
+    if paginated:
+        limit = min(max(1, limit), CONFIG['matrices_page_max'])
+    stop = min(total, offset + limit)
+
+    if selected is None:
+        rows = np.arange(offset, max(offset, stop))
+        page = index[offset:stop]
+    else:
+        rows = selected[offset:stop]
+        page = index[rows]
+    columns = {field: MATRIX_LIST_FIELDS[field](page, rows).tolist() for field in fields}
+
+    if not paginated:
+        return jsonify([dict(zip(fields, values)) for values in zip(*columns.values())])
+
+    return jsonify({
+        'total': total,
+        'filter': expression or None,
+        'offset': offset,
+        'limit': limit,
+        'next_offset': stop if stop < total else None,
+        'fields': fields,
+        'columns': columns,
+        'summary': _matrix_list_summary(index)
+    })
+
+
+def _sse_event(event, data, event_id=None):
+    """Formatea un evento de Server-Sent Events con datos JSON"""
+    lines = [] if event_id is None else [f"id: {event_id}"]
+    lines += [f"event: {event}", f"data: {json.dumps(data)}"]
+    return '\n'.join(lines) + '\n\n'
+
+
+@app.route('/api/live')
+def api_live():
+    """
+    API: Filas nuevas de un dataset en vivo (Server-Sent Events)
+
+    Cada CONFIG['live_poll_interval'] segundos se comprueba si el archivo
+    creció y solo se parsean las filas añadidas. Eventos: 'rows' (filas
+    desde start hasta el nuevo total, con el resumen del listado), 'reset'
+    (el archivo se reescribió con otras filas) y 'failed' (no se pudo
+    leer). El id de cada evento es el número de filas enviado, así que al
+    reconectar (Last-Event-ID) no se pierden filas.
+    """
+    dashboard, error = _get_dataset()
+    if error:
+        return error
+
     dataset_name = request.args.get('dataset')
-    if not dataset_name:
-        return jsonify({'error': 'Dataset no especificado'}), 400
+    last_id = request.headers.get('Last-Event-ID', request.args.get('since', ''))
+    seen = int(last_id) if last_id.isdigit() else len(dashboard.summary_index)
+    generation = dashboard.generation
+    interval = CONFIG['live_poll_interval']
 
-    # Cargar datos si no es el actual o si no hay ninguno cargado
-    if dashboard.matrix_file != dataset_name:
-        if not dashboard.load_data(dataset_name):
-            return jsonify({'error': f'No se pudo cargar el dataset {dataset_name}'}), 500
-
-    matrices_info = []
-    for i in range(len(dashboard.summaries)):
-        summary = dashboard.summaries[i]
-        matrices_info.append({
-            'index': int(i),
-            'matrix_number': int(i + 1),
-            'pov_player': int(summary['pov_player']),
-            'step_number': int(summary['step_number']),
-            'wall_tiles': int(summary['wall_tiles']),
-            'hand_size': int(summary['hand_tiles'])
-        })
-    
-    return jsonify(matrices_info)
-
-# Función auxiliar para convertir tipos de NumPy a nativos de Python
-
-def _convert_np(obj):
-    if isinstance(obj, dict):
-        return {str(k): _convert_np(v) for k, v in obj.items()}
-    if isinstance(obj, (list, tuple)):
-        return [_convert_np(v) for v in obj]
-    if isinstance(obj, np.integer):
-        return int(obj)
-    if isinstance(obj, np.floating):
-        return float(obj)
-    if isinstance(obj, np.ndarray):
-        return obj.tolist()
-    return obj
+    def events():
+        nonlocal dashboard, seen, generation
+        yield f"retry: {int(interval * 1000)}\n\n"
+        deadline = time.monotonic() + CONFIG['live_stream_seconds']
+        while time.monotonic() < deadline:
+            try:
+                state = dashboard.refresh()
+            except Exception as e:
+                print(f"Error actualizando {dataset_name} en vivo: {e}")
+                state = 'unchanged'
+            if state == 'failed':
+                yield _sse_event('failed', {'error': f'No se pudo leer el dataset {dataset_name}'})
+                return
+            # Tras un 'reset' (de esta petición o de otra) se sigue con la versión recargada
+            while dashboard.reloaded is not None:
+                dashboard = dashboard.reloaded
+
+            index = dashboard.summary_index
+            total = len(index)
+            if dashboard.generation != generation or total < seen:
+                generation = dashboard.generation
+                seen = total
+                yield _sse_event('reset', {'dataset': dataset_name, 'total': total}, total)
+            elif total > seen:
+                yield _sse_event('rows', {
+                    'dataset': dataset_name,
+                    'start': seen,
+                    'total': total,
+                    'summary': _matrix_list_summary(index)
+                }, total)
+                seen = total
+            else:
+                # Comentario de mantenimiento: detecta pronto las conexiones cerradas
+                yield ': ping\n\n'
+            time.sleep(interval)
+
+    return Response(events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @app.route('/api/matrix/<int:matrix_id>')
 def api_matrix_detail(matrix_id):
     """API: Detalle de una matriz específica"""
+    dashboard, error = _get_dataset()
+    if error:
+        return error
+
     analysis = dashboard.get_matrix_analysis(matrix_id)
     if analysis is None:
         return jsonify({'error': 'Matriz no encontrada'}), 404
+    _prerender_neighbours(dashboard, matrix_id)
     
     # Convertir objetos de NumPy a tipos nativos para serialización JSON
-    analysis_clean = _convert_np(analysis)
-    return jsonify(analysis_clean)
+    return jsonify(analysis)
+
+def _heatmap_color():
+    """
+    Color pedido con ?color= para un heatmap
+
+    Solo se aceptan las paletas soportadas: el color forma parte de la
+    clave de caché, del ETag y del nombre del archivo en disco.
+
+    Returns:
+        Tupla (color, None) o (None, respuesta de error)
+    """
+    color = request.args.get('color', 'black')
+    if color not in HEATMAP_COLORS:
+        return None, (jsonify({'error': f'Color no soportado: {color}'}), 400)
+    return color, None
 
 @app.route('/api/heatmap/<int:matrix_id>')
 def api_heatmap(matrix_id):
     """API: Imagen del heatmap de una matriz"""
-    color = request.args.get('color', 'black')
+    dashboard, error = _get_dataset()
+    if error:
+        return error
+
+    color, error = _heatmap_color()
+    if error:
+        return error
     img_data = dashboard.generate_heatmap_image(matrix_id, color)
     
     if img_data is None:
@@ -443,19 +817,88 @@ def api_heatmap(matrix_id):
     
     return jsonify({'image': img_data})
 
+@app.route('/api/heatmap/<int:matrix_id>.png')
+def api_heatmap_png(matrix_id):
+    """API: Heatmap de una matriz como PNG binario con cabeceras de caché HTTP"""
+    dashboard, error = _get_dataset()
+    if error:
+        return error
+
+    if matrix_id >= len(dashboard.matrices_data):
+        return jsonify({'error': 'Matriz no encontrada'}), 404
+
+    color, error = _heatmap_color()
+    if error:
+        return error
+    etag = dashboard.heatmap_etag(matrix_id, color)
+
+    # Revalidación del navegador: la imagen no cambió, no hace falta renderizar
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        png_bytes = dashboard.get_heatmap_png(matrix_id, color)
+        if png_bytes is None:
+            return jsonify({'error': 'Error generando heatmap'}), 500
+        response = Response(png_bytes, mimetype='image/png')
+
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = CONFIG['heatmap_max_age']
+    return response
+
 @app.route('/api/comparison')
 def api_comparison():
     """API: Análisis comparativo entre matrices"""
+    dashboard, error = _get_dataset()
+    if error:
+        return error
+
     comparison = dashboard.get_comparison_analysis()
     if comparison is None:
         return jsonify({'error': 'No hay suficientes datos para comparación'}), 400
     
-    comparison_clean = _convert_np(comparison)
-    return jsonify(comparison_clean)
+    return jsonify(comparison)
+
+@app.route('/api/events')
+def api_events():
+    """API: Eventos de la partida filtrados por tipo, jugador y/o ficha"""
+    dashboard, error = _get_dataset()
+    if error:
+        return error
+
+    event_type = request.args.get('type')
+    if event_type is not None and event_type not in EVENT_TYPES:
+        return jsonify({'error': f"Tipo de evento inválido (válidos: {', '.join(EVENT_TYPES)})"}), 400
+
+    player = request.args.get('player', type=int)
+    if player is not None and not 0 <= player <= 3:
+        return jsonify({'error': 'Jugador inválido (0-3)'}), 400
+
+    # La ficha se acepta por número o por nombre ("5-pin")
+    tile = request.args.get('tile')
+    if tile is not None:
+        tile_numbers = {name: number for number, name in dashboard.tile_names.items()}
+        tile = int(tile) if tile.isdigit() else tile_numbers.get(tile)
+        if tile is None or tile not in dashboard.tile_names:
+            return jsonify({'error': 'Ficha inválida'}), 400
+
+    # Sin limit= se devuelven todos hasta el máximo; los negativos se tratan como 0
+    limit = request.args.get('limit', CONFIG['events_max_limit'], type=int)
+    limit = min(max(0, limit), CONFIG['events_max_limit'])
+    timeline = dashboard.timeline
+    positions = timeline.query(event_type, player, tile)
+    return jsonify({
+        'total': int(len(positions)),
+        'events': timeline.records(positions[:limit], dashboard.tile_names)
+    })
 
 @app.route('/api/statistics')
 def api_statistics():
-    """API: Estadísticas generales del dataset actual"""
+    """API: Estadísticas generales de un dataset"""
+    dashboard, error = _get_dataset()
+    if error:
+        return error
+
     if not dashboard.summaries:
         return jsonify({'error': 'No hay datos cargados'}), 400
     
@@ -463,29 +906,159 @@ def api_statistics():
     if statistics is None:
         return jsonify({'error': 'Error calculando estadísticas'}), 500
     
-    statistics_clean = _convert_np(statistics)
-    return jsonify(statistics_clean)
+    return jsonify(statistics)
+
+@app.route('/api/similar/<int:matrix_id>')
+def api_similar(matrix_id):
+    """API: Estados de todo el corpus más parecidos a una matriz (mano, descartes y pond)"""
+    dataset_name = request.args.get('dataset')
+    if not dataset_name:
+        return jsonify({'error': 'Dataset no especificado'}), 400
+    k = min(max(1, request.args.get('k', CONFIG['similar_default_k'], type=int)), CONFIG['similar_max_k'])
+
+    try:
+        index = _get_similarity_index()
+        start = time.perf_counter()
+        result = index.neighbours(dataset_name, matrix_id, k)
+        elapsed = time.perf_counter() - start
+    except Exception as e:
+        print(f"Error buscando estados similares: {e}")
+        return jsonify({'error': 'Error buscando estados similares'}), 500
+    if result is None:
+        return jsonify({'error': 'Matriz no encontrada'}), 404
+
+    positions, distances = result
+    results = []
+    for position, distance in zip(positions.tolist(), distances.tolist()):
+        row = int(index.rows[position])
+        dataset = index.datasets[index.dataset_ids[position]]
+        hand = index.state(position)[HAND_FEATURES]
+        tiles = np.flatnonzero(hand)
+        results.append({
+            'dataset': dataset,
+            'index': row,
+            'matrix_number': row + 1,
+            'same_dataset': dataset == dataset_name,
+            'distance': round(distance, 3),
+            'hand': [{'type': tile, 'count': count} for tile, count in zip(tiles.tolist(), hand[tiles].tolist())]
+        })
+    return jsonify({
+        'dataset': dataset_name,
+        'index': matrix_id,
+        'index_size': len(index),
+        'elapsed_ms': round(elapsed * 1e3, 3),
+        'results': results
+    })
+
+@app.route('/api/filter')
+def api_filter():
+    """
+    API: Estados que cumplen una expresión de filtro (q=)
+
+    Con dataset= se filtra solo ese dataset; sin él, todos los de la carpeta
+    de datos. Retorna el número de coincidencias por dataset y las primeras
+    limit= como pares (dataset, índice).
+    """
+    expression = request.args.get('q', '')
+    dataset_name = request.args.get('dataset')
+    limit = min(max(0, request.args.get('limit', CONFIG['filter_default_limit'], type=int)),
+                CONFIG['filter_max_limit'])
+    folder = app.config['DATA_FOLDER']
+    if dataset_name is not None and dataset_name not in _dataset_files():
+        return jsonify({'error': f'Dataset no encontrado: {dataset_name}'}), 404
+
+    try:
+        state_filter = StateFilter(expression)
+        start = time.perf_counter()
+        if dataset_name is None:
+            found = filter_folder(state_filter, folder)
+        else:
+            rows = state_filter.rows(FilterSource.open(os.path.join(folder, dataset_name)))
+            found = [(dataset_name, rows)] if len(rows) else []
+        elapsed = time.perf_counter() - start
+    except FilterError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"Error aplicando el filtro: {e}")
+        return jsonify({'error': 'Error aplicando el filtro'}), 500
+
+    matches = []
+    for name, rows in found:
+        if len(matches) >= limit:
+            break
+        matches.extend({'dataset': name, 'index': row} for row in rows[:limit - len(matches)].tolist())
+    total = sum(len(rows) for _, rows in found)
+    return jsonify({
+        'filter': state_filter.expression,
+        'fields': state_filter.fields,
+        'total': total,
+        'datasets': {name: len(rows) for name, rows in found},
+        'matches': matches,
+        'truncated': total > len(matches),
+        'elapsed_ms': round(elapsed * 1e3, 3)
+    })
+
+@app.route('/api/corpus/statistics')
+def api_corpus_statistics():
+    """API: Estadísticas agregadas de todos los datasets de la carpeta de datos"""
+    try:
+        with _corpus_lock:
+            statistics = aggregate_corpus(app.config['DATA_FOLDER'])
+    except Exception as e:
+        print(f"Error calculando estadísticas del corpus: {e}")
+        return jsonify({'error': 'Error calculando estadísticas del corpus'}), 500
+
+    return jsonify(statistics)
 
 @app.route('/statistics')
 def statistics_page():
     """Página de estadísticas generales"""
-    if not dashboard.summaries:
+    dataset_name = request.args.get('dataset')
+    if not dataset_name:
         return redirect(url_for('index'))
     
-    return render_template('statistics.html')
+    return render_template('statistics.html', dataset=dataset_name)
 
 @app.route('/matrix/<int:matrix_id>')
 def matrix_detail(matrix_id):
     """Página de detalle de una matriz"""
+    dashboard, error = _get_dataset()
+    if error:
+        return redirect(url_for('index'))
+
     if matrix_id >= len(dashboard.summaries):
         return "Matriz no encontrada", 404
     
-    return render_template('matrix_detail.html', matrix_id=matrix_id)
+    return render_template('matrix_detail.html', matrix_id=matrix_id,
+                           dataset=request.args['dataset'],
+                           total_matrices=len(dashboard.summaries))
 
 # @app.route('/comparison')
 # def comparison():
 #     """Página de comparación entre matrices"""
 #     return render_template('comparison.html')
 
+def _start_background_tasks():
+    """Tareas de arranque de un proceso que sirve peticiones (una sola vez por proceso)"""
+    global _background_started
+    with _background_lock:
+        if _background_started:
+            return
+        _background_started = True
+    # Las tablas de shanten tardan unos segundos en generarse la primera vez:
+    # así no las espera la primera petición que carga un dataset
+    threading.Thread(target=load_tables, name='shanten-tables', daemon=True).start()
+    if CONFIG['warmup_enabled']:
+        print(f"Precargando datasets: {', '.join(start_warmup()) or 'ninguno'}")
+
+
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    use_reloader = True
+    # Con el recargador el proceso padre solo vigila los archivos (sin
+    # WERKZEUG_RUN_MAIN): las tareas se lanzan en el que sirve peticiones
+    if not (use_reloader and os.environ.get('WERKZEUG_RUN_MAIN') != 'true'):
+        _start_background_tasks()
+    app.run(debug=True, use_reloader=use_reloader, host='0.0.0.0', port=5000)
+else:
+    # Importado por un servidor WSGI: cada proceso de trabajo las lanza al importar
+    _start_background_tasks()
@@ -0,0 +1,225 @@
+# dataset_registry.py
+"""
+Registro de datasets cargados compartido entre peticiones concurrentes
+"""
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class DatasetRegistry:
+    """Datasets cargados indexados por nombre de archivo, con expulsión LRU
+
+    Es seguro entre hilos: varias peticiones que piden el mismo dataset a la
+    vez esperan a una única carga, y las cargas de datasets distintos se
+    ejecutan en paralelo. Cuando la memoria estimada supera el presupuesto se
+    expulsan los datasets usados hace más tiempo (el último usado nunca).
+    """
+
+    def __init__(self, loader, memory_budget, size_of=None):
+        """
+        Inicializa el registro
+
+        Args:
+            loader: Función que recibe el nombre de archivo y retorna el
+                dataset cargado, o None si no se pudo cargar
+            memory_budget: Memoria máxima estimada (bytes) de los datasets cargados
+            size_of: Función que estima la memoria de un dataset (por defecto
+                llama a su método memory_usage())
+        """
+        self._loader = loader
+        self.memory_budget = memory_budget
+        self._size_of = size_of or (lambda dataset: dataset.memory_usage())
+        self._datasets = OrderedDict()
+        self._sizes = {}
+        self._load_locks = {}
+        self._lock = threading.Lock()
+
+    def _lookup(self, filename):
+        """Retorna un dataset ya cargado y lo marca como recién usado (con el lock tomado)"""
+        dataset = self._datasets.get(filename)
+        if dataset is not None:
+            self._datasets.move_to_end(filename)
+        return dataset
+
+    def get(self, filename):
+        """
+        Retorna el dataset indicado, cargándolo si es necesario
+
+        Args:
+            filename: Nombre del archivo dentro de la carpeta de datos
+
+        Returns:
+            El dataset cargado o None si no se pudo cargar
+        """
+        with self._lock:
+            dataset = self._lookup(filename)
+            if dataset is not None:
+                return dataset
+            load_lock = self._load_locks.setdefault(filename, threading.Lock())
+
+        with load_lock:
+            # Otra petición pudo completar la carga mientras esperábamos
+            with self._lock:
+                dataset = self._lookup(filename)
+                if dataset is not None:
+                    return dataset
+
+            dataset = self._loader(filename)
+
+            with self._lock:
+                self._load_locks.pop(filename, None)
+                if dataset is None:
+                    return None
+                self._datasets[filename] = dataset
+                self._sizes[filename] = self._size_of(dataset)
+                self._evict()
+            return dataset
+
+    def is_loading(self, filename):
+        """Indica si hay una carga del dataset en curso"""
+        with self._lock:
+            return filename in self._load_locks
+
+    def peek(self, filename):
+        """Retorna el dataset si ya está cargado, sin cargarlo ni cambiar el orden LRU"""
+        with self._lock:
+            return self._datasets.get(filename)
+
+    def _evict(self):
+        """Expulsa datasets hasta respetar el presupuesto de memoria (con el lock tomado)"""
+        while len(self._datasets) > 1 and sum(self._sizes.values()) > self.memory_budget:
+            filename, _ = self._datasets.popitem(last=False)
+            self._sizes.pop(filename, None)
+            print(f"Dataset {filename} expulsado del registro por presupuesto de memoria")
+
+    def replace(self, filename, old, new):
+        """
+        Sustituye un dataset cargado por otra versión (p. ej. recargada del archivo)
+
+        Solo se sustituye si el registro aún tiene ``old``: si se expulsó o
+        ya se sustituyó no se cambia nada. La nueva versión conserva la
+        posición LRU de la anterior.
+
+        Returns:
+            True si se sustituyó
+        """
+        with self._lock:
+            if self._datasets.get(filename) is not old:
+                return False
+            self._datasets[filename] = new
+            self._sizes[filename] = self._size_of(new)
+            self._evict()
+            return True
+
+    def update_size(self, filename, dataset):
+        """Vuelve a estimar la memoria de un dataset cargado que creció (p. ej. en vivo)"""
+        with self._lock:
+            if self._datasets.get(filename) is not dataset:
+                return
+            self._sizes[filename] = self._size_of(dataset)
+            self._evict()
+
+    def discard(self, filename):
+        """Elimina un dataset del registro (p. ej. si el archivo cambió)"""
+        with self._lock:
+            self._datasets.pop(filename, None)
+            self._sizes.pop(filename, None)
+
+    def loaded(self):
+        """Retorna los nombres de los datasets cargados y su memoria estimada (más antiguo primero)"""
+        with self._lock:
+            return [(filename, self._sizes[filename]) for filename in self._datasets]
+
+    def memory_usage(self):
+        """Memoria estimada de todos los datasets cargados"""
+        with self._lock:
+            return sum(self._sizes.values())
+
+
+class DatasetWarmup:
+    """Precarga datasets del registro en un pool de hilos en segundo plano
+
+    Cada dataset pasa por los estados 'queued', 'loading' y 'ready' (o
+    'failed'). Las peticiones que piden un dataset mientras se precarga
+    esperan a esa misma carga a través del registro, sin repetirla.
+    """
+
+    def __init__(self, registry, warm=None, max_workers=2):
+        """
+        Inicializa la precarga
+
+        Args:
+            registry: DatasetRegistry en el que se cargan los datasets
+            warm: Función opcional que recibe el dataset cargado y prepara
+                por adelantado lo que se quiera tener listo
+            max_workers: Número de hilos del pool
+        """
+        self._registry = registry
+        self._warm = warm
+        self.max_workers = max_workers
+        self._executor = None
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def start(self, filenames):
+        """
+        Encola la precarga de los datasets indicados (los ya encolados se ignoran)
+
+        Args:
+            filenames: Nombres de archivo en orden de prioridad
+        """
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix='warmup')
+            for filename in filenames:
+                if self._states.get(filename) in ('queued', 'loading'):
+                    continue
+                self._states[filename] = 'queued'
+                self._executor.submit(self._run, filename)
+
+    def _set_state(self, filename, state):
+        with self._lock:
+            self._states[filename] = state
+
+    def _run(self, filename):
+        """Carga y prepara un dataset (se ejecuta en un hilo del pool)"""
+        self._set_state(filename, 'loading')
+        try:
+            dataset = self._registry.get(filename)
+            if dataset is not None and self._warm is not None:
+                self._warm(dataset)
+            state = 'ready' if dataset is not None else 'failed'
+        except Exception as e:
+            print(f"Error precargando {filename}: {e}")
+            state = 'failed'
+        self._set_state(filename, state)
+
+    def state(self, filename):
+        """
+        Estado de carga de un dataset
+
+        Returns:
+            'queued', 'loading', 'ready', 'failed' o 'unloaded' (no cargado,
+            p. ej. nunca pedido o expulsado del registro)
+        """
+        with self._lock:
+            state = self._states.get(filename)
+        if state in ('queued', 'loading'):
+            return state
+        if self._registry.is_loading(filename):
+            return 'loading'
+        if self._registry.peek(filename) is not None:
+            return 'ready'
+        return 'failed' if state == 'failed' else 'unloaded'
+
+    def shutdown(self):
+        """Cancela las precargas pendientes y espera a las que están en curso"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+        with self._lock:
+            # Las precargas canceladas nunca empezaron
+            self._states = {f: s for f, s in self._states.items() if s != 'queued'}
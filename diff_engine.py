@@ -0,0 +1,144 @@
+# diff_engine.py
+"""
+Cambios entre estados consecutivos de una partida, calculados de una sola vez
+"""
+
+import numpy as np
+
+# Secciones de fichas en el orden de los planos de MahjongBatchParser.tile_planes()
+SECTIONS = ('hand', 'melds', 'discards', 'pond')
+SECTION_IDS = {name: section_id for section_id, name in enumerate(SECTIONS)}
+
+# Sección y jugador (relativo al POV de cada fila) de cada uno de los 13 planos
+_PLANE_SECTION = np.array([0] + [1] * 4 + [2] * 4 + [3] * 4, dtype=np.int8)
+_PLANE_PLAYER = np.array([0] + [0, 1, 2, 3] * 3, dtype=np.int8)
+
+# Un evento por celda que cambia entre la fila step y la fila step + 1
+EVENT_DTYPE = np.dtype([
+    ('step', np.int32),
+    ('player', np.int8),
+    ('section', np.int8),
+    ('tile', np.int8),
+    ('delta', np.int16),
+])
+
+
+def compute_events(planes):
+    """
+    Calcula los eventos de cambio entre filas consecutivas
+
+    Args:
+        planes: Array (N, 13, 34) de MahjongBatchParser.tile_planes()
+
+    Returns:
+        Array estructurado con dtype EVENT_DTYPE ordenado por step, sección,
+        jugador y ficha
+    """
+    num_rows, num_planes, num_tiles = planes.shape
+    deltas = np.diff(planes.astype(np.int16), axis=0)
+    positions = np.flatnonzero(deltas)
+
+    plane = positions // num_tiles % num_planes
+    events = np.empty(len(positions), dtype=EVENT_DTYPE)
+    events['step'] = positions // (num_planes * num_tiles)
+    events['player'] = _PLANE_PLAYER[plane]
+    events['section'] = _PLANE_SECTION[plane]
+    events['tile'] = positions % num_tiles
+    events['delta'] = deltas.reshape(-1)[positions]
+    return events
+
+
+def _planes_from_summaries(summaries):
+    """Reconstruye los planos (N, 13, 34) a partir de resúmenes de get_summary()"""
+    planes = np.zeros((len(summaries), len(_PLANE_SECTION), 34), dtype=np.int16)
+    for row, summary in enumerate(summaries):
+        details = [summary['hand_detail']]
+        for key in ('melds_detail', 'discards_detail', 'pond_detail'):
+            details.extend(summary[key].get(player_id, []) for player_id in range(4))
+        for plane, tiles in enumerate(details):
+            for tile_type, count in tiles:
+                planes[row, plane, tile_type] = count
+    return planes
+
+
+class SequentialDiff:
+    """Lista dispersa de cambios entre estados consecutivos
+
+    El paso ``step`` es la transición de la fila ``step`` a la fila
+    ``step + 1``. Los jugadores son índices relativos al POV de cada fila,
+    igual que en las secciones del vector.
+    """
+
+    def __init__(self, planes):
+        """
+        Inicializa el diff
+
+        Args:
+            planes: Array (N, 13, 34) de MahjongBatchParser.tile_planes()
+        """
+        self.num_steps = max(0, planes.shape[0] - 1)
+        self.events = compute_events(planes)
+        # Inicio de los eventos de cada paso dentro de self.events
+        self._step_starts = np.searchsorted(self.events['step'], np.arange(self.num_steps + 1))
+
+    @classmethod
+    def from_batch(cls, batch):
+        """Crea el diff a partir de un MahjongBatchParser"""
+        return cls(batch.tile_planes())
+
+    @classmethod
+    def from_summaries(cls, summaries):
+        """Crea el diff a partir de una lista de resúmenes de get_summary()"""
+        return cls(_planes_from_summaries(summaries))
+
+    def __len__(self):
+        return len(self.events)
+
+    def step_events(self, step, section=None, player=None):
+        """
+        Eventos de una transición, opcionalmente filtrados
+
+        Args:
+            step: Índice de la transición (fila step -> fila step + 1)
+            section: Nombre de sección ('hand', 'melds', 'discards', 'pond')
+            player: Jugador relativo (0-3)
+
+        Returns:
+            Array estructurado con dtype EVENT_DTYPE
+        """
+        events = self.events[self._step_starts[step]:self._step_starts[step + 1]]
+        if section is not None:
+            events = events[events['section'] == SECTION_IDS[section]]
+        if player is not None:
+            events = events[events['player'] == player]
+        return events
+
+    def section_events(self, section):
+        """Todos los eventos de una sección"""
+        return self.events[self.events['section'] == SECTION_IDS[section]]
+
+    def meld_changes(self):
+        """
+        Melds nuevos o ampliados en cada transición
+
+        Returns:
+            Lista de diccionarios con from_matrix, to_matrix, player y
+            new_melds (lista de {'type', 'count'}), en orden de paso y jugador
+        """
+        events = self.section_events('melds')
+        events = events[events['delta'] > 0]
+        groups = events['step'].astype(np.int64) * 4 + events['player']
+        _, starts = np.unique(groups, return_index=True)
+
+        changes = []
+        for start, end in zip(starts, np.append(starts[1:], len(events))):
+            group = events[start:end]
+            step = int(group['step'][0])
+            changes.append({
+                'from_matrix': step + 1,
+                'to_matrix': step + 2,
+                'player': int(group['player'][0]),
+                'new_melds': [{'type': int(tile), 'count': int(delta)}
+                              for tile, delta in zip(group['tile'], group['delta'])]
+            })
+        return changes
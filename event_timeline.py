@@ -0,0 +1,291 @@
+# event_timeline.py
+"""
+Línea de tiempo de eventos de partida extraída de estados consecutivos
+"""
+
+import numpy as np
+
+# Tipos de evento en el orden de sus códigos
+EVENT_TYPES = ('draw', 'discard', 'chi', 'pon', 'kan', 'riichi', 'dora')
+EVENT_CODES = {name: code for code, name in enumerate(EVENT_TYPES)}
+
+# Orden de los eventos de un mismo turno dentro de una transición
+_KIND_ORDER = {'chi': 0, 'pon': 0, 'kan': 0, 'discard': 1, 'riichi': 2, 'draw': 3, 'dora': 4}
+# Las llamadas reclaman un descarte, así que van tras los turnos de la transición
+_AFTER_TURNS = 4
+
+NO_PLAYER = -1
+UNKNOWN_TILE = -1
+
+
+def _round_ids(batch):
+    """
+    Identificador de mano (ronda) de cada fila
+
+    Empieza una nueva mano cuando cambia la ronda, el viento o el honba, o
+    cuando el muro vuelve a llenarse.
+    """
+    new_round = np.zeros(len(batch), dtype=bool)
+    if len(batch) > 1:
+        for field in ('round_number', 'round_wind', 'honba_sticks'):
+            values = getattr(batch, field)
+            new_round[1:] |= values[1:] != values[:-1]
+        new_round[1:] |= batch.wall_tiles[1:] > batch.wall_tiles[:-1]
+    return np.cumsum(new_round)
+
+
+def _to_absolute(section, pov):
+    """Reordena una sección (N, 4, 34) de jugadores relativos al POV a asientos absolutos"""
+    relative = (np.arange(4)[None, :] - pov[:, None]) % 4
+    return np.take_along_axis(section, relative[:, :, None], axis=1)
+
+
+def _riichi_absolute(batch):
+    """
+    Estado de riichi por asiento absoluto (N, 4); -1 para el POV, que no aparece
+
+    La entrada j de riichi_status corresponde al jugador relativo j + 1.
+    """
+    pov = batch.pov_player.astype(np.int64)
+    flags = np.full((len(batch), 4), -1, dtype=np.int8)
+    rows = np.arange(len(batch))
+    for j in range(batch.riichi_status.shape[1]):
+        flags[rows, (pov + j + 1) % 4] = batch.riichi_status[:, j] > 0
+    return flags
+
+
+def _previous_same_seat(pov, rounds):
+    """Fila anterior de la misma mano en la que el POV era el mismo asiento (-1 si no hay)"""
+    rows = np.arange(len(pov))
+    previous = np.full(len(pov), -1, dtype=np.int64)
+    for seat in range(4):
+        seen = np.where(pov == seat, rows, -1)
+        last = np.maximum.accumulate(seen)
+        # Última aparición estrictamente anterior a cada fila
+        before = np.concatenate(([-1], last[:-1]))
+        previous = np.where(pov == seat, before, previous)
+    valid = previous >= 0
+    valid[valid] &= rounds[previous[valid]] == rounds[valid]
+    return np.where(valid, previous, -1)
+
+
+class EventTimeline:
+    """Tabla columnar de eventos con índices por tipo, jugador y ficha
+
+    Cada evento tiene la fila (estado) en la que se observa por primera vez,
+    la mano, el step, el asiento absoluto del jugador (-1 si no aplica), el
+    tipo y la ficha (-1 si no se puede conocer). Los robos solo se registran
+    para el jugador cuyo estado sigue a la transición y la ficha robada solo
+    se identifica cuando se puede deducir de su estado anterior; el riichi se
+    registra en el primer estado en el que es visible (el POV no ve el suyo).
+    """
+
+    COLUMNS = ('row', 'round', 'step', 'player', 'type', 'tile')
+
+    def __init__(self, columns):
+        """
+        Inicializa la tabla
+
+        Args:
+            columns: Diccionario con un array por cada nombre de COLUMNS,
+                todos de la misma longitud
+        """
+        order = np.lexsort((columns.pop('_order'), columns['row'])) if '_order' in columns else None
+        self.columns = {name: (columns[name] if order is None else columns[name][order]) for name in self.COLUMNS}
+        self.indexes = {
+            'type': self._build_index(self.columns['type'], len(EVENT_TYPES)),
+            'player': self._build_index(self.columns['player'] + 1, 5),
+            'tile': self._build_index(self.columns['tile'] + 1, 35),
+        }
+
+    @staticmethod
+    def _build_index(values, size):
+        """Índice invertido: para cada valor, las posiciones (ordenadas) de sus eventos"""
+        order = np.argsort(values, kind='stable')
+        bounds = np.cumsum(np.bincount(values, minlength=size))[:-1]
+        return np.split(order, bounds)
+
+    def __len__(self):
+        return len(self.columns['row'])
+
+    @property
+    def nbytes(self):
+        """Memoria de las columnas y los índices"""
+        return sum(column.nbytes for column in self.columns.values()) + sum(
+            part.nbytes for index in self.indexes.values() for part in index
+        )
+
+    @classmethod
+    def from_batch(cls, batch):
+        """
+        Extrae los eventos de todas las transiciones entre estados consecutivos
+
+        Args:
+            batch: MahjongBatchParser del dataset
+
+        Returns:
+            EventTimeline
+        """
+        pov = batch.pov_player.astype(np.int64)
+        rounds = _round_ids(batch)
+        pond = _to_absolute(batch.pond, pov).astype(np.int16)
+        melds = _to_absolute(batch.melds, pov).astype(np.int16)
+
+        parts = []
+
+        def add(rows, players, event_type, tiles, turn):
+            rows = np.asarray(rows, dtype=np.int64)
+            parts.append({
+                'row': rows,
+                'player': np.asarray(players, dtype=np.int64),
+                'type': np.full(len(rows), EVENT_CODES[event_type], dtype=np.int64),
+                'tile': np.asarray(tiles, dtype=np.int64),
+                '_order': np.asarray(turn, dtype=np.int64) * 8 + _KIND_ORDER[event_type],
+            })
+
+        # Transiciones i -> i + 1 dentro de la misma mano
+        same_round = rounds[1:] == rounds[:-1]
+        steps = np.flatnonzero(same_round)
+        # Posición en el orden de turnos a partir del POV de la fila anterior
+        turn_of = lambda transition, seat: (seat - pov[transition]) % 4
+
+        # Descartes: fichas nuevas en el pond de cada asiento
+        pond_delta = np.diff(pond, axis=0)[steps]
+        transition, seat, tile = np.nonzero(pond_delta > 0)
+        repeats = pond_delta[transition, seat, tile]
+        transition = steps[transition]
+        add(np.repeat(transition + 1, repeats), np.repeat(seat, repeats), 'discard',
+            np.repeat(tile, repeats), np.repeat(turn_of(transition, seat), repeats))
+
+        # Llamadas: fichas nuevas en los melds de cada asiento, agrupadas por transición
+        meld_delta = np.diff(melds, axis=0)[steps]
+        transition, seat, tile = np.nonzero(meld_delta > 0)
+        callers = set()
+        groups = transition * 4 + seat
+        _, starts = np.unique(groups, return_index=True)
+        for start, end in zip(starts, np.append(starts[1:], len(groups))):
+            t, s = steps[transition[start]], seat[start]
+            tiles = tile[start:end]
+            deltas = meld_delta[transition[start], s, tiles]
+            if deltas.max() >= 4 or (deltas.sum() == 1 and melds[t + 1, s, tiles[0]] == 4):
+                event_type, event_tile = 'kan', tiles[deltas.argmax()]
+            elif deltas.max() >= 3:
+                event_type, event_tile = 'pon', tiles[deltas.argmax()]
+            else:
+                event_type, event_tile = 'chi', tiles.min()
+            if event_type != 'kan':
+                # Tras un kan se roba del muro muerto; tras chi/pon no se roba
+                callers.add((t, s))
+            add([t + 1], [s], event_type, [event_tile], [_AFTER_TURNS])
+
+        # Riichi: primera fila de la mano en la que el asiento aparece en riichi
+        riichi = _riichi_absolute(batch)
+        row, seat = np.nonzero(riichi == 1)
+        keys = rounds[row] * 4 + seat
+        _, first = np.unique(keys, return_index=True)
+        row, seat = row[first], seat[first]
+        in_round = (row > 0) & (rounds[np.maximum(row - 1, 0)] == rounds[row])
+        add(row, seat, 'riichi', np.full(len(row), UNKNOWN_TILE),
+            np.where(in_round, turn_of(np.maximum(row - 1, 0), seat), 0))
+
+        # Robos: el POV de la fila siguiente robó si el muro bajó y no hizo chi/pon
+        drawn = steps[batch.wall_tiles[steps + 1] < batch.wall_tiles[steps]]
+        drawn = np.array([t for t in drawn if (t, pov[t + 1]) not in callers], dtype=np.int64)
+        row = drawn + 1
+        seat = pov[row]
+        tiles = np.full(len(row), UNKNOWN_TILE, dtype=np.int64)
+        previous = _previous_same_seat(pov, rounds)[row]
+        known = np.flatnonzero(previous >= 0)
+        if len(known):
+            r, p, s = row[known], previous[known], seat[known]
+            # mano actual - mano anterior + descartado desde entonces = robado
+            hand = batch.hand[r].astype(np.int16) - batch.hand[p].astype(np.int16)
+            candidate = hand + pond[r, s] - pond[p, s]
+            unique = ((candidate >= 0).all(axis=1) & (candidate.sum(axis=1) == 1)
+                      & (melds[r, s] == melds[p, s]).all(axis=1))
+            tiles[known[unique]] = candidate[unique].argmax(axis=1)
+        add(row, seat, 'draw', tiles, turn_of(drawn, seat))
+
+        # Dora: indicadores al inicio de cada mano y los que aparecen después
+        dora = batch.dora > 0
+        starts = np.flatnonzero(np.concatenate(([True], ~same_round)))[:len(batch)]
+        row, tile = np.nonzero(dora[starts])
+        add(starts[row], np.full(len(row), NO_PLAYER), 'dora', tile, np.full(len(row), _AFTER_TURNS))
+        revealed = dora[steps + 1] & ~dora[steps]
+        transition, tile = np.nonzero(revealed)
+        add(steps[transition] + 1, np.full(len(tile), NO_PLAYER), 'dora', tile, np.full(len(tile), _AFTER_TURNS))
+
+        columns = {name: np.concatenate([part[name] for part in parts]) for name in ('row', 'player', 'type', 'tile', '_order')}
+        row = columns['row']
+        columns['round'] = rounds[row].astype(np.int32)
+        columns['step'] = batch.step_number[row].astype(np.int8)
+        columns['row'] = row.astype(np.int32)
+        for name in ('player', 'type', 'tile'):
+            columns[name] = columns[name].astype(np.int8)
+        return cls(columns)
+
+    def query(self, event_type=None, player=None, tile=None):
+        """
+        Posiciones de los eventos que cumplen todos los filtros indicados
+
+        Args:
+            event_type: Nombre del tipo de evento (EVENT_TYPES)
+            player: Asiento absoluto (0-3)
+            tile: Número de ficha (0-33)
+
+        Returns:
+            Array de posiciones en orden cronológico
+        """
+        filters = []
+        if event_type is not None:
+            filters.append(('type', EVENT_CODES[event_type]))
+        if player is not None:
+            filters.append(('player', player))
+        if tile is not None:
+            filters.append(('tile', tile))
+        if not filters:
+            return np.arange(len(self))
+
+        # Se parte del índice más selectivo y se filtra por las demás columnas
+        candidates = [(self._lookup(name, value), name, value) for name, value in filters]
+        candidates.sort(key=lambda candidate: len(candidate[0]))
+        positions = candidates[0][0]
+        for _, name, value in candidates[1:]:
+            positions = positions[self.columns[name][positions] == value]
+        return positions
+
+    def _lookup(self, name, value):
+        """Posiciones de los eventos con un valor en la columna indexada"""
+        key = value if name == 'type' else value + 1
+        index = self.indexes[name]
+        if not 0 <= key < len(index):
+            return np.zeros(0, dtype=np.int64)
+        return index[key]
+
+    def records(self, positions, tile_names=None):
+        """
+        Convierte posiciones de eventos en diccionarios
+
+        Args:
+            positions: Posiciones devueltas por query()
+            tile_names: Diccionario opcional número de ficha -> nombre
+
+        Returns:
+            Lista de diccionarios con matrix (1-based), round, step, player,
+            type y tile (y tile_name si se indican nombres)
+        """
+        columns = {name: self.columns[name][positions].tolist() for name in self.COLUMNS}
+        records = []
+        for i in range(len(positions)):
+            record = {
+                'matrix': columns['row'][i] + 1,
+                'round': columns['round'][i],
+                'step': columns['step'][i],
+                'player': columns['player'][i],
+                'type': EVENT_TYPES[columns['type'][i]],
+                'tile': columns['tile'][i]
+            }
+            if tile_names is not None:
+                record['tile_name'] = tile_names.get(record['tile']) if record['tile'] >= 0 else None
+            records.append(record)
+        return records
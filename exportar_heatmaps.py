@@ -0,0 +1,229 @@
+# exportar_heatmaps.py
+"""
+Exportación en paralelo de heatmaps PNG de datasets completos
+
+Reparte los tableros entre un pool de procesos con backend de matplotlib sin
+ventana (Agg); cada proceso reutiliza sus figuras entre renders. Los PNG que
+ya existen no se vuelven a generar, así que una exportación interrumpida se
+puede reanudar.
+
+Uso:
+    python exportar_heatmaps.py [carpeta | archivo.npz | archivo.npy ...]
+        [--rows INICIO:FIN] [--output CARPETA] [--renderer seaborn|raster]
+        [--workers N] [--force]
+"""
+
+import os
+
+# Sin ventanas: el backend se fija antes de que nadie importe pyplot (los
+# procesos del pool heredan la variable de entorno)
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+import argparse
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from config import CONFIG, SYMBOLS
+from matrix_loader import STATE_SIZE, load_matrix
+
+# Tableros por tarea enviada al pool
+CHUNK_SIZE = 16
+
+# Matrices ya abiertas en cada proceso del pool
+_sources = {}
+
+
+def board_filename(row):
+    """Nombre del PNG de una fila (mismo formato que generaba test.py)"""
+    return f"mahjong_board_{row + 1}_black.png"
+
+
+def _open_source(filepath):
+    """Abre (una vez por proceso) la matriz de un .npz o .npy"""
+    matrix = _sources.get(filepath)
+    if matrix is None:
+        if filepath.endswith('.npy'):
+            matrix = np.load(filepath, mmap_mode='r')[:, :STATE_SIZE]
+        else:
+            matrix = load_matrix(filepath)
+        _sources[filepath] = matrix
+    return matrix
+
+
+def _board(source, row):
+    """Tablero 15x34 de una fila; source es la ruta de la matriz o el propio tablero"""
+    if isinstance(source, str):
+        return np.asarray(_open_source(source)[row]).reshape(15, 34)
+    return np.asarray(source).reshape(15, 34)
+
+
+def _write_atomic(path, data):
+    """Escribe un archivo de forma atómica (no quedan PNG a medias si se interrumpe)"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _render_chunk(jobs, renderer):
+    """
+    Renderiza y guarda un bloque de tableros (se ejecuta en un proceso del pool)
+
+    Args:
+        jobs: Lista de tuplas (ruta de salida, origen, fila)
+        renderer: Renderizador de maps.render_mahjong_heatmap_png
+
+    Returns:
+        Número de tableros exportados
+    """
+    from maps import render_mahjong_heatmap_png
+
+    for out_path, source, row in jobs:
+        _write_atomic(out_path, render_mahjong_heatmap_png(_board(source, row), renderer))
+    return len(jobs)
+
+
+def plan_exports(source, output_dir, rows=None, num_rows=None, force=False):
+    """
+    Lista los tableros de una matriz que hay que exportar
+
+    Args:
+        source: Ruta del .npz/.npy, o array (N, 510) en memoria
+        output_dir: Carpeta de salida (se crea si no existe)
+        rows: slice de filas a exportar (por defecto todas)
+        num_rows: Número de filas de la matriz (se calcula si es None)
+        force: Regenerar también los PNG que ya existen
+
+    Returns:
+        Tupla (trabajos (ruta de salida, origen, fila), número de omitidos)
+    """
+    if num_rows is None:
+        num_rows = len(_open_source(source)) if isinstance(source, str) else len(source)
+    os.makedirs(output_dir, exist_ok=True)
+    existing = set() if force else set(os.listdir(output_dir))
+
+    jobs = []
+    selected = range(num_rows)[rows or slice(None)]
+    for row in selected:
+        name = board_filename(row)
+        if name in existing:
+            continue
+        job_source = source if isinstance(source, str) else source[row]
+        jobs.append((os.path.join(output_dir, name), job_source, row))
+    return jobs, len(selected) - len(jobs)
+
+
+def export_jobs(jobs, renderer='seaborn', workers=None, progress=True):
+    """
+    Renderiza los trabajos en un pool de procesos
+
+    Args:
+        jobs: Trabajos devueltos por plan_exports
+        renderer: 'seaborn' o 'raster'
+        workers: Número de procesos (por defecto el número de CPUs)
+        progress: Mostrar el progreso en la consola
+
+    Returns:
+        Tupla (tableros exportados, segundos)
+    """
+    start = time.perf_counter()
+    if not jobs:
+        return 0, 0.0
+
+    chunks = [jobs[i:i + CHUNK_SIZE] for i in range(0, len(jobs), CHUNK_SIZE)]
+    workers = min(workers or os.cpu_count() or 1, len(chunks))
+    done = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_render_chunk, chunk, renderer) for chunk in chunks]
+        try:
+            for future in as_completed(futures):
+                done += future.result()
+                if progress:
+                    elapsed = time.perf_counter() - start
+                    print(f"\r  {done}/{len(jobs)} tableros  {done / elapsed:6.1f} tableros/s", end='', flush=True)
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+        finally:
+            if progress:
+                print()
+    return done, time.perf_counter() - start
+
+
+def _parse_rows(text):
+    """Convierte 'INICIO:FIN' (índices de fila, FIN exclusivo, ambos opcionales) en un slice"""
+    if text is None:
+        return None
+    start, sep, stop = text.partition(':')
+    if not sep:
+        raise argparse.ArgumentTypeError("Formato esperado INICIO:FIN")
+    try:
+        return slice(int(start) if start else None, int(stop) if stop else None)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Rango de filas no válido: {text}")
+
+
+def _sources_from_targets(targets):
+    """Expande carpetas y archivos a la lista de matrices a exportar"""
+    files = []
+    for target in targets:
+        if os.path.isdir(target):
+            files.extend(os.path.join(target, f) for f in sorted(os.listdir(target)) if f.endswith('.npz'))
+        elif target.endswith(('.npz', '.npy')) and os.path.isfile(target):
+            files.append(target)
+        else:
+            print(f"{SYMBOLS['ALERTA']} Se ignora {target}: no es una carpeta ni un archivo .npz/.npy")
+    return files
+
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description="Exporta heatmaps PNG de datasets en paralelo")
+    parser.add_argument('targets', nargs='*', default=[CONFIG['data_folder']],
+                        help="Carpetas de datasets o archivos .npz/.npy (por defecto la carpeta de datasets)")
+    parser.add_argument('--rows', type=_parse_rows, default=None,
+                        help="Rango de filas INICIO:FIN (índices desde 0, FIN exclusivo)")
+    parser.add_argument('--output', default='resources', help="Carpeta de salida (una subcarpeta por dataset)")
+    parser.add_argument('--renderer', choices=('seaborn', 'raster'), default='seaborn')
+    parser.add_argument('--workers', type=int, default=None, help="Número de procesos")
+    parser.add_argument('--force', action='store_true', help="Regenerar los PNG existentes")
+    args = parser.parse_args()
+
+    files = _sources_from_targets(args.targets)
+    if not files:
+        print(f"{SYMBOLS['ALERTA']} No hay matrices que exportar")
+        return
+
+    jobs = []
+    skipped = 0
+    for filepath in files:
+        # La copia densa mapeada se crea aquí una vez y la comparten los procesos
+        matrix = load_matrix(filepath, convert=True) if filepath.endswith('.npz') else None
+        stem = os.path.splitext(os.path.basename(filepath))[0]
+        file_jobs, file_skipped = plan_exports(
+            filepath, os.path.join(args.output, stem), args.rows,
+            num_rows=len(matrix) if matrix is not None else None, force=args.force
+        )
+        jobs.extend(file_jobs)
+        skipped += file_skipped
+        del matrix
+
+    print(f"{SYMBOLS['TABLA']} {len(files)} matrices: {len(jobs)} tableros por exportar, "
+          f"{skipped} ya existentes")
+    try:
+        exported, elapsed = export_jobs(jobs, args.renderer, args.workers)
+    except KeyboardInterrupt:
+        print(f"\n⚠️ Exportación interrumpida: se reanudará desde los PNG ya escritos")
+        sys.exit(1)
+
+    if exported:
+        print(f"{SYMBOLS['TIEMPO']} {exported} tableros en {elapsed:.1f} s "
+              f"({exported / elapsed:.1f} tableros/s, renderizador {args.renderer})")
+
+
+if __name__ == "__main__":
+    main()
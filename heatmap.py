@@ -1,28 +1,18 @@
 # Standard imports
 import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
 
-# Needed for sparse matrix creation
-from scipy.sparse import csr_matrix
+# Carga dispersa que elimina la columna 510 sin densificar la matriz
+from matrix_loader import load_npz_matrix
 
 file = '2019010100gm-00a9-0000-1f1a5f1f.npz'
-npz = np.load(file)
-mat1 = np.array(csr_matrix((npz['data'], npz['indices'], npz['indptr']), shape=npz['shape']).toarray())
+store = load_npz_matrix(file)
 
-# Verificar las dimensiones originales
-print(f"Dimensiones originales de mat1: {mat1.shape}")
+# Verificar las dimensiones (la columna 510 ya se eliminó sobre el CSR)
+print(f"Dimensiones de la matriz sin el elemento 510: {store.shape}")
 
-print(mat1[0])  
-
-if mat1.shape[1] > 510:
-    mat1 = np.delete(mat1, 510, axis=1)
-    print(f"Dimensiones después de eliminar elemento 510: {mat1.shape}")
-else:
-    print(f"No se puede eliminar el elemento 510. La matriz solo tiene {mat1.shape[1]} columnas.")
-
-print(f"Primera fila después de la modificación: {mat1[0]}")
+print(f"Primera fila después de la modificación: {store.row(0)}")
 
 # Guardar la matriz modificada para usar en test.py
+mat1 = store.toarray()
 np.save('modified_matrix.npy', mat1)
-print("Matriz modificada guardada en 'modified_matrix.npy'")
\ No newline at end of file
+print("Matriz modificada guardada en 'modified_matrix.npy'")
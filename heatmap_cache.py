@@ -0,0 +1,208 @@
+# heatmap_cache.py
+"""
+Caché de imágenes de heatmaps indexada por contenido del dataset
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+
+class HeatmapCache:
+    """Caché LRU en memoria de imágenes PNG con una capa opcional en disco"""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, disk_dir=None, max_disk_bytes=None):
+        """
+        Inicializa la caché
+
+        Args:
+            max_bytes: Tamaño máximo en memoria (bytes de PNG)
+            disk_dir: Carpeta para la capa en disco (None la desactiva)
+            max_disk_bytes: Tamaño máximo de la capa en disco (None sin límite)
+        """
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        # Renders en curso: clave -> Event que se activa al terminar
+        self._inflight = {}
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(dataset_digest, matrix_index, color, renderer='seaborn'):
+        """Construye la clave de caché de un heatmap"""
+        return (dataset_digest, int(matrix_index), color, renderer)
+
+    def _disk_path(self, key):
+        dataset_digest, matrix_index, color, renderer = key
+        return os.path.join(self.disk_dir, f"{dataset_digest}_{matrix_index}_{color}_{renderer}.png")
+
+    def _store(self, key, png_bytes):
+        """Inserta en memoria y expulsa las entradas menos usadas (con el lock tomado)"""
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._size -= len(previous)
+        if len(png_bytes) > self.max_bytes:
+            return
+        self._entries[key] = png_bytes
+        self._size += len(png_bytes)
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+    def get(self, key):
+        """Retorna los bytes PNG de una clave o None si no está en caché"""
+        with self._lock:
+            png_bytes = self._entries.get(key)
+            if png_bytes is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return png_bytes
+
+        if self.disk_dir:
+            path = self._disk_path(key)
+            try:
+                with open(path, 'rb') as f:
+                    png_bytes = f.read()
+                os.utime(path)
+            except OSError:
+                png_bytes = None
+            if png_bytes is not None:
+                with self._lock:
+                    self._store(key, png_bytes)
+                    self.disk_hits += 1
+                return png_bytes
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def contains(self, key):
+        """Indica si una clave está en caché (memoria o disco) sin contarla como acceso"""
+        with self._lock:
+            if key in self._entries:
+                return True
+        return bool(self.disk_dir) and os.path.exists(self._disk_path(key))
+
+    def put(self, key, png_bytes):
+        """Guarda los bytes PNG de una clave en memoria (y en disco si está activo)"""
+        with self._lock:
+            self._store(key, png_bytes)
+
+        if self.disk_dir:
+            path = self._disk_path(key)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            try:
+                with open(tmp_path, 'wb') as f:
+                    f.write(png_bytes)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                print(f"Error escribiendo heatmap en caché de disco: {e}")
+            else:
+                self._trim_disk()
+
+    def get_or_render(self, key, render):
+        """
+        Retorna la imagen cacheada o la genera con render() y la guarda
+
+        Args:
+            key: Clave construida con make_key
+            render: Función sin argumentos que retorna los bytes PNG (o None)
+        """
+        png_bytes = self.get(key)
+        if png_bytes is None:
+            png_bytes = self._render_once(key, render)
+        return png_bytes
+
+    def prerender(self, key, render):
+        """
+        Renderiza y guarda una imagen si no está en caché ni se está renderizando
+
+        No cuenta como acceso en las estadísticas (para renders especulativos).
+
+        Returns:
+            True si se renderizó la imagen
+        """
+        with self._lock:
+            if key in self._entries or key in self._inflight:
+                return False
+        if self.disk_dir and os.path.exists(self._disk_path(key)):
+            return False
+        return self._render_once(key, render) is not None
+
+    def _render_once(self, key, render):
+        """
+        Renderiza una clave una sola vez aunque la pidan varios hilos a la vez
+
+        Quien llega mientras otro hilo renderiza la misma clave espera a ese
+        render en lugar de repetirlo.
+        """
+        with self._lock:
+            event = self._inflight.get(key)
+            owner = event is None
+            if owner:
+                event = self._inflight[key] = threading.Event()
+
+        if not owner:
+            event.wait()
+            with self._lock:
+                png_bytes = self._entries.get(key)
+            if png_bytes is not None:
+                return png_bytes
+            # El otro render falló o la entrada ya se expulsó
+            return self._render_once(key, render)
+
+        try:
+            png_bytes = render()
+            if png_bytes is not None:
+                self.put(key, png_bytes)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            event.set()
+        return png_bytes
+
+    def _trim_disk(self):
+        """Elimina los PNG de disco menos usados hasta respetar max_disk_bytes"""
+        if not self.max_disk_bytes:
+            return
+        files = []
+        total = 0
+        for entry in os.scandir(self.disk_dir):
+            if entry.name.endswith('.png'):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        for _, size, path in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    def clear(self):
+        """Vacía la capa en memoria"""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        """Retorna contadores de uso de la caché"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._size,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses
+            }
@@ -0,0 +1,123 @@
+# heatmap_prerender.py
+"""
+Cola de renderizado especulativo de heatmaps en segundo plano
+"""
+
+import threading
+from collections import deque
+
+
+class HeatmapPrerenderQueue:
+    """Cola acotada que renderiza heatmaps en un hilo de fondo y los guarda en la caché
+
+    Los trabajos se agrupan por contexto (p. ej. el cliente que navega por
+    el detalle). Encolar trabajos para un contexto cancela los pendientes
+    que quedaban de ese mismo contexto: ya no son relevantes porque el
+    usuario saltó a otra matriz. Si la cola está llena se descartan los
+    trabajos más antiguos.
+    """
+
+    def __init__(self, cache, max_pending=16):
+        """
+        Inicializa la cola
+
+        Args:
+            cache: HeatmapCache donde se guardan las imágenes
+            max_pending: Número máximo de trabajos pendientes
+        """
+        self._cache = cache
+        self._pending = deque(maxlen=max_pending)
+        self._generations = {}
+        self._condition = threading.Condition()
+        self._worker = None
+        self._stopped = False
+        self.rendered = 0
+        self.skipped = 0
+
+    def schedule(self, context, jobs):
+        """
+        Reemplaza los trabajos pendientes de un contexto
+
+        Args:
+            context: Identificador hashable del contexto
+            jobs: Lista de tuplas (clave de caché, función sin argumentos que
+                retorna los bytes PNG) en orden de prioridad
+        """
+        # Fuera del lock: contains() puede consultar el disco
+        jobs = [(key, render) for key, render in jobs if not self._cache.contains(key)]
+        with self._condition:
+            generation = self._generations.get(context, 0) + 1
+            self._generations[context] = generation
+            # Quitar los trabajos obsoletos para que no ocupen sitio en la cola
+            stale = [job for job in self._pending if job[0] == context]
+            for job in stale:
+                self._pending.remove(job)
+            self.skipped += len(stale)
+            if self._stopped:
+                return
+            for key, render in jobs:
+                self._pending.append((context, generation, key, render))
+            self._forget_idle_contexts()
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name='heatmap-prerender', daemon=True)
+                self._worker.start()
+            self._condition.notify()
+
+    def cancel(self, context):
+        """Descarta los trabajos pendientes de un contexto"""
+        self.schedule(context, [])
+
+    def shutdown(self):
+        """Descarta los trabajos pendientes y espera a que termine el render en curso"""
+        with self._condition:
+            self._stopped = True
+            self._pending.clear()
+            worker = self._worker
+            self._condition.notify()
+        if worker is not None:
+            worker.join()
+
+    def _next_job(self):
+        """Espera y retorna el siguiente trabajo vigente (None al detener la cola)"""
+        with self._condition:
+            while True:
+                while not self._pending and not self._stopped:
+                    self._condition.wait()
+                if self._stopped:
+                    return None
+                context, generation, key, render = self._pending.popleft()
+                current = self._generations.get(context)
+                self._forget_idle_contexts()
+                if generation == current:
+                    return key, render
+                self.skipped += 1
+
+    def _forget_idle_contexts(self):
+        """Olvida la generación de los contextos sin trabajos pendientes (con el lock tomado)
+
+        Así el diccionario no crece con cada cliente que pasó por el
+        servidor: como mucho tiene una entrada por trabajo pendiente.
+        """
+        active = {job[0] for job in self._pending}
+        for context in [c for c in self._generations if c not in active]:
+            del self._generations[context]
+
+    def _run(self):
+        """Bucle del hilo de fondo"""
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            try:
+                rendered = self._cache.prerender(*job)
+            except Exception as e:
+                print(f"Error prerenderizando heatmap: {e}")
+                continue
+            if rendered:
+                with self._condition:
+                    self.rendered += 1
+
+    def stats(self):
+        """Retorna contadores de la cola"""
+        with self._condition:
+            return {'pending': len(self._pending), 'rendered': self.rendered, 'skipped': self.skipped}
@@ -0,0 +1,70 @@
+# json_provider.py
+"""
+Serialización JSON de las respuestas del dashboard con soporte nativo de NumPy
+"""
+
+import numpy as np
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional: sin él se usa el módulo json estándar
+    orjson = None
+
+
+def _numpy_default(obj):
+    """Convierte escalares y arrays de NumPy a tipos nativos (solo se llama para tipos desconocidos)"""
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.integer):
+        return int(obj)
+    if isinstance(obj, np.floating):
+        return float(obj)
+    if isinstance(obj, np.bool_):
+        return bool(obj)
+    return DefaultJSONProvider.default(obj)
+
+
+class NumpyJSONProvider(DefaultJSONProvider):
+    """Proveedor JSON de Flask que serializa tipos de NumPy sin recorrer la respuesta
+
+    Con orjson instalado los arrays se convierten en bloque y la codificación
+    se hace en C; sin orjson se usa json con un ``default`` que solo se invoca
+    para los valores que json no sabe serializar.
+    """
+
+    default = staticmethod(_numpy_default)
+
+    def _orjson_options(self, indent=False):
+        options = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def _dumps_bytes(self, obj, indent=False):
+        """Codifica con orjson; retorna None si el objeto no es compatible"""
+        if orjson is None:
+            return None
+        try:
+            return orjson.dumps(obj, default=self.default, option=self._orjson_options(indent))
+        except (orjson.JSONEncodeError, TypeError):
+            # p. ej. claves de diccionario que orjson no admite
+            return None
+
+    def dumps(self, obj, **kwargs):
+        if not kwargs:
+            data = self._dumps_bytes(obj)
+            if data is not None:
+                return data.decode('utf-8')
+        return super().dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        data = self._dumps_bytes(obj, indent)
+        if data is None:
+            return super().response(obj)
+        return self._app.response_class(data, mimetype=self.mimetype)
+
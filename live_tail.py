@@ -0,0 +1,163 @@
+# live_tail.py
+"""
+Seguimiento de datasets que crecen mientras se graba una partida
+
+El grabador reescribe el .npz con los estados nuevos al final de la
+matriz. DatasetTail detecta el cambio por tamaño y fecha de modificación
+del archivo, comprueba que las filas ya leídas siguen iguales y retorna
+solo las añadidas; GrowableRows guarda filas o registros en un buffer con
+capacidad de sobra, así que añadir no copia lo ya cargado.
+"""
+
+import os
+import zipfile
+
+import numpy as np
+
+from matrix_loader import load_npz_matrix
+
+# Capacidad mínima de un GrowableRows (filas)
+MIN_CAPACITY = 64
+
+
+def file_signature(filepath):
+    """Tamaño y fecha de modificación de un archivo (cambian al reescribirlo)"""
+    stat = os.stat(filepath)
+    return stat.st_size, stat.st_mtime_ns
+
+
+class GrowableRows:
+    """Array que crece por el final con capacidad que se duplica al llenarse
+
+    ``rows`` es una vista de las filas ocupadas; las vistas obtenidas antes
+    de una ampliación siguen siendo válidas (apuntan al buffer anterior).
+    """
+
+    def __init__(self, initial):
+        """
+        Inicializa el buffer con una copia de las filas iniciales
+
+        Args:
+            initial: Array (N, ...) o estructurado (N,) con las filas ya cargadas
+        """
+        initial = np.asarray(initial)
+        self._buffer = np.empty((max(2 * len(initial), MIN_CAPACITY),) + initial.shape[1:], dtype=initial.dtype)
+        self._buffer[:len(initial)] = initial
+        self._size = len(initial)
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def rows(self):
+        """Vista de las filas ocupadas"""
+        return self._buffer[:self._size]
+
+    @property
+    def nbytes(self):
+        """Memoria del buffer (incluida la capacidad libre)"""
+        return self._buffer.nbytes
+
+    def append(self, rows):
+        """
+        Añade filas al final
+
+        Args:
+            rows: Array con la misma forma por fila y tipo que el buffer
+
+        Returns:
+            Vista de todas las filas ocupadas
+        """
+        end = self._size + len(rows)
+        if end > len(self._buffer):
+            buffer = np.empty((max(end, 2 * len(self._buffer)),) + self._buffer.shape[1:], dtype=self._buffer.dtype)
+            buffer[:self._size] = self._buffer[:self._size]
+            self._buffer = buffer
+        self._buffer[self._size:end] = rows
+        self._size = end
+        return self.rows
+
+
+class DatasetTail:
+    """Filas añadidas a un dataset .npz desde la última lectura"""
+
+    def __init__(self, filepath, matrix, signature=None):
+        """
+        Inicializa el seguimiento a partir de lo ya cargado
+
+        Args:
+            filepath: Ruta al archivo .npz
+            matrix: Filas ya cargadas (array denso o SparseMatrixStore); solo
+                se usan en la primera lectura para comprobar que no cambiaron
+            signature: file_signature() del archivo cuando se cargó
+        """
+        self.filepath = filepath
+        self.num_rows = len(matrix)
+        self.signature = signature
+        self._loaded = matrix
+        self._store = None
+        self._pending = None
+
+    def _same_prefix(self, store):
+        """Indica si las primeras num_rows filas del almacén son las ya leídas"""
+        if len(store) < self.num_rows or store.shape[1] != self._width():
+            return False
+        if self._store is None:
+            # Primera lectura: se compara con la matriz cargada, fila a fila densa
+            loaded = self._loaded
+            previous = loaded.toarray() if hasattr(loaded, 'toarray') else np.asarray(loaded)
+            return np.array_equal(store.rows(0, self.num_rows), previous)
+
+        old = self._store
+        nnz = old.indptr[self.num_rows]
+        return (np.array_equal(store.indptr[:self.num_rows + 1], old.indptr[:self.num_rows + 1])
+                and np.array_equal(store.indices[:nnz], old.indices[:nnz])
+                and np.array_equal(store.data[:nnz], old.data[:nnz]))
+
+    def _width(self):
+        return self._store.shape[1] if self._store is not None else self._loaded.shape[1]
+
+    def _advance(self, signature, store):
+        """Da por leído el archivo con esa firma y ese contenido"""
+        self.signature = signature
+        self.num_rows = len(store)
+        self._store = store
+        self._loaded = None
+
+    def poll(self):
+        """
+        Comprueba si el archivo cambió y lee las filas nuevas
+
+        Si el archivo no se puede leer (p. ej. el grabador lo está
+        escribiendo) se considera sin cambios y se reintenta en la
+        siguiente consulta. Las filas de 'appended' solo se dan por leídas
+        al llamar a commit(): si no se pudieron incorporar, la siguiente
+        consulta las vuelve a retornar.
+
+        Returns:
+            Tupla (estado, filas): 'unchanged' y None; 'appended' y las filas
+            nuevas como array denso (M, columnas); o 'reset' y None si el
+            archivo se reescribió con otras filas
+        """
+        try:
+            signature = file_signature(self.filepath)
+            if signature == self.signature:
+                return 'unchanged', None
+            store = load_npz_matrix(self.filepath)
+        except (OSError, EOFError, KeyError, ValueError, zipfile.BadZipFile) as e:
+            print(f"No se pudo leer {self.filepath} (se reintentará): {e}")
+            return 'unchanged', None
+
+        if not self._same_prefix(store):
+            return 'reset', None
+        if len(store) == self.num_rows:
+            self._advance(signature, store)
+            return 'unchanged', None
+        self._pending = (signature, store)
+        return 'appended', store.rows(self.num_rows, len(store))
+
+    def commit(self):
+        """Da por leídas las filas que retornó el último poll() ('appended')"""
+        if self._pending is not None:
+            self._advance(*self._pending)
+            self._pending = None
@@ -1,4 +1,16 @@
+import queue
+import struct
+import threading
+import zlib
+from contextlib import contextmanager
+from functools import lru_cache
+from io import BytesIO
+
 from matplotlib import pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib import font_manager
+from matplotlib.ft2font import FT2Font
 import matplotlib.colors
 import seaborn as sns
 import numpy as np
@@ -42,14 +54,32 @@ def generate_mahjong_heatmap(
     """Generates and displays a simplified heatmap for a mahjong game state matrix."""
     assert input_matrix.ndim == 2, "Method expects a 2D matrix!"
 
-    # Usar valores fijos 
-    labels_top = LABELS_METADATA
-    labels_bottom = LABELS_MAHJONG_TILES
-    labels_left = LABELS_Y
-    figure_size = (18, 11)
-    colormap = "kaggle_mahjong"
-    
-    fig, ax_heatmap = plt.subplots(figsize=figure_size)
+    fig = _draw_seaborn_heatmap(input_matrix, title)
+    try:
+        if output_path:
+            fig.savefig(f"{output_path}.png", bbox_inches="tight")
+
+        if show_fig:
+            plt.show()
+    finally:
+        # Sin cerrar la figura pyplot la conserva y la memoria crece con cada llamada
+        plt.close(fig)
+
+
+HEATMAP_FIGSIZE = (18, 11)
+
+
+def _draw_seaborn_heatmap(input_matrix: np.ndarray, title: str = "", figure=None):
+    """Dibuja el heatmap con seaborn y retorna la figura.
+
+    Sin ``figure`` se crea una figura con pyplot (hay que cerrarla con
+    plt.close); con una Figure independiente no se registra en pyplot.
+    """
+    if figure is None:
+        fig, ax_heatmap = plt.subplots(figsize=HEATMAP_FIGSIZE)
+    else:
+        fig = figure
+        ax_heatmap = fig.add_subplot()
 
     # Parámetros del heatmap con valores fijos
     heatmap_params = {
@@ -57,8 +87,8 @@ def generate_mahjong_heatmap(
         "annot": True,
         "fmt": "g",
         "square": True,
-        "xticklabels": labels_bottom,
-        "yticklabels": labels_left,
+        "xticklabels": LABELS_MAHJONG_TILES,
+        "yticklabels": LABELS_Y,
         "annot_kws": {"fontsize": 11},
         "robust": True,
         "cbar": False,
@@ -78,13 +108,270 @@ def generate_mahjong_heatmap(
     # Agregar etiquetas en la parte superior
     secax = ax_seaborn.secondary_xaxis("top")
     secax.set_xticks(ax_seaborn.get_xticks())
-    secax.set_xticklabels(labels_top, rotation=90, fontsize=12)
+    secax.set_xticklabels(LABELS_METADATA, rotation=90, fontsize=12)
     secax.tick_params(axis="x", which="both", length=0)
 
     fig.tight_layout()
+    return fig
+
+
+class _PooledHeatmapFigure:
+    """Figura de heatmap ya dibujada cuyas celdas y textos se actualizan in situ."""
+
+    def __init__(self):
+        self.figure = Figure(figsize=HEATMAP_FIGSIZE)
+        FigureCanvasAgg(self.figure)
+        template = np.zeros((len(LABELS_Y), len(LABELS_MAHJONG_TILES)))
+        _draw_seaborn_heatmap(template, figure=self.figure)
+        ax = self.figure.axes[0]
+        self.mesh = ax.collections[0]
+        # seaborn crea una anotación por celda en orden de filas
+        self.texts = ax.texts
+
+    def update(self, input_matrix: np.ndarray):
+        """Actualiza colores y anotaciones con los valores de una matriz."""
+        values = np.asarray(input_matrix)
+        self.mesh.set_array(np.ma.masked_invalid(values.astype(float)))
+        for text, value in zip(self.texts, values.ravel().tolist()):
+            text.set_text(f"{value:g}")
+            text.set_color(_TEXT_COLORS[int(value) + 128])
+
+    def to_png(self) -> bytes:
+        buffer = BytesIO()
+        self.figure.savefig(buffer, format="png", bbox_inches="tight")
+        return buffer.getvalue()
+
+
+class HeatmapFigurePool:
+    """Conjunto acotado de figuras de heatmap reutilizables entre renders.
+
+    Cada figura se construye con seaborn una sola vez; después cada render
+    solo cambia los colores de las celdas y el texto de las anotaciones, de
+    modo que la memoria no crece con el número de renders.
+    """
+
+    def __init__(self, size: int = 2):
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def figure(self):
+        """Presta una figura del pool (espera si todas están en uso)."""
+        slot = None
+        with self._lock:
+            if self._idle.empty() and self._created < self.size:
+                self._created += 1
+                slot = _PooledHeatmapFigure()
+        if slot is None:
+            slot = self._idle.get()
+        try:
+            yield slot
+        finally:
+            self._idle.put(slot)
+
+    def render_png(self, input_matrix: np.ndarray) -> bytes:
+        """Renderiza una matriz con una figura del pool y retorna los bytes PNG."""
+        with self.figure() as slot:
+            slot.update(input_matrix)
+            return slot.to_png()
+
+
+_FIGURE_POOL = HeatmapFigurePool()
+
+
+def _render_seaborn_png(input_matrix: np.ndarray) -> bytes:
+    """Renderiza el heatmap con seaborn (figuras del pool) y retorna los bytes PNG."""
+    return _FIGURE_POOL.render_png(input_matrix)
+
+
+# --- Renderizador raster -------------------------------------------------
+# Pinta las celdas directamente en un buffer RGB de NumPy con glifos de texto
+# rasterizados una sola vez, evitando seaborn y el motor de dibujo de matplotlib.
+
+RASTER_DPI = 100
+RASTER_CELL = 48
+RASTER_LINE = 3
+RASTER_PAD = 8
+RASTER_ANNOT_SIZE = 11
+RASTER_LABEL_SIZE = 12
+
+
+def _build_color_lut():
+    """Colores RGB (uint8) de cada valor int8 según KAGGLE_MAHJONG_COLORMAP."""
+    cmap = matplotlib.colors.ListedColormap(KAGGLE_MAHJONG_COLORMAP["cmap"])
+    values = np.arange(-128, 128)
+    rgba = cmap(KAGGLE_MAHJONG_COLORMAP["norm"](values))
+    rgb = np.round(rgba[:, :3] * 255).astype(np.uint8)
+    # Mismo criterio que seaborn para el color del texto sobre cada celda
+    luminance = np.array([sns.utils.relative_luminance(c) for c in rgba])
+    text_rgb = np.where(
+        (luminance > 0.408)[:, None],
+        np.round(np.array(matplotlib.colors.to_rgb(".15")) * 255),
+        255,
+    ).astype(np.uint8)
+    return rgb, text_rgb
+
+
+@lru_cache(maxsize=None)
+def _font():
+    path = font_manager.findfont(font_manager.FontProperties(family="DejaVu Sans"))
+    return FT2Font(path)
+
+
+# FT2Font guarda estado entre llamadas y no es seguro entre hilos
+_font_lock = threading.Lock()
 
-    if output_path:
-        plt.savefig(f"{output_path}.png", bbox_inches="tight")
 
-    if show_fig:
-        plt.show()
\ No newline at end of file
+@lru_cache(maxsize=1024)
+def _glyph(text: str, size: int, rotated: bool = False) -> np.ndarray:
+    """Máscara alfa (float32 en [0, 1]) de un texto rasterizado con FreeType."""
+    with _font_lock:
+        font = _font()
+        font.set_size(size, RASTER_DPI)
+        font.set_text(text, 0.0)
+        font.draw_glyphs_to_bitmap(antialiased=True)
+        mask = np.asarray(font.get_image(), dtype=np.float32) / 255.0
+    if rotated:
+        mask = np.rot90(mask)
+    mask = np.ascontiguousarray(mask)
+    mask.flags.writeable = False
+    return mask
+
+
+@lru_cache(maxsize=None)
+def _raster_layout():
+    """Dimensiones del lienzo y posición de la rejilla (se calcula una vez)."""
+    left_width = max(_glyph(label, RASTER_LABEL_SIZE).shape[1] for label in LABELS_Y)
+    top_height = max(_glyph(label, RASTER_LABEL_SIZE, True).shape[0] for label in LABELS_METADATA)
+    bottom_height = max(_glyph(label, RASTER_LABEL_SIZE, True).shape[0] for label in LABELS_MAHJONG_TILES)
+    rows, cols = len(LABELS_Y), len(LABELS_MAHJONG_TILES)
+    grid_x = RASTER_PAD + left_width + RASTER_PAD
+    grid_y = RASTER_PAD + top_height + RASTER_PAD
+    width = grid_x + cols * RASTER_CELL + RASTER_LINE + RASTER_PAD
+    height = grid_y + rows * RASTER_CELL + RASTER_LINE + RASTER_PAD + bottom_height + RASTER_PAD
+    return width, height, grid_x, grid_y
+
+
+def _blend(canvas, mask, x, y, rgb):
+    """Mezcla un glifo de color rgb en el lienzo con esquina superior izquierda (x, y)."""
+    h, w = mask.shape
+    region = canvas[y:y + h, x:x + w]
+    alpha = mask[..., None]
+    region[...] = (region * (1.0 - alpha) + np.asarray(rgb, dtype=np.float32) * alpha).astype(np.uint8)
+
+
+@lru_cache(maxsize=None)
+def _raster_background():
+    """Lienzo con las etiquetas de los ejes ya dibujadas (solo lectura)."""
+    width, height, grid_x, grid_y = _raster_layout()
+    canvas = np.full((height, width, 3), 255, dtype=np.uint8)
+    black = (0, 0, 0)
+
+    for row, label in enumerate(LABELS_Y):
+        mask = _glyph(label, RASTER_LABEL_SIZE)
+        y = grid_y + row * RASTER_CELL + (RASTER_CELL - mask.shape[0]) // 2
+        _blend(canvas, mask, grid_x - RASTER_PAD - mask.shape[1], y, black)
+
+    bottom_y = grid_y + len(LABELS_Y) * RASTER_CELL + RASTER_LINE + RASTER_PAD
+    for col, (top, bottom) in enumerate(zip(LABELS_METADATA, LABELS_MAHJONG_TILES)):
+        center_x = grid_x + col * RASTER_CELL + RASTER_CELL // 2
+        mask = _glyph(top, RASTER_LABEL_SIZE, True)
+        _blend(canvas, mask, center_x - mask.shape[1] // 2, grid_y - RASTER_PAD - mask.shape[0], black)
+        mask = _glyph(bottom, RASTER_LABEL_SIZE, True)
+        _blend(canvas, mask, center_x - mask.shape[1] // 2, bottom_y, black)
+
+    canvas.flags.writeable = False
+    return canvas
+
+
+def _encode_png(rgb: np.ndarray, compression: int = 1) -> bytes:
+    """Codifica un array RGB uint8 (alto, ancho, 3) como PNG en memoria."""
+    height, width, _ = rgb.shape
+    # Cada fila va precedida del byte de filtro (0 = sin filtro)
+    raw = np.empty((height, width * 3 + 1), dtype=np.uint8)
+    raw[:, 0] = 0
+    raw[:, 1:] = rgb.reshape(height, width * 3)
+
+    def chunk(tag, data):
+        return (
+            struct.pack(">I", len(data))
+            + tag
+            + data
+            + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+        )
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", header)
+        + chunk(b"IDAT", zlib.compress(raw.tobytes(), compression))
+        + chunk(b"IEND", b"")
+    )
+
+
+def render_raster_heatmap(input_matrix: np.ndarray) -> np.ndarray:
+    """Pinta el heatmap en un buffer RGB uint8 sin usar seaborn ni figuras de matplotlib."""
+    assert input_matrix.shape == (len(LABELS_Y), len(LABELS_MAHJONG_TILES)), "Method expects a 15x34 matrix!"
+
+    colors, text_colors = _COLOR_LUT
+    _, _, grid_x, grid_y = _raster_layout()
+    rows, cols = input_matrix.shape
+    canvas = _raster_background().copy()
+
+    # Celdas: cada valor se expande a un bloque de RASTER_CELL píxeles
+    lut_index = np.asarray(input_matrix, dtype=np.int16) + 128
+    cells = colors[lut_index]
+    block = np.repeat(np.repeat(cells, RASTER_CELL, axis=0), RASTER_CELL, axis=1)
+    grid_h, grid_w = rows * RASTER_CELL, cols * RASTER_CELL
+    canvas[grid_y:grid_y + grid_h, grid_x:grid_x + grid_w] = block
+
+    # Bordes negros entre celdas
+    for row in range(rows + 1):
+        y = grid_y + row * RASTER_CELL
+        canvas[y:y + RASTER_LINE, grid_x:grid_x + grid_w + RASTER_LINE] = 0
+    for col in range(cols + 1):
+        x = grid_x + col * RASTER_CELL
+        canvas[grid_y:grid_y + grid_h + RASTER_LINE, x:x + RASTER_LINE] = 0
+
+    # Anotaciones centradas en cada celda
+    offset = RASTER_LINE // 2 + RASTER_CELL // 2
+    for row in range(rows):
+        for col in range(cols):
+            value = int(input_matrix[row, col])
+            mask = _glyph(f"{value:g}", RASTER_ANNOT_SIZE)
+            x = grid_x + col * RASTER_CELL + offset - mask.shape[1] // 2
+            y = grid_y + row * RASTER_CELL + offset - mask.shape[0] // 2
+            _blend(canvas, mask, x, y, text_colors[value + 128])
+
+    return canvas
+
+
+def _render_raster_png(input_matrix: np.ndarray) -> bytes:
+    """Renderiza el heatmap con el renderizador raster y retorna los bytes PNG."""
+    return _encode_png(render_raster_heatmap(input_matrix))
+
+
+_COLOR_LUT = _build_color_lut()
+_TEXT_COLORS = [tuple(c / 255.0) for c in _COLOR_LUT[1]]
+
+# Renderizadores disponibles para render_mahjong_heatmap_png
+HEATMAP_RENDERERS = {
+    "seaborn": _render_seaborn_png,
+    "raster": _render_raster_png,
+}
+
+
+def render_mahjong_heatmap_png(input_matrix: np.ndarray, renderer: str = "seaborn") -> bytes:
+    """Renders a mahjong game state matrix as PNG bytes in memory.
+
+    Args:
+        input_matrix: 15x34 state matrix.
+        renderer: "seaborn" (same figure as generate_mahjong_heatmap) or
+            "raster" (direct NumPy rasterization, much faster).
+    """
+    assert input_matrix.ndim == 2, "Method expects a 2D matrix!"
+    if renderer not in HEATMAP_RENDERERS:
+        raise ValueError(f"Unknown heatmap renderer: {renderer!r} (expected one of {sorted(HEATMAP_RENDERERS)})")
+    return HEATMAP_RENDERERS[renderer](input_matrix)
@@ -8,18 +8,32 @@ from config import LABELS, SYMBOLS
 from vector_parser import MahjongVectorParser, tiles_to_string
 
 class MatrixAnalyzer:
-    """Analizador para matrices individuales de Mahjong"""
+    """Analizador para matrices individuales de Mahjong
+
+    Es el registro por fila del dashboard: sirve de analizador, da el resumen
+    (get_summary) y el tablero 15x34 (board) a partir de su parser, sin
+    guardar copias de los datos.
+    """
+
+    __slots__ = ('parser', 'index')
     
-    def __init__(self, vector, index):
+    def __init__(self, vector, index, parser=None):
         """
         Inicializa el analizador
         
         Args:
-            vector: Vector de estado de Mahjong
+            vector: Vector de estado de Mahjong (se ignora si se indica parser)
             index: Índice de la matriz (para identificación)
+            parser: Parser ya construido para el vector (p. ej. una vista de
+                MahjongBatchParser); si es None se parsea el vector
         """
-        self.parser = MahjongVectorParser(vector)
+        self.parser = parser if parser is not None else MahjongVectorParser(vector)
         self.index = index
+
+    @property
+    def board(self):
+        """Estado como tablero 15x34 (vista sobre el vector, sin copia)"""
+        return self.parser.vector.reshape(15, 34)
     
     def print_full_analysis(self):
         """Imprime análisis completo de la matriz"""
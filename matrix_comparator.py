@@ -6,18 +6,22 @@ Comparaciones entre matrices de Mahjong
 import pandas as pd
 from config import LABELS, SYMBOLS
 from vector_parser import tiles_to_string
+from diff_engine import SequentialDiff
 
 class MatrixComparator:
     """Comparador para análisis entre matrices de Mahjong"""
     
-    def __init__(self, summaries_list):
+    def __init__(self, summaries_list, diff=None):
         """
         Inicializa el comparador
         
         Args:
             summaries_list: Lista de resúmenes de matrices
+            diff: SequentialDiff de las mismas matrices (si no se indica se
+                construye a partir de los resúmenes)
         """
         self.summaries = summaries_list
+        self.diff = diff if diff is not None else SequentialDiff.from_summaries(summaries_list)
     
     def print_basic_comparison(self):
         """Imprime comparación básica entre todas las matrices"""
@@ -85,8 +89,8 @@ class MatrixComparator:
             print("-" * 60)
             
             self._analyze_metadata_changes(current, next_matrix)
-            self._analyze_discard_changes(current, next_matrix)
-            self._analyze_turn_pattern(current, next_matrix, i+1, i+2)
+            self._analyze_discard_changes(i)
+            self._analyze_turn_pattern(current, next_matrix, i)
             
             print("-" * 60)
     
@@ -105,41 +109,25 @@ class MatrixComparator:
         wall_diff = next_matrix['wall_tiles'] - current['wall_tiles']
         print(f"   {SYMBOLS['MURO']} Fichas muro: {current['wall_tiles']} → {next_matrix['wall_tiles']} (Δ: {wall_diff:+d})")
     
-    def _analyze_discard_changes(self, current, next_matrix):
+    def _analyze_discard_changes(self, step):
         """Analiza cambios en descartes"""
         print(f"\n{SYMBOLS['DESCARTE']} CAMBIOS EN DESCARTES:")
         
-        global_changes = False
+        events = self.diff.step_events(step, 'discards')
         
         for player_id in range(4):
-            # Convertir descartes a diccionarios
-            current_discards = dict(current['discards_detail'][player_id])
-            next_discards = dict(next_matrix['discards_detail'][player_id])
-            
-            # Encontrar cambios
-            all_types = set(current_discards.keys()) | set(next_discards.keys())
-            player_changes = []
-            
-            for tile_type in sorted(all_types):
-                current_count = current_discards.get(tile_type, 0)
-                next_count = next_discards.get(tile_type, 0)
-                
-                if current_count != next_count:
-                    global_changes = True
-                    diff = next_count - current_count
-                    if diff > 0:
-                        player_changes.append(f"T{tile_type}(+{diff})")
-                    else:
-                        player_changes.append(f"T{tile_type}({diff})")
+            player_events = events[events['player'] == player_id]
+            player_changes = [f"T{tile_type}({diff:+d})" for tile_type, diff
+                              in zip(player_events['tile'].tolist(), player_events['delta'].tolist())]
             
             if player_changes:
                 player_name = LABELS['JUGADORES'][player_id]
                 print(f"   👤 {player_name}: {', '.join(player_changes)}")
         
-        if not global_changes:
+        if len(events) == 0:
             print(f"   {SYMBOLS['EXITO']} Sin cambios en descartes")
     
-    def _analyze_turn_pattern(self, current, next_matrix, current_num, next_num):
+    def _analyze_turn_pattern(self, current, next_matrix, step):
         """Analiza el patrón específico del turno"""
         print(f"\n{SYMBOLS['TURNO']} ANÁLISIS DEL TURNO:")
         
@@ -147,16 +135,10 @@ class MatrixComparator:
         previous_pov = current['pov_player']
         
         # Verificar si ese jugador descartó algo
-        current_discards = dict(current['discards_detail'][previous_pov])
-        next_discards = dict(next_matrix['discards_detail'][previous_pov])
-        
-        new_discards = []
-        for tile_type in next_discards:
-            current_count = current_discards.get(tile_type, 0)
-            next_count = next_discards.get(tile_type, 0)
-            if next_count > current_count:
-                diff = next_count - current_count
-                new_discards.append(f"T{tile_type}(+{diff})")
+        events = self.diff.step_events(step, 'discards', previous_pov)
+        events = events[events['delta'] > 0]
+        new_discards = [f"T{tile_type}(+{diff})" for tile_type, diff
+                        in zip(events['tile'].tolist(), events['delta'].tolist())]
         
         if new_discards:
             print(f"   {SYMBOLS['POV']} Jugador {previous_pov} descartó: {', '.join(new_discards)}")
@@ -0,0 +1,229 @@
+# matrix_loader.py
+"""
+Carga de matrices de estados de Mahjong desde archivos .npz dispersos o
+desde su copia densa int8 mapeada en memoria
+"""
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from sidecar import load_array, save_array_blocks
+
+# Número de columnas de un vector de estado (15x34)
+STATE_SIZE = 510
+
+# Copia densa int8 (N, 510) de cada dataset, mapeable en memoria
+DENSE_STORE_KIND = 'dense'
+DENSE_STORE_VERSION = 1
+
+
+def _drop_column(data, indices, indptr, column):
+    """
+    Elimina una columna interior de una estructura CSR sin densificarla
+
+    Returns:
+        Tupla (data, indices, indptr) sin la columna indicada
+    """
+    removed = np.flatnonzero(indices == column)
+    if removed.size:
+        # Fila a la que pertenece cada valor eliminado
+        removed_rows = np.searchsorted(indptr, removed, side='right') - 1
+        removed_per_row = np.bincount(removed_rows, minlength=len(indptr) - 1)
+        indptr = indptr - np.concatenate(([0], np.cumsum(removed_per_row))).astype(indptr.dtype)
+        data = np.delete(data, removed)
+        indices = np.delete(indices, removed)
+    # Desplazar las columnas posteriores a la eliminada
+    indices = np.where(indices > column, indices - 1, indices).astype(indices.dtype)
+    return data, indices, indptr
+
+
+def _compact_dtype(data):
+    """Convierte los datos a int8 si todos los valores caben en ese tipo"""
+    if data.dtype == np.int8:
+        return data
+    if data.size == 0 or (data.min() >= -128 and data.max() <= 127):
+        return data.astype(np.int8)
+    return data
+
+
+class SparseMatrixStore:
+    """Matriz de estados en formato CSR que se densifica solo por fila o sección
+
+    Los arrays CSR pueden contener columnas más allá de ``shape[1]``: se
+    ignoran al leer, lo que permite descartar columnas finales sin copiar
+    los datos.
+    """
+
+    def __init__(self, data, indices, indptr, shape):
+        """
+        Inicializa el almacén a partir de los arrays CSR
+
+        Args:
+            data: Valores no nulos
+            indices: Columna de cada valor no nulo
+            indptr: Inicio de cada fila dentro de data/indices
+            shape: Tupla (filas, columnas) lógica de la matriz
+        """
+        self.data = data
+        self.indices = indices
+        self.indptr = indptr
+        self.shape = (int(shape[0]), int(shape[1]))
+        self.dtype = data.dtype
+
+    def __len__(self):
+        return self.shape[0]
+
+    @property
+    def nbytes(self):
+        """Memoria ocupada por los arrays CSR"""
+        return self.data.nbytes + self.indices.nbytes + self.indptr.nbytes
+
+    def row(self, index):
+        """Retorna una fila densa (vector de estado)"""
+        if index < 0:
+            index += self.shape[0]
+        if not 0 <= index < self.shape[0]:
+            raise IndexError(f"Fila {index} fuera de rango")
+        start, end = self.indptr[index], self.indptr[index + 1]
+        columns = self.indices[start:end]
+        inside = columns < self.shape[1]
+        vector = np.zeros(self.shape[1], dtype=self.dtype)
+        vector[columns[inside]] = self.data[start:end][inside]
+        return vector
+
+    def __getitem__(self, index):
+        return self.row(index)
+
+    def rows(self, start, stop):
+        """
+        Retorna las filas [start, stop) como array denso
+
+        Returns:
+            Array de forma (stop - start, columnas)
+        """
+        lo, hi = self.indptr[start], self.indptr[stop]
+        columns = self.indices[lo:hi]
+        row_ids = np.repeat(np.arange(stop - start), np.diff(self.indptr[start:stop + 1]))
+        inside = columns < self.shape[1]
+        out = np.zeros((stop - start, self.shape[1]), dtype=self.dtype)
+        out[row_ids[inside], columns[inside]] = self.data[lo:hi][inside]
+        return out
+
+    def section(self, start, end):
+        """
+        Retorna las columnas [start, end) de todas las filas como array denso
+
+        Args:
+            start: Primera columna de la sección
+            end: Columna final (exclusiva)
+
+        Returns:
+            Array de forma (filas, end - start)
+        """
+        end = min(end, self.shape[1])
+        positions = np.flatnonzero((self.indices >= start) & (self.indices < end))
+        rows = np.searchsorted(self.indptr, positions, side='right') - 1
+        out = np.zeros((self.shape[0], end - start), dtype=self.dtype)
+        out[rows, self.indices[positions] - start] = self.data[positions]
+        return out
+
+    def toarray(self):
+        """Retorna la matriz completa densa"""
+        return self.section(0, self.shape[1])
+
+    def tocsr(self):
+        """Retorna la matriz como scipy.sparse.csr_matrix"""
+        if self.indices.size and self.indices.max() >= self.shape[1]:
+            return csr_matrix(
+                (self.data, self.indices, self.indptr), shape=(self.shape[0], self.indices.max() + 1)
+            )[:, :self.shape[1]]
+        return csr_matrix((self.data, self.indices, self.indptr), shape=self.shape)
+
+
+def load_npz_matrix(filepath):
+    """
+    Carga un archivo .npz con una matriz CSR de estados
+
+    La columna 510 (si existe) se elimina directamente sobre la estructura
+    dispersa, sin construir la matriz densa. Cuando es la última columna
+    basta con reducir el ancho lógico del almacén y no se copia nada.
+
+    Args:
+        filepath: Ruta al archivo .npz
+
+    Returns:
+        SparseMatrixStore con forma (N, 510)
+    """
+    with np.load(filepath) as npz:
+        data = npz['data']
+        indices = npz['indices']
+        indptr = npz['indptr']
+        num_rows, num_columns = (int(n) for n in npz['shape'])
+
+    if num_columns > STATE_SIZE + 1:
+        # Columna interior: hay que reescribir la estructura CSR
+        data, indices, indptr = _drop_column(data, indices, indptr, STATE_SIZE)
+    if num_columns > STATE_SIZE:
+        num_columns -= 1
+
+    return SparseMatrixStore(_compact_dtype(data), indices, indptr, (num_rows, num_columns))
+
+
+def write_dense_store(filepath, store=None, chunk_rows=65536):
+    """
+    Convierte un dataset .npz en su copia densa int8 mapeable (<dataset>.dense.npy)
+
+    La matriz se escribe por bloques de filas, así que la conversión no
+    necesita la matriz densa completa en memoria.
+
+    Args:
+        filepath: Ruta al archivo .npz
+        store: SparseMatrixStore ya cargado del archivo (opcional)
+        chunk_rows: Filas densificadas por bloque
+
+    Returns:
+        True si se escribió la copia densa
+    """
+    store = store if store is not None else load_npz_matrix(filepath)
+    if store.dtype != np.int8:
+        print(f"{filepath}: los valores no caben en int8, se mantiene el formato disperso")
+        return False
+
+    num_rows = len(store)
+    blocks = (store.rows(start, min(num_rows, start + chunk_rows)) for start in range(0, num_rows, chunk_rows))
+    return save_array_blocks(filepath, DENSE_STORE_KIND, DENSE_STORE_VERSION, store.shape, np.int8, blocks)
+
+
+def load_dense_store(filepath):
+    """Abre mapeada en memoria la copia densa de un dataset; None si no existe o no está al día"""
+    matrix = load_array(filepath, DENSE_STORE_KIND, DENSE_STORE_VERSION, mmap_mode='r')
+    if matrix is None or matrix.dtype != np.int8 or matrix.ndim != 2 or matrix.shape[1] != STATE_SIZE:
+        return None
+    return matrix
+
+
+def load_matrix(filepath, convert=False):
+    """
+    Carga la matriz de un dataset, mapeada en memoria si es posible
+
+    Con la copia densa al día se retorna un np.memmap de solo lectura: las
+    páginas se leen bajo demanda y se comparten entre procesos a través de
+    la caché de páginas del sistema, sin ocupar memoria propia del proceso.
+
+    Args:
+        filepath: Ruta al archivo .npz
+        convert: Crear la copia densa si no existe o no está al día
+
+    Returns:
+        np.memmap int8 (N, 510) o, si no hay copia densa, SparseMatrixStore
+    """
+    matrix = load_dense_store(filepath)
+    if matrix is not None:
+        return matrix
+
+    store = load_npz_matrix(filepath)
+    if convert and write_dense_store(filepath, store):
+        matrix = load_dense_store(filepath)
+        if matrix is not None:
+            return matrix
+    return store
@@ -0,0 +1,268 @@
+# shanten.py
+"""
+Shanten de manos de 34 conteos con tablas precalculadas por palo
+
+Para cada combinación de conteos (0-4) de un palo se precalcula cuántas
+fichas hay que añadir para que contenga m grupos (m = 0-4) con o sin
+pareja. El shanten de una mano completa se obtiene con una consulta por
+palo (man, pin, sou y honores) y combinando los cuatro resultados, así que
+se calcula vectorizado para todas las filas de un dataset.
+"""
+
+import itertools
+import os
+import threading
+
+import numpy as np
+
+from config import CONFIG
+
+MAX_MELDS = 4
+MAX_COUNT = 4
+# Resultado de las tablas cuando la forma es imposible (más de 4 copias)
+UNREACHABLE = 99
+
+SUIT_SIZE = 9
+HONOR_SIZE = 7
+# Índice de la tabla de un palo: conteos en base 5
+SUIT_WEIGHTS = (MAX_COUNT + 1) ** np.arange(SUIT_SIZE)
+HONOR_WEIGHTS = (MAX_COUNT + 1) ** np.arange(HONOR_SIZE)
+# Columnas de la mano de cada palo y si admite escaleras
+SUITS = (
+    (slice(0, 9), True),
+    (slice(9, 18), True),
+    (slice(18, 27), True),
+    (slice(27, 34), False),
+)
+# Terminales y honores (kokushi musou)
+TERMINALS_AND_HONORS = np.array([0, 8, 9, 17, 18, 26] + list(range(27, 34)))
+
+SHANTEN_TABLE_VERSION = 1
+
+_tables = None
+_tables_lock = threading.Lock()
+
+
+def _complete_shapes(size, sequences):
+    """
+    Índices de las formas completas de un palo: m grupos y h parejas exactas
+
+    Returns:
+        Diccionario (h, m) -> array de índices en base 5
+    """
+    groups = []
+    for tile in range(size):
+        triplet = np.zeros(size, dtype=np.int64)
+        triplet[tile] = 3
+        groups.append(triplet)
+    if sequences:
+        for tile in range(size - 2):
+            sequence = np.zeros(size, dtype=np.int64)
+            sequence[tile:tile + 3] = 1
+            groups.append(sequence)
+    pairs = 2 * np.eye(size, dtype=np.int64)
+    weights = (MAX_COUNT + 1) ** np.arange(size)
+
+    shapes = {}
+    for melds in range(MAX_MELDS + 1):
+        combos = np.array([
+            np.sum(combo, axis=0) for combo in itertools.combinations_with_replacement(groups, melds)
+        ]).reshape(-1, size) if melds else np.zeros((1, size), dtype=np.int64)
+        for pair in (0, 1):
+            counts = combos if not pair else (combos[:, None, :] + pairs[None]).reshape(-1, size)
+            counts = counts[(counts <= MAX_COUNT).all(axis=1)]
+            shapes[(pair, melds)] = np.unique(counts @ weights)
+    return shapes
+
+
+def build_table(size, sequences):
+    """
+    Tabla de fichas a añadir de un palo
+
+    Para cada forma completa se marca distancia 0 y se propaga por cada
+    eje (tipo de ficha): tener más copias de las necesarias no cuesta nada
+    y cada copia que falta cuesta una ficha. La distancia es separable por
+    tipo de ficha, así que un barrido por eje da el mínimo exacto.
+
+    Args:
+        size: Tipos de ficha del palo (9 o 7)
+        sequences: Si el palo admite escaleras
+
+    Returns:
+        Array int8 de forma (2, MAX_MELDS + 1, 5**size): [pareja, grupos, índice]
+    """
+    num_shapes = (MAX_COUNT + 1) ** size
+    table = np.empty((2, MAX_MELDS + 1, num_shapes), dtype=np.int8)
+    for (pair, melds), indices in _complete_shapes(size, sequences).items():
+        distance = np.full(num_shapes, UNREACHABLE, dtype=np.int16)
+        distance[indices] = 0
+        distance = distance.reshape((MAX_COUNT + 1,) * size)
+        for axis in range(size):
+            counts = np.moveaxis(distance, axis, 0)
+            # Objetivo con a <= x copias: ya están en la mano
+            covered = np.minimum.accumulate(counts, axis=0)
+            # Objetivo con a > x copias: faltan a - x fichas
+            missing = np.full_like(counts, UNREACHABLE)
+            for x in range(MAX_COUNT - 1, -1, -1):
+                missing[x] = np.minimum(counts[x + 1], missing[x + 1]) + 1
+            distance = np.moveaxis(np.minimum(covered, missing), 0, axis)
+        table[pair, melds] = np.minimum(distance.reshape(-1), UNREACHABLE)
+    return table
+
+
+def _table_path():
+    return CONFIG['shanten_table_file']
+
+
+def load_tables():
+    """
+    Tablas de los palos numéricos y de honores
+
+    Se calculan la primera vez (unos segundos) y se guardan en
+    CONFIG['shanten_table_file'] para las siguientes ejecuciones.
+
+    Returns:
+        Tupla (tabla de palo (2, 5, 5**9), tabla de honores (2, 5, 5**7))
+    """
+    global _tables
+    with _tables_lock:
+        if _tables is not None:
+            return _tables
+
+        path = _table_path()
+        try:
+            with np.load(path) as saved:
+                if (int(saved['version']) == SHANTEN_TABLE_VERSION
+                        and saved['suit'].shape[-1] == (MAX_COUNT + 1) ** SUIT_SIZE):
+                    _tables = (saved['suit'], saved['honors'])
+                    return _tables
+        except (OSError, KeyError, ValueError):
+            pass
+
+        tables = (build_table(SUIT_SIZE, True), build_table(HONOR_SIZE, False))
+        try:
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                np.savez(f, version=SHANTEN_TABLE_VERSION, suit=tables[0], honors=tables[1])
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"No se pudieron guardar las tablas de shanten en {path}: {e}")
+        _tables = tables
+        return _tables
+
+
+def combine_parts(a, b):
+    """
+    Mejor reparto de grupos y pareja entre dos partes de la mano (min-plus)
+
+    Args:
+        a, b: Arrays (2, MAX_MELDS + 1, N) de fichas a añadir de cada parte
+
+    Returns:
+        Array (2, MAX_MELDS + 1, N) de la unión de las dos partes
+    """
+    out = np.full(a.shape, UNREACHABLE, dtype=np.int16)
+    for pair_a in (0, 1):
+        for pair_b in range(2 - pair_a):
+            for melds_a in range(MAX_MELDS + 1):
+                for melds_b in range(MAX_MELDS + 1 - melds_a):
+                    target = out[pair_a + pair_b, melds_a + melds_b]
+                    np.minimum(target, a[pair_a, melds_a] + b[pair_b, melds_b], out=target)
+    return out
+
+
+def as_hands(hands):
+    """Manos como array (N, 34) int8 con conteos entre 0 y 4"""
+    hands = np.asarray(hands)
+    if hands.ndim == 1:
+        hands = hands[None]
+    return np.clip(hands, 0, MAX_COUNT).astype(np.int8, copy=False)
+
+
+def regular_shanten(hands):
+    """
+    Shanten de la forma normal (grupos y pareja)
+
+    El número de grupos es el que corresponde al tamaño de la mano (4 con
+    13-14 fichas, uno menos por cada meld cantado).
+
+    Args:
+        hands: Array (N, 34) o (34,) de conteos
+
+    Returns:
+        Array int8 (N,); -1 es una mano completa
+    """
+    hands = as_hands(hands)
+    suit_table, honor_table = load_tables()
+    parts = []
+    for columns, sequences in SUITS:
+        table, weights = (suit_table, SUIT_WEIGHTS) if sequences else (honor_table, HONOR_WEIGHTS)
+        index = hands[:, columns].astype(np.int32) @ weights.astype(np.int32)
+        # (2, 5, N): cada combinación de pareja y grupos es una fila contigua
+        parts.append(np.take(table, index, axis=2).astype(np.int16))
+    combined = combine_parts(combine_parts(parts[0], parts[1]), combine_parts(parts[2], parts[3]))
+    melds = np.minimum(hands.sum(axis=1, dtype=np.int32) // 3, MAX_MELDS)
+    return (combined[1, melds, np.arange(len(hands))] - 1).astype(np.int8)
+
+
+def chiitoitsu_shanten(hands):
+    """Shanten de siete parejas (solo tiene sentido con la mano cerrada)"""
+    hands = as_hands(hands)
+    pairs = np.count_nonzero(hands >= 2, axis=1)
+    kinds = np.count_nonzero(hands >= 1, axis=1)
+    return (6 - pairs + np.maximum(0, 7 - kinds)).astype(np.int8)
+
+
+def kokushi_shanten(hands):
+    """Shanten de trece huérfanos (solo tiene sentido con la mano cerrada)"""
+    hands = as_hands(hands)[:, TERMINALS_AND_HONORS]
+    kinds = np.count_nonzero(hands >= 1, axis=1)
+    has_pair = (hands >= 2).any(axis=1)
+    return (13 - kinds - has_pair).astype(np.int8)
+
+
+def shanten(hands):
+    """
+    Shanten de cada mano: mínimo entre la forma normal, siete parejas y
+    trece huérfanos (estas dos solo con 13 o más fichas en la mano)
+
+    Args:
+        hands: Array (N, 34) o (34,) de conteos
+
+    Returns:
+        Array int8 (N,); 0 es tenpai (con 14 fichas, tras el mejor descarte)
+        y -1 una mano completa
+    """
+    hands = as_hands(hands)
+    result = regular_shanten(hands)
+    closed = hands.sum(axis=1, dtype=np.int32) >= 13
+    if closed.any():
+        special = np.minimum(chiitoitsu_shanten(hands[closed]), kokushi_shanten(hands[closed]))
+        result[closed] = np.minimum(result[closed], special)
+    return result
+
+
+def shanten_detail(hand):
+    """
+    Shanten de una mano con el desglose por forma
+
+    Args:
+        hand: Vector de 34 conteos
+
+    Returns:
+        Diccionario con el shanten, si está en tenpai y el shanten de cada forma
+        (None en las formas que requieren mano cerrada si hay melds)
+    """
+    hand = as_hands(hand)
+    closed = int(hand.sum(dtype=np.int32)) >= 13
+    regular = int(regular_shanten(hand)[0])
+    chiitoitsu = int(chiitoitsu_shanten(hand)[0]) if closed else None
+    kokushi = int(kokushi_shanten(hand)[0]) if closed else None
+    value = min(s for s in (regular, chiitoitsu, kokushi) if s is not None)
+    return {
+        'shanten': value,
+        'tenpai': value <= 0,
+        'regular': regular,
+        'chiitoitsu': chiitoitsu,
+        'kokushi': kokushi
+    }
@@ -0,0 +1,173 @@
+# sidecar.py
+"""
+Archivos auxiliares (sidecars) derivados de cada dataset y su invalidación
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+
+# Digests ya calculados: ruta -> (tamaño, mtime, digest)
+_digest_cache = {}
+_digest_lock = threading.Lock()
+
+
+def file_digest(filepath, chunk_size=1 << 20):
+    """
+    Calcula el hash SHA-1 del contenido de un archivo
+
+    El resultado se memoriza mientras el tamaño y la fecha de modificación
+    del archivo no cambien.
+
+    Args:
+        filepath: Ruta al archivo
+        chunk_size: Tamaño de bloque de lectura
+
+    Returns:
+        Digest hexadecimal
+    """
+    stat = os.stat(filepath)
+    signature = (stat.st_size, stat.st_mtime_ns)
+    with _digest_lock:
+        cached = _digest_cache.get(filepath)
+    if cached is not None and cached[:2] == signature:
+        return cached[2]
+
+    sha1 = hashlib.sha1()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha1.update(chunk)
+    digest = sha1.hexdigest()
+
+    with _digest_lock:
+        _digest_cache[filepath] = (*signature, digest)
+    return digest
+
+
+def sidecar_path(filepath, kind, extension='.npy'):
+    """
+    Ruta de un sidecar junto al dataset
+
+    Ejemplo: datasets/partida.npz -> datasets/partida.summary.npy
+    """
+    return f"{os.path.splitext(filepath)[0]}.{kind}{extension}"
+
+
+def _meta_path(filepath, kind):
+    return sidecar_path(filepath, kind, '.json')
+
+
+def is_fresh(filepath, kind, version):
+    """
+    Indica si el sidecar de un dataset corresponde al contenido actual del archivo
+
+    Si cambió el tamaño o la fecha de modificación se compara el hash del
+    contenido; cuando coincide se actualizan los metadatos sin reconstruir.
+
+    Args:
+        filepath: Ruta al dataset
+        kind: Tipo de sidecar (p. ej. 'summary')
+        version: Versión del formato del sidecar
+    """
+    try:
+        with open(_meta_path(filepath, kind)) as f:
+            meta = json.load(f)
+        stat = os.stat(filepath)
+    except (OSError, ValueError):
+        return False
+
+    if meta.get('version') != version:
+        return False
+    if meta.get('size') == stat.st_size and meta.get('mtime_ns') == stat.st_mtime_ns:
+        return True
+    if meta.get('sha1') != file_digest(filepath):
+        return False
+
+    write_meta(filepath, kind, version)
+    return True
+
+
+def write_meta(filepath, kind, version):
+    """Registra el estado actual del dataset como origen del sidecar"""
+    stat = os.stat(filepath)
+    meta = {
+        'version': version,
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha1': file_digest(filepath)
+    }
+    _atomic_write(_meta_path(filepath, kind), lambda f: f.write(json.dumps(meta).encode('utf-8')))
+
+
+def _atomic_write(path, write):
+    """Escribe un archivo a través de un temporal para no dejar sidecars a medias"""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            write(f)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def save_array(filepath, kind, version, array):
+    """
+    Guarda un array como sidecar .npy del dataset y registra sus metadatos
+
+    Returns:
+        True si se pudo escribir (la carpeta puede ser de solo lectura)
+    """
+    try:
+        _atomic_write(sidecar_path(filepath, kind), lambda f: np.save(f, array, allow_pickle=False))
+        write_meta(filepath, kind, version)
+        return True
+    except OSError as e:
+        print(f"No se pudo guardar el sidecar '{kind}' de {os.path.basename(filepath)}: {e}")
+        return False
+
+
+def save_array_blocks(filepath, kind, version, shape, dtype, blocks):
+    """
+    Guarda como sidecar .npy un array escrito por bloques de filas consecutivos
+
+    Permite crear sidecars grandes sin tener el array completo en memoria.
+
+    Args:
+        filepath: Ruta al dataset
+        kind: Tipo de sidecar
+        version: Versión del formato del sidecar
+        shape: Forma del array completo
+        dtype: Tipo de datos del array
+        blocks: Iterable de arrays C-contiguos que concatenados forman el array
+
+    Returns:
+        True si se pudo escribir
+    """
+    header = {'descr': np.lib.format.dtype_to_descr(np.dtype(dtype)), 'fortran_order': False, 'shape': tuple(shape)}
+
+    def write(f):
+        np.lib.format.write_array_header_1_0(f, header)
+        for block in blocks:
+            f.write(np.ascontiguousarray(block, dtype=dtype).tobytes())
+
+    try:
+        _atomic_write(sidecar_path(filepath, kind), write)
+        write_meta(filepath, kind, version)
+        return True
+    except OSError as e:
+        print(f"No se pudo guardar el sidecar '{kind}' de {os.path.basename(filepath)}: {e}")
+        return False
+
+
+def load_array(filepath, kind, version, mmap_mode='r'):
+    """Carga un sidecar .npy si está al día; retorna None en caso contrario"""
+    if not is_fresh(filepath, kind, version):
+        return None
+    try:
+        return np.load(sidecar_path(filepath, kind), mmap_mode=mmap_mode, allow_pickle=False)
+    except (OSError, ValueError):
+        return None
@@ -0,0 +1,226 @@
+# similarity_index.py
+"""
+Índice de búsqueda de estados similares en todos los datasets del corpus
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from config import CONFIG, INDICES
+from matrix_loader import load_matrix
+from sidecar import load_array, save_array
+from vector_parser import MahjongBatchParser
+
+SIMILARITY_KIND = 'similarity'
+SIMILARITY_VERSION = 1
+
+# Secciones comparadas (columnas de config.INDICES) y su peso en la distancia:
+# la mano del POV pesa más que las fichas visibles en la mesa
+FEATURE_SECTIONS = (
+    ('hand', INDICES['HAND_START'], INDICES['HAND_END'], 4.0),
+    ('discards', INDICES['DISCARDS_START'], INDICES['DISCARDS_END'], 1.0),
+    ('pond', INDICES['POND_START'], INDICES['POND_END'], 1.0),
+)
+FEATURE_WEIGHTS = np.concatenate([
+    np.full(end - start + 1, weight, dtype=np.float32) for _, start, end, weight in FEATURE_SECTIONS
+])
+NUM_FEATURES = len(FEATURE_WEIGHTS)
+HAND_FEATURES = slice(0, INDICES['HAND_END'] - INDICES['HAND_START'] + 1)
+
+# Filas comparadas por bloque (acota la memoria temporal de cada consulta)
+BLOCK_ROWS = 16384
+
+
+def state_features(batch):
+    """
+    Vector de conteos de cada estado: mano, descartes y pond concatenados
+
+    Args:
+        batch: MahjongBatchParser del dataset
+
+    Returns:
+        Array int8 de forma (N, NUM_FEATURES)
+    """
+    n = len(batch)
+    return np.concatenate(
+        [batch.hand, batch.discards.reshape(n, -1), batch.pond.reshape(n, -1)], axis=1
+    ).astype(np.int8, copy=False)
+
+
+def compute_features(filepath):
+    """Calcula y guarda los vectores de un dataset (se ejecuta en los procesos del pool)"""
+    features = state_features(MahjongBatchParser(load_matrix(filepath)))
+    save_array(filepath, SIMILARITY_KIND, SIMILARITY_VERSION, features)
+    return features
+
+
+def _cached_features(filepath):
+    """Vectores guardados de un dataset, o None si hay que recalcularlos"""
+    features = load_array(filepath, SIMILARITY_KIND, SIMILARITY_VERSION)
+    if features is None or features.dtype != np.int8 or features.ndim != 2 or features.shape[1] != NUM_FEATURES:
+        return None
+    return features
+
+
+def folder_signature(folder):
+    """Nombre, tamaño y fecha de modificación de cada dataset (cambia si cambia el corpus)"""
+    signature = []
+    for filename in sorted(f for f in os.listdir(folder) if f.endswith('.npz')):
+        stat = os.stat(os.path.join(folder, filename))
+        signature.append((filename, stat.st_size, stat.st_mtime_ns))
+    return tuple(signature)
+
+
+class SimilarityIndex:
+    """Búsqueda exacta de los k estados más cercanos de todo el corpus
+
+    La distancia es la euclídea ponderada (FEATURE_WEIGHTS) entre los
+    conteos de mano, descartes y pond: d(x, q) = |x|² - 2 x·q + |q|², con
+    |x|² precalculado por estado. Los vectores se guardan en int8 por
+    columnas (una fila por característica), así que el producto x·q solo
+    lee las pocas columnas en las que la consulta no es cero, por bloques
+    de estados.
+    """
+
+    def __init__(self, datasets, features, signature=()):
+        """
+        Inicializa el índice
+
+        Args:
+            datasets: Nombres de los datasets en orden
+            features: Lista con el array (N_i, NUM_FEATURES) de cada dataset
+            signature: Firma de la carpeta con la que se construyó (folder_signature)
+        """
+        self.datasets = list(datasets)
+        self.signature = signature
+        lengths = np.array([len(f) for f in features], dtype=np.int64)
+        self.offsets = np.concatenate(([0], np.cumsum(lengths)))
+        self.num_states = int(self.offsets[-1])
+        # Vectores por columnas: columns[:, i] es el estado i
+        self.columns = np.empty((NUM_FEATURES, self.num_states), dtype=np.int8)
+        for start, part in zip(self.offsets, features):
+            self.columns[:, start:start + len(part)] = part.T
+        self.dataset_ids = np.repeat(np.arange(len(lengths), dtype=np.int32), lengths)
+        self.rows = (np.arange(self.num_states) - self.offsets[self.dataset_ids]).astype(np.int32)
+        self._positions = {name: i for i, name in enumerate(self.datasets)}
+
+        self.norms = np.empty(self.num_states, dtype=np.float32)
+        for start in range(0, self.num_states, BLOCK_ROWS):
+            block = self.columns[:, start:start + BLOCK_ROWS].astype(np.float32)
+            self.norms[start:start + block.shape[1]] = FEATURE_WEIGHTS @ (block * block)
+
+    @classmethod
+    def build(cls, folder=None, max_workers=None):
+        """
+        Construye el índice de todos los datasets de la carpeta
+
+        Los vectores de cada dataset se guardan como sidecar; solo los
+        archivos nuevos o modificados se procesan (en un pool de procesos).
+
+        Args:
+            folder: Carpeta de datasets (por defecto CONFIG['data_folder'])
+            max_workers: Número de procesos (por defecto CONFIG['corpus_max_workers'])
+
+        Returns:
+            Tupla (SimilarityIndex, nombres reprocesados)
+        """
+        folder = folder or CONFIG['data_folder']
+        max_workers = max_workers or CONFIG['corpus_max_workers']
+        signature = folder_signature(folder)
+        filenames = [filename for filename, _, _ in signature]
+
+        features = {}
+        stale = []
+        for filename in filenames:
+            cached = _cached_features(os.path.join(folder, filename))
+            if cached is None:
+                stale.append(filename)
+            else:
+                features[filename] = cached
+
+        if len(stale) == 1:
+            # Un solo archivo no compensa arrancar procesos
+            features[stale[0]] = compute_features(os.path.join(folder, stale[0]))
+        elif stale:
+            paths = [os.path.join(folder, filename) for filename in stale]
+            with ProcessPoolExecutor(max_workers=max_workers) as pool:
+                for filename, result in zip(stale, pool.map(compute_features, paths)):
+                    features[filename] = result
+
+        index = cls(filenames, [features[filename] for filename in filenames], signature)
+        return index, stale
+
+    def __len__(self):
+        return self.num_states
+
+    @property
+    def nbytes(self):
+        """Memoria de los arrays del índice"""
+        return self.columns.nbytes + self.norms.nbytes + self.dataset_ids.nbytes + self.rows.nbytes
+
+    def state(self, position):
+        """Vector de características (NUM_FEATURES,) de un estado del índice"""
+        return self.columns[:, position]
+
+    def position(self, dataset, row):
+        """Posición de un estado en el índice, o None si no existe"""
+        i = self._positions.get(dataset)
+        if i is None or not 0 <= row < self.offsets[i + 1] - self.offsets[i]:
+            return None
+        return int(self.offsets[i] + row)
+
+    def query(self, features, k=10, exclude=None):
+        """
+        Busca los k estados más cercanos a un vector
+
+        Args:
+            features: Vector de NUM_FEATURES conteos
+            k: Número de resultados
+            exclude: Posición a excluir (p. ej. el propio estado consultado)
+
+        Returns:
+            Tupla (posiciones, distancias) ordenada de menor a mayor distancia
+        """
+        query = np.asarray(features, dtype=np.float32)
+        weighted = query * FEATURE_WEIGHTS
+        query_norm = float(query @ weighted)
+        wanted = min(k + (exclude is not None), self.num_states)
+        if wanted <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        # Solo las características no nulas de la consulta aportan a x·q
+        support = np.flatnonzero(query)
+        support_weights = weighted[support]
+        positions = []
+        distances = []
+        for start in range(0, self.num_states, BLOCK_ROWS):
+            norms = self.norms[start:start + BLOCK_ROWS]
+            block = self.columns[support, start:start + len(norms)].astype(np.float32)
+            distance = norms - 2.0 * (support_weights @ block)
+            # Candidatos de cada bloque; la selección final se hace al unirlos
+            top = np.argpartition(distance, wanted - 1)[:wanted] if len(norms) > wanted else np.arange(len(norms))
+            positions.append(top + start)
+            distances.append(distance[top])
+
+        positions = np.concatenate(positions)
+        distances = np.maximum(np.concatenate(distances) + query_norm, 0.0)
+        if exclude is not None:
+            keep = positions != exclude
+            positions, distances = positions[keep], distances[keep]
+        order = np.lexsort((positions, distances))[:k]
+        return positions[order], np.sqrt(distances[order])
+
+    def neighbours(self, dataset, row, k=10):
+        """
+        Estados más parecidos a uno del corpus
+
+        Returns:
+            Tupla (posiciones, distancias) sin el propio estado, o None si el
+            estado no está en el índice
+        """
+        position = self.position(dataset, row)
+        if position is None:
+            return None
+        return self.query(self.state(position), k, exclude=position)
@@ -0,0 +1,534 @@
+# state_filter.py
+"""
+Filtros de estados con expresiones sobre los campos de config.INDICES
+
+Una expresión usa la sintaxis de Python (solo comparaciones, aritmética,
+and/or/not y unas pocas funciones), p. ej.::
+
+    wall_tiles < 20 and any(riichi) and honors >= 3
+
+y se compila a máscaras vectorizadas de NumPy. Los campos del índice de
+resúmenes (~30 bytes por fila) se evalúan antes que los que hay que leer de
+la matriz de estados, y cada condición de un ``and`` solo se evalúa sobre
+las filas que superaron las anteriores: con la copia densa mapeada solo se
+leen las páginas de esas filas.
+"""
+
+import ast
+import os
+
+import numpy as np
+
+from config import CONFIG, INDICES
+from matrix_loader import load_matrix
+from summary_index import SUMMARY_DTYPE, build_summary_index, load_summary_index
+from vector_parser import MahjongBatchParser
+
+# Campos del índice de resúmenes (nombre en la expresión -> campo del índice)
+SUMMARY_FIELDS = {
+    'round_wind': 'round_wind',
+    'dealer': 'dealer',
+    'pov_player': 'pov_player',
+    'honba_sticks': 'honba_sticks',
+    'riichi_sticks': 'riichi_sticks',
+    'wall_tiles': 'wall_tiles',
+    'round_number': 'round_number',
+    'step_number': 'step_number',
+    'active_dora': 'active_dora',
+    'hand_tiles': 'hand_tiles',
+    'hand_unique': 'hand_unique',
+    'shanten': 'shanten',
+    'melds': 'melds_totals',
+    'discards': 'discards_totals',
+    'pond': 'pond_totals',
+}
+
+# Campos leídos de la matriz: columnas [inicio, fin) del vector y si se suman
+# por fila (grupos de fichas de la mano)
+_HAND = INDICES['HAND_START']
+MATRIX_FIELDS = {
+    'scores': (INDICES['SCORES_START'], INDICES['SCORES_END'] + 1, False),
+    'riichi': (INDICES['RIICHI_STATUS_START'], INDICES['RIICHI_STATUS_END'] + 1, False),
+    'hand': (_HAND, INDICES['HAND_END'] + 1, False),
+    'man': (_HAND, _HAND + 9, True),
+    'pin': (_HAND + 9, _HAND + 18, True),
+    'sou': (_HAND + 18, _HAND + 27, True),
+    'honors': (_HAND + 27, _HAND + 34, True),
+}
+
+# Coste relativo de leer cada tipo de campo (orden de evaluación de un and)
+SUMMARY_COST = 1
+MATRIX_COST = 2
+
+# Funciones permitidas: reducen los valores por jugador (o por ficha) de cada fila
+FUNCTIONS = {
+    'any': lambda values: values.any(axis=1),
+    'all': lambda values: values.all(axis=1),
+    'sum': lambda values: values.sum(axis=1),
+    'min': lambda values: values.min(axis=1),
+    'max': lambda values: values.max(axis=1),
+}
+
+_COMPARISONS = {
+    ast.Lt: np.less, ast.LtE: np.less_equal, ast.Gt: np.greater,
+    ast.GtE: np.greater_equal, ast.Eq: np.equal, ast.NotEq: np.not_equal,
+}
+_ARITHMETIC = {
+    ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply,
+    ast.FloorDiv: np.floor_divide, ast.Mod: np.mod,
+}
+_DIVISIONS = (np.floor_divide, np.mod)
+
+MAX_EXPRESSION_LENGTH = 1000
+# Valor absoluto máximo de un resultado aritmético (int64 con margen)
+MAX_ABS_VALUE = 2 ** 62
+
+
+class FilterError(ValueError):
+    """Expresión de filtro no válida"""
+
+
+def _field_width(name):
+    """Valores por fila de un campo: 0 si es un escalar, o el ancho de su vector"""
+    if name in SUMMARY_FIELDS:
+        shape = SUMMARY_DTYPE[SUMMARY_FIELDS[name]].shape
+        return shape[0] if shape else 0
+    start, end, reduce = MATRIX_FIELDS[name]
+    return 0 if reduce else end - start
+
+
+class FilterSource:
+    """Columnas de un dataset que lee un filtro
+
+    La matriz de estados solo se abre si la expresión usa campos que no
+    están en el índice de resúmenes y quedan filas que evaluar.
+    """
+
+    def __init__(self, summary, matrix=None, filepath=None):
+        """
+        Inicializa la fuente
+
+        Args:
+            summary: Índice de resúmenes del dataset (SUMMARY_DTYPE)
+            matrix: Matriz de estados (array (N, 510) o SparseMatrixStore)
+            filepath: Ruta del .npz de la que abrir la matriz si no se indica
+        """
+        self.summary = summary
+        self.num_rows = len(summary)
+        self._matrix = matrix
+        self._filepath = filepath
+        self._sections = {}
+
+    @classmethod
+    def open(cls, filepath):
+        """Fuente de un dataset de disco a partir de su índice de resúmenes"""
+        summary = load_summary_index(
+            filepath, lambda: build_summary_index(MahjongBatchParser(load_matrix(filepath)))
+        )
+        return cls(summary, filepath=filepath)
+
+    @property
+    def matrix(self):
+        """Matriz de estados (se abre en el primer acceso)"""
+        if self._matrix is None:
+            self._matrix = load_matrix(self._filepath)
+        if isinstance(self._matrix, np.memmap):
+            # Misma memoria mapeada sin el coste de la subclase al indexar
+            self._matrix = self._matrix.view(np.ndarray)
+        return self._matrix
+
+    def summary_field(self, field, rows):
+        """Campo del índice de resúmenes en las filas indicadas (None = todas)"""
+        values = self.summary[field]
+        return values if rows is None else values[rows]
+
+    def matrix_columns(self, start, end, rows):
+        """Columnas [start, end) de la matriz en las filas indicadas (None = todas)"""
+        matrix = self.matrix
+        if isinstance(matrix, np.ndarray):
+            return matrix[:, start:end] if rows is None else matrix[rows, start:end]
+        # Almacén disperso: la sección se densifica una vez por fuente
+        section = self._sections.get((start, end))
+        if section is None:
+            section = self._sections[(start, end)] = matrix.section(start, end)
+        return section if rows is None else section[rows]
+
+
+def _complement(rows, selected, num_rows):
+    """Filas de rows (None = todas) que no están en selected (subconjunto ordenado)"""
+    if rows is None:
+        keep = np.ones(num_rows, dtype=bool)
+        keep[selected] = False
+        return np.flatnonzero(keep)
+    keep = np.ones(len(rows), dtype=bool)
+    keep[np.searchsorted(rows, selected)] = False
+    return rows[keep]
+
+
+class _Node:
+    """Nodo compilado de una expresión
+
+    Atributos:
+        width: Valores por fila (0 escalar, >0 vector, None constante)
+        cost: Coste de evaluarlo (máximo de sus campos)
+        fields: Nombres de los campos que usa
+        boolean: Si su valor es una máscara
+    """
+
+    boolean = False
+
+    def value(self, source, rows):
+        """Valores en las filas indicadas (None = todas)"""
+        raise NotImplementedError
+
+    def select(self, source, rows):
+        """Filas (índices ordenados) de rows que cumplen la condición"""
+        mask = self.value(source, rows)
+        return np.flatnonzero(mask) if rows is None else rows[mask]
+
+
+class _Constant(_Node):
+    def __init__(self, constant):
+        self.constant = constant
+        self.width = None
+        self.cost = 0
+        self.fields = frozenset()
+
+    def value(self, source, rows):
+        return self.constant
+
+
+class _SummaryField(_Node):
+    def __init__(self, name, index=None):
+        self.name = name
+        self.index = index
+        self.width = 0 if index is not None else _field_width(name)
+        self.cost = SUMMARY_COST
+        self.fields = frozenset([name])
+
+    def value(self, source, rows):
+        values = source.summary_field(SUMMARY_FIELDS[self.name], rows)
+        if self.index is not None:
+            values = values[:, self.index]
+        return values.astype(np.int64)
+
+
+class _MatrixField(_Node):
+    def __init__(self, name, index=None):
+        start, end, reduce = MATRIX_FIELDS[name]
+        if index is not None:
+            # Solo se lee la columna indexada
+            start, end = start + index, start + index + 1
+        self.name = name
+        self.start, self.end = start, end
+        self.reduce = reduce or index is not None
+        self.width = 0 if self.reduce else end - start
+        self.cost = MATRIX_COST
+        self.fields = frozenset([name])
+
+    def value(self, source, rows):
+        values = source.matrix_columns(self.start, self.end, rows)
+        return values.sum(axis=1, dtype=np.int64) if self.reduce else values.astype(np.int64)
+
+
+def _broadcast(left, right):
+    """Alinea un valor escalar por fila con uno vectorial por fila"""
+    if isinstance(left, np.ndarray) and isinstance(right, np.ndarray) and left.ndim != right.ndim:
+        if left.ndim == 1:
+            left = left[:, None]
+        else:
+            right = right[:, None]
+    return left, right
+
+
+class _Operation(_Node):
+    """Aritmética, comparación o función aplicada a otros nodos"""
+
+    def __init__(self, func, operands, width, boolean):
+        self.func = func
+        self.operands = operands
+        self.width = width
+        self.boolean = boolean
+        self.cost = max(operand.cost for operand in operands)
+        self.fields = frozenset().union(*(operand.fields for operand in operands))
+
+    def value(self, source, rows):
+        values = [operand.value(source, rows) for operand in self.operands]
+        if len(values) == 2:
+            values = _broadcast(*values)
+        return self.func(*values)
+
+
+def _max_abs(values):
+    """Mayor valor absoluto de un operando (0 si no hay filas)"""
+    if isinstance(values, np.ndarray):
+        return abs(values).max().item() if values.size else 0
+    return abs(values)
+
+
+class _Arithmetic(_Operation):
+    """Suma, resta, producto o división en int64
+
+    Antes de operar se acota el resultado con los valores absolutos
+    máximos de los operandos: si podría no caber en int64 la expresión se
+    rechaza en lugar de desbordarse en silencio. Igual con // y % entre
+    cero, que NumPy resuelve con 0 y un aviso.
+    """
+
+    def __init__(self, func, operands, width, text):
+        super().__init__(func, operands, width, False)
+        self.text = text
+
+    def value(self, source, rows):
+        left, right = _broadcast(*(operand.value(source, rows) for operand in self.operands))
+        if self.func in (np.add, np.subtract, np.multiply):
+            a, b = _max_abs(left), _max_abs(right)
+            bound = a * b if self.func is np.multiply else a + b
+            if bound > MAX_ABS_VALUE:
+                raise FilterError(f"El resultado de '{self.text}' no cabe en un entero de 64 bits")
+        elif self.func in _DIVISIONS and np.any(right == 0):
+            raise FilterError(f"División entre cero en '{self.text}'")
+        return self.func(left, right)
+
+
+class _And(_Node):
+    boolean = True
+    width = 0
+
+    def __init__(self, operands):
+        # Primero las condiciones más baratas: las demás ven menos filas
+        self.operands = sorted(operands, key=lambda operand: operand.cost)
+        self.cost = max(operand.cost for operand in operands)
+        self.fields = frozenset().union(*(operand.fields for operand in operands))
+
+    def select(self, source, rows):
+        for operand in self.operands:
+            rows = operand.select(source, rows)
+            if len(rows) == 0:
+                break
+        return rows
+
+    def value(self, source, rows):
+        return _mask_from_select(self, source, rows)
+
+
+class _Or(_And):
+    def select(self, source, rows):
+        selected = []
+        remaining = rows
+        for operand in self.operands:
+            # Las filas ya aceptadas no se vuelven a evaluar
+            matched = operand.select(source, remaining)
+            selected.append(matched)
+            remaining = _complement(remaining, matched, source.num_rows)
+            if len(remaining) == 0:
+                break
+        return np.sort(np.concatenate(selected))
+
+
+class _Not(_Node):
+    boolean = True
+    width = 0
+
+    def __init__(self, operand):
+        self.operand = operand
+        self.cost = operand.cost
+        self.fields = operand.fields
+
+    def select(self, source, rows):
+        return _complement(rows, self.operand.select(source, rows), source.num_rows)
+
+    def value(self, source, rows):
+        return ~self.operand.value(source, rows)
+
+
+def _mask_from_select(node, source, rows):
+    """Máscara sobre rows a partir de las filas que selecciona un nodo"""
+    selected = node.select(source, rows)
+    if rows is None:
+        mask = np.zeros(source.num_rows, dtype=bool)
+        mask[selected] = True
+    else:
+        mask = np.zeros(len(rows), dtype=bool)
+        mask[np.searchsorted(rows, selected)] = True
+    return mask
+
+
+class _Compiler:
+    """Traduce el árbol de ast de una expresión a nodos evaluables"""
+
+    def compile(self, node):
+        method = getattr(self, f'_{type(node).__name__}', None)
+        if method is None:
+            raise FilterError(f"Sintaxis no permitida: {ast.unparse(node)}")
+        return method(node)
+
+    def _condition(self, node):
+        """Compila un operando de and/or/not, que debe ser una condición por fila"""
+        compiled = self.compile(node)
+        if not compiled.boolean or compiled.width != 0:
+            raise FilterError(
+                f"'{ast.unparse(node)}' no es una condición por fila "
+                f"(usa comparaciones, y any()/all() para los valores por jugador)"
+            )
+        return compiled
+
+    def _Constant(self, node):
+        if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+            raise FilterError(f"Constante no permitida: {node.value!r}")
+        if isinstance(node.value, int) and abs(node.value) > MAX_ABS_VALUE:
+            raise FilterError(f"Constante fuera de rango: {node.value}")
+        return _Constant(node.value)
+
+    def _Name(self, node):
+        if node.id in SUMMARY_FIELDS:
+            return _SummaryField(node.id)
+        if node.id in MATRIX_FIELDS:
+            return _MatrixField(node.id)
+        raise FilterError(f"Campo desconocido: {node.id}")
+
+    def _Subscript(self, node):
+        field = self.compile(node.value)
+        index = node.slice
+        if isinstance(index, ast.UnaryOp) and isinstance(index.op, ast.USub):
+            raise FilterError("Los índices negativos no están permitidos")
+        if not (isinstance(field, (_SummaryField, _MatrixField)) and field.width
+                and isinstance(index, ast.Constant) and type(index.value) is int):
+            raise FilterError(f"Índice no válido: {ast.unparse(node)} (usa campo[número])")
+        if not 0 <= index.value < field.width:
+            raise FilterError(f"Índice fuera de rango en {ast.unparse(node)} (0-{field.width - 1})")
+        return type(field)(field.name, index.value)
+
+    def _UnaryOp(self, node):
+        if isinstance(node.op, ast.Not):
+            return _Not(self._condition(node.operand))
+        if isinstance(node.op, ast.USub):
+            operand = self.compile(node.operand)
+            if isinstance(operand, _Constant):
+                return _Constant(-operand.constant)
+            return _Operation(np.negative, [operand], operand.width, False)
+        raise FilterError(f"Operador no permitido: {ast.unparse(node)}")
+
+    def _BoolOp(self, node):
+        operands = [self._condition(value) for value in node.values]
+        return (_And if isinstance(node.op, ast.And) else _Or)(operands)
+
+    def _width(self, operands, node):
+        """Ancho común de los operandos de una operación binaria"""
+        widths = {operand.width for operand in operands} - {None, 0}
+        if len(widths) > 1:
+            raise FilterError(f"Tamaños incompatibles en {ast.unparse(node)}")
+        if all(operand.width is None for operand in operands):
+            raise FilterError(f"'{ast.unparse(node)}' no usa ningún campo")
+        return widths.pop() if widths else 0
+
+    def _BinOp(self, node):
+        func = _ARITHMETIC.get(type(node.op))
+        if func is None:
+            raise FilterError(f"Operador no permitido: {ast.unparse(node)}")
+        operands = [self.compile(node.left), self.compile(node.right)]
+        if func in _DIVISIONS and isinstance(operands[1], _Constant) and operands[1].constant == 0:
+            raise FilterError(f"División entre cero en '{ast.unparse(node)}'")
+        return _Arithmetic(func, operands, self._width(operands, node), ast.unparse(node))
+
+    def _Compare(self, node):
+        # a < b < c equivale a (a < b) and (b < c)
+        terms = [self.compile(node.left)] + [self.compile(c) for c in node.comparators]
+        comparisons = []
+        for i, op in enumerate(node.ops):
+            func = _COMPARISONS.get(type(op))
+            if func is None:
+                raise FilterError(f"Comparación no permitida: {ast.unparse(node)}")
+            operands = [terms[i], terms[i + 1]]
+            comparisons.append(_Operation(func, operands, self._width(operands, node), True))
+        if len(comparisons) == 1:
+            return comparisons[0]
+        if any(c.width for c in comparisons):
+            raise FilterError(f"Las comparaciones encadenadas deben ser por fila: {ast.unparse(node)}")
+        return _And(comparisons)
+
+    def _Call(self, node):
+        name = node.func.id if isinstance(node.func, ast.Name) else None
+        if name not in FUNCTIONS:
+            raise FilterError(f"Función no permitida: {ast.unparse(node.func)} "
+                              f"(disponibles: {', '.join(FUNCTIONS)})")
+        if len(node.args) != 1 or node.keywords:
+            raise FilterError(f"{name}() recibe un único argumento")
+        operand = self.compile(node.args[0])
+        if not operand.width:
+            raise FilterError(f"{name}() necesita un campo por jugador o por ficha: {ast.unparse(node)}")
+        return _Operation(FUNCTIONS[name], [operand], 0, name in ('any', 'all'))
+
+
+class StateFilter:
+    """Expresión de filtro compilada, reutilizable sobre varios datasets"""
+
+    def __init__(self, expression):
+        """
+        Compila una expresión
+
+        Args:
+            expression: Texto de la expresión (ver el docstring del módulo)
+
+        Raises:
+            FilterError: Si la expresión no es válida
+        """
+        expression = expression.strip()
+        if not expression:
+            raise FilterError("La expresión está vacía")
+        if len(expression) > MAX_EXPRESSION_LENGTH:
+            raise FilterError(f"La expresión supera {MAX_EXPRESSION_LENGTH} caracteres")
+        try:
+            tree = ast.parse(expression, mode='eval')
+        except SyntaxError as e:
+            raise FilterError(f"Error de sintaxis: {e.msg}") from None
+        self.expression = expression
+        self.root = _Compiler()._condition(tree.body)
+
+    @property
+    def fields(self):
+        """Campos que usa la expresión"""
+        return sorted(self.root.fields)
+
+    @property
+    def needs_matrix(self):
+        """Si la expresión lee campos de la matriz de estados"""
+        return self.root.cost > SUMMARY_COST
+
+    def rows(self, source):
+        """
+        Filas de un dataset que cumplen el filtro
+
+        Args:
+            source: FilterSource del dataset
+
+        Returns:
+            Array int64 ordenado con los índices de fila
+        """
+        return self.root.select(source, None).astype(np.int64, copy=False)
+
+    def mask(self, source):
+        """Máscara booleana (N,) de las filas que cumplen el filtro"""
+        return self.root.value(source, None)
+
+
+def filter_folder(expression, folder=None):
+    """
+    Aplica un filtro a todos los datasets de una carpeta
+
+    Args:
+        expression: Texto de la expresión o StateFilter ya compilado
+        folder: Carpeta de datasets (por defecto CONFIG['data_folder'])
+
+    Returns:
+        Lista de tuplas (nombre del dataset, filas) en orden de nombre,
+        solo con los datasets que tienen alguna coincidencia
+    """
+    state_filter = expression if isinstance(expression, StateFilter) else StateFilter(expression)
+    folder = folder or CONFIG['data_folder']
+    results = []
+    for filename in sorted(f for f in os.listdir(folder) if f.endswith('.npz')):
+        rows = state_filter.rows(FilterSource.open(os.path.join(folder, filename)))
+        if len(rows):
+            results.append((filename, rows))
+    return results
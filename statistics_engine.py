@@ -0,0 +1,272 @@
+# statistics_engine.py
+"""
+Estadísticas generales de un dataset calculadas sobre las secciones columnares
+"""
+
+import numpy as np
+
+from shanten import shanten
+
+# Clasificación de cada entrada de la sección de melds según su cantidad
+MELD_KAN = 4
+MELD_SINGLE = 1
+
+NUM_TILES = 34
+# Cantidades distinguidas en los histogramas de melds (las mayores se agrupan en la última)
+MAX_MELD_AMOUNT = 127
+# Turnos distinguidos en la tasa de tenpai (los posteriores se agrupan en el último)
+MAX_TENPAI_TURN = 20
+
+
+def _first_rank(order_keys, counts):
+    """Orden descendente por conteo; los empates se resuelven por primera aparición"""
+    return np.lexsort((order_keys, -counts))
+
+
+def _positive_entries(section):
+    """
+    Entradas positivas de una sección (N, 4, 34) en orden fila -> jugador -> ficha
+
+    Returns:
+        Tupla (filas, fichas, cantidades) con una posición por entrada
+    """
+    row_size = section.shape[1] * section.shape[2]
+    # flatnonzero sobre la máscara contigua es mucho más rápido que nonzero en 3D
+    positions = np.flatnonzero(section > 0)
+    counts = np.take(section, positions).astype(np.int64)
+    return positions // row_size, positions % section.shape[2], counts
+
+
+def _first_positions(keys, num_keys):
+    """Índice de la primera entrada de cada clave (num_keys si no aparece)"""
+    first = np.full(num_keys, len(keys), dtype=np.int64)
+    np.minimum.at(first, keys, np.arange(len(keys)))
+    return first
+
+
+def _discard_statistics(discards, name_of, top_k):
+    """Histograma de descartes por tipo de ficha y los top_k más descartados"""
+    num_tiles = discards.shape[-1]
+    _, tiles, counts = _positive_entries(discards)
+    per_tile = np.bincount(tiles, weights=counts, minlength=num_tiles).astype(np.int64)
+    total = int(per_tile.sum())
+
+    # Posición de la primera aparición de cada ficha, para desempatar
+    first_seen = _first_positions(tiles, num_tiles)
+    present = np.flatnonzero(per_tile > 0)
+    ranking = present[_first_rank(first_seen[present], per_tile[present])][:top_k]
+    most_discarded = [
+        {
+            'tile': name_of(int(tile)),
+            'count': int(per_tile[tile]),
+            'percentage': round((int(per_tile[tile]) / total) * 100, 2) if total > 0 else 0
+        }
+        for tile in ranking
+    ]
+    return total, most_discarded
+
+
+def _meld_label(count, tile_name):
+    if count == 4:
+        return f"KAN de {tile_name}"
+    if count == 3:
+        return f"PON de {tile_name}"
+    if count == 2:
+        return f"Par de {tile_name}"
+    if count == 1:
+        return f"Ficha {tile_name} en meld"
+    return f"{count}x {tile_name}"
+
+
+def _meld_categories(amounts, present):
+    """Máscaras de las claves de melds de cada categoría (kan, chii y el resto como pon)"""
+    categories = {
+        'kan': present & (amounts == MELD_KAN),
+        'chii': present & (amounts == MELD_SINGLE),
+    }
+    categories['pon'] = present & ~(categories['kan'] | categories['chii'])
+    return categories
+
+
+def _meld_statistics(melds, name_of, top_k, max_matrices):
+    """
+    Clasifica cada (fila, jugador, ficha) con melds según su cantidad
+
+    Returns:
+        Diccionario con totales por categoría y los top_k de cada una
+    """
+    num_tiles = melds.shape[-1]
+    rows, tiles, counts = _positive_entries(melds)
+
+    # Cada combinación (cantidad, ficha) es una clave distinta ("PON de 5-man")
+    num_keys = (int(counts.max()) + 1 if len(counts) else 1) * num_tiles
+    keys = counts * num_tiles + tiles
+    key_counts = np.bincount(keys, minlength=num_keys)
+    first_seen = _first_positions(keys, num_keys)
+    key_amount = np.arange(num_keys) // num_tiles
+
+    result = {}
+    for category, mask in _meld_categories(key_amount, key_counts > 0).items():
+        selected = np.flatnonzero(mask)
+        ranking = selected[_first_rank(first_seen[selected], key_counts[selected])][:top_k]
+        result[category] = {
+            'total': int(key_counts[selected].sum()),
+            'top': [
+                {
+                    'meld': _meld_label(int(key_amount[k]), name_of(int(k % num_tiles))),
+                    'count': int(key_counts[k]),
+                    'matrices': (rows[np.flatnonzero(keys == k)[:max_matrices]] + 1).tolist()
+                }
+                for k in ranking
+            ]
+        }
+    return result
+
+
+def _tenpai_statistics(shanten_values, turns):
+    """
+    Tasa de tenpai y shanten medio por turno del POV
+
+    Args:
+        shanten_values: Shanten de cada fila (N,)
+        turns: Turno del POV en cada fila (N,), empezando en 1
+
+    Returns:
+        Diccionario con la tasa global, la distribución de shanten y la serie por turno
+    """
+    total = len(shanten_values)
+    tenpai = shanten_values <= 0
+    turns = np.minimum(turns, MAX_TENPAI_TURN)
+    states = np.bincount(turns, minlength=MAX_TENPAI_TURN + 1)
+    tenpai_by_turn = np.bincount(turns, weights=tenpai, minlength=MAX_TENPAI_TURN + 1)
+    shanten_by_turn = np.bincount(turns, weights=shanten_values, minlength=MAX_TENPAI_TURN + 1)
+    values, counts = np.unique(shanten_values, return_counts=True)
+    return {
+        'tenpai_states': int(tenpai.sum()),
+        'tenpai_rate': round(float(tenpai.mean()) * 100, 2) if total > 0 else 0,
+        'shanten_distribution': {int(value): int(count) for value, count in zip(values, counts)},
+        'by_turn': [
+            {
+                'turn': turn,
+                'states': int(states[turn]),
+                'tenpai_rate': round(tenpai_by_turn[turn] / states[turn] * 100, 2),
+                'mean_shanten': round(shanten_by_turn[turn] / states[turn], 2)
+            }
+            for turn in np.flatnonzero(states).tolist()
+        ]
+    }
+
+
+def compute_general_statistics(batch, name_of, top_discards=10, top_melds=5, max_matrices=5):
+    """
+    Calcula las estadísticas generales de un dataset
+
+    Args:
+        batch: MahjongBatchParser con las secciones del dataset
+        name_of: Función que convierte el número de ficha en su nombre
+        top_discards: Número de fichas más descartadas a reportar
+        top_melds: Número de melds más comunes por categoría
+        max_matrices: Número de matrices de ejemplo por meld
+
+    Returns:
+        Diccionario con el formato de /api/statistics
+    """
+    total_games = len(batch)
+    total_discards, most_discarded = _discard_statistics(batch.discards, name_of, top_discards)
+    melds = _meld_statistics(batch.melds, name_of, top_melds, max_matrices)
+    total_melds = melds['pon']['total'] + melds['chii']['total'] + melds['kan']['total']
+    # Turno del POV: uno más que las fichas que ya descartó
+    tenpai = _tenpai_statistics(shanten(batch.hand).astype(np.int64), batch.pond_totals[:, 0] + 1)
+
+    return {
+        'total_games': total_games,
+        'total_discards': total_discards,
+        'total_melds': total_melds,
+        'average_discards_per_game': round(total_discards / total_games, 2) if total_games > 0 else 0,
+        'average_melds_per_game': round(total_melds / total_games, 2) if total_games > 0 else 0,
+        'most_discarded_tiles': most_discarded,
+        'most_common_pon': melds['pon']['top'],
+        'most_common_chii': melds['chii']['top'],
+        'most_common_kan': melds['kan']['top'],
+        'meld_distribution': {
+            'pon': melds['pon']['total'],
+            'chii': melds['chii']['total'],
+            'kan': melds['kan']['total']
+        },
+        'tenpai': tenpai
+    }
+
+
+def section_histograms(batch):
+    """
+    Histogramas de descartes y melds de un dataset, sumables entre datasets
+
+    Args:
+        batch: MahjongBatchParser con las secciones del dataset
+
+    Returns:
+        Tupla (descartes por ficha (34,), melds por cantidad y ficha
+        (MAX_MELD_AMOUNT + 1, 34)), ambos int64
+    """
+    _, tiles, counts = _positive_entries(batch.discards)
+    discards = np.bincount(tiles, weights=counts, minlength=NUM_TILES).astype(np.int64)
+
+    _, tiles, counts = _positive_entries(batch.melds)
+    keys = np.minimum(counts, MAX_MELD_AMOUNT) * NUM_TILES + tiles
+    melds = np.bincount(keys, minlength=(MAX_MELD_AMOUNT + 1) * NUM_TILES)
+    return discards, melds.reshape(MAX_MELD_AMOUNT + 1, NUM_TILES).astype(np.int64)
+
+
+def statistics_from_histograms(total_games, discards, melds, name_of, top_melds=5):
+    """
+    Estadísticas agregadas a partir de histogramas sumados (p. ej. de varios datasets)
+
+    A diferencia de compute_general_statistics no hay matrices de ejemplo y los
+    empates se ordenan por ficha.
+
+    Args:
+        total_games: Número total de filas
+        discards: Descartes por ficha (34,)
+        melds: Melds por cantidad y ficha (MAX_MELD_AMOUNT + 1, 34)
+        name_of: Función que convierte el número de ficha en su nombre
+        top_melds: Número de melds más comunes por categoría
+
+    Returns:
+        Diccionario con totales, la distribución completa de descartes y los
+        melds más comunes de cada categoría
+    """
+    total_discards = int(discards.sum())
+    key_counts = melds.ravel()
+    key_amount = np.arange(key_counts.size) // NUM_TILES
+
+    categories = _meld_categories(key_amount, key_counts > 0)
+    totals = {category: int(key_counts[categories[category]].sum()) for category in ('pon', 'chii', 'kan')}
+    total_melds = sum(totals.values())
+
+    result = {
+        'total_games': int(total_games),
+        'total_discards': total_discards,
+        'total_melds': total_melds,
+        'average_discards_per_game': round(total_discards / total_games, 2) if total_games > 0 else 0,
+        'average_melds_per_game': round(total_melds / total_games, 2) if total_games > 0 else 0,
+        'discard_distribution': [
+            {
+                'tile': name_of(int(tile)),
+                'count': int(discards[tile]),
+                'percentage': round((int(discards[tile]) / total_discards) * 100, 2) if total_discards > 0 else 0
+            }
+            for tile in np.argsort(-discards, kind='stable') if discards[tile] > 0
+        ],
+        'meld_distribution': totals
+    }
+    for category in totals:
+        selected = np.flatnonzero(categories[category])
+        ranking = selected[np.argsort(-key_counts[selected], kind='stable')][:top_melds]
+        result[f'most_common_{category}'] = [
+            {
+                'meld': _meld_label(int(key_amount[k]), name_of(int(k % NUM_TILES))),
+                'count': int(key_counts[k])
+            }
+            for k in ranking
+        ]
+    return result
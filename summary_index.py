@@ -0,0 +1,94 @@
+# summary_index.py
+"""
+Índice compacto de resúmenes por fila, persistido junto a cada dataset
+"""
+
+import numpy as np
+
+from shanten import shanten
+from sidecar import load_array, save_array
+
+SUMMARY_INDEX_KIND = 'summary'
+SUMMARY_INDEX_VERSION = 2
+
+# Un registro por fila con los campos del listado y los totales por sección
+SUMMARY_DTYPE = np.dtype([
+    ('round_wind', np.int8),
+    ('dealer', np.int8),
+    ('pov_player', np.int8),
+    ('honba_sticks', np.int8),
+    ('riichi_sticks', np.int8),
+    ('wall_tiles', np.int8),
+    ('round_number', np.int8),
+    ('step_number', np.int8),
+    ('active_dora', np.int8),          # -1 si no hay indicador de dora
+    ('hand_tiles', np.int16),
+    ('hand_unique', np.int16),
+    ('shanten', np.int8),              # mano del POV; -1 si está completa
+    ('melds_totals', np.int16, (4,)),
+    ('discards_totals', np.int16, (4,)),
+    ('pond_totals', np.int16, (4,)),
+])
+
+
+def _assign(index, field, values):
+    """Copia una columna en un campo del índice comprobando que sus valores caben en él"""
+    values = np.asarray(values)
+    target = SUMMARY_DTYPE[field].base
+    # Con la copia densa int8 los valores siempre caben; con la matriz
+    # dispersa en su tipo original se comprueba el rango en lugar de truncar
+    if values.size and not np.can_cast(values.dtype, target):
+        info = np.iinfo(target)
+        low, high = values.min(), values.max()
+        if low < info.min or high > info.max:
+            raise ValueError(f"Los valores de {field} ({low} a {high}) no caben en {target}")
+    index[field] = values
+
+
+def build_summary_index(batch):
+    """
+    Construye el índice de resúmenes a partir de un MahjongBatchParser
+
+    Returns:
+        Array estructurado de forma (N,) con dtype SUMMARY_DTYPE
+
+    Raises:
+        ValueError: Si algún valor no cabe en el tipo de su campo
+    """
+    index = np.zeros(len(batch), dtype=SUMMARY_DTYPE)
+    for field in ('round_wind', 'dealer', 'pov_player', 'honba_sticks', 'riichi_sticks',
+                  'wall_tiles', 'round_number', 'step_number'):
+        _assign(index, field, getattr(batch, field))
+
+    is_dora = batch.dora == 1
+    index['active_dora'] = np.where(is_dora.any(axis=1), is_dora.argmax(axis=1), -1)
+    _assign(index, 'hand_tiles', batch.hand_totals)
+    _assign(index, 'hand_unique', batch.hand_unique)
+    _assign(index, 'shanten', shanten(batch.hand))
+    _assign(index, 'melds_totals', batch.melds_totals)
+    _assign(index, 'discards_totals', batch.discards_totals)
+    _assign(index, 'pond_totals', batch.pond_totals)
+    return index
+
+
+def load_summary_index(filepath, build):
+    """
+    Carga el índice de resúmenes de un dataset, reconstruyéndolo si no está al día
+
+    El índice se guarda como <dataset>.summary.npy y se abre mapeado en
+    memoria, así que abrir un dataset ya visto no requiere parsear sus filas.
+
+    Args:
+        filepath: Ruta al archivo .npz
+        build: Función sin argumentos que retorna el índice (build_summary_index)
+
+    Returns:
+        Array estructurado con dtype SUMMARY_DTYPE
+    """
+    index = load_array(filepath, SUMMARY_INDEX_KIND, SUMMARY_INDEX_VERSION)
+    if index is not None and index.dtype == SUMMARY_DTYPE:
+        return index
+
+    index = build()
+    save_array(filepath, SUMMARY_INDEX_KIND, SUMMARY_INDEX_VERSION, index)
+    return index
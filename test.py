@@ -1,11 +1,9 @@
+# Exportación en paralelo y sin ventanas (fija el backend Agg de matplotlib)
+from exportar_heatmaps import export_jobs, plan_exports
+
 import numpy as np
 np.random.seed(seed=69)
 
-import seaborn as sns
-
-# How to import necessary code
-from maps import generate_mahjong_heatmap
-
 # Cargar la matriz modificada desde heatmap.py
 try:
     mock_matrix = np.load('modified_matrix.npy')
@@ -32,32 +30,25 @@ except FileNotFoundError:
         dtype=np.int8)
 
 # Generar heatmaps para cada matriz individual
-print(f"Matriz total cargada con dimensiones: {mock_matrix.shape}")
-print(f"Total de matrices individuales: {mock_matrix.shape[0]}")
+if __name__ == "__main__":
+    print(f"Matriz total cargada con dimensiones: {mock_matrix.shape}")
+    print(f"Total de matrices individuales: {mock_matrix.shape[0]}")
 
-# Configurar cuántas matrices procesar (cambia este número según necesites)
-num_matrices_to_process = 5  # Procesar solo las primeras 5 para prueba rápida
-# Para procesar todas, usa: num_matrices_to_process = mock_matrix.shape[0]
+    # Configurar cuántas matrices procesar (cambia este número según necesites)
+    num_matrices_to_process = 5  # Procesar solo las primeras 5 para prueba rápida
+    # Para procesar todas, usa: num_matrices_to_process = mock_matrix.shape[0]
 
-print(f"Generando heatmaps para las primeras {num_matrices_to_process} matrices...")
+    print(f"Generando heatmaps para las primeras {num_matrices_to_process} matrices...")
 
-for i in range(min(num_matrices_to_process, len(mock_matrix))):
-    # Obtener la fila individual y reformatearla a matriz 2D (15x34)
-    single_row = mock_matrix[i]  # Obtener fila individual (510 elementos)
-    single_matrix = single_row.reshape(15, 34)  # Reformatear a matriz 2D de 15x34
-    
-    print(f"Procesando matriz {i+1}: forma {single_matrix.shape}")
-    
+    # Se regeneran siempre (force) para que la prueba ejercite el renderizador,
+    # aunque los PNG ya existan en resources/ (mahjong_board_<n>_black.png)
+    jobs, skipped = plan_exports(
+        mock_matrix[:, :510], "./resources", slice(0, num_matrices_to_process), force=True
+    )
     try:
-        generate_mahjong_heatmap(
-            input_matrix=single_matrix,
-            title="",  # Título eliminado
-            output_path=f"./resources/mahjong_board_{i+1}_black"
-        )
-        print(f"  ✓ Heatmap negro generado para matriz {i+1}")
+        exported, elapsed = export_jobs(jobs)
+        print(f"  ✓ {exported} heatmaps generados ({skipped} ya existían)")
     except Exception as e:
-        print(f"  ✗ Error generando heatmap para matriz {i+1}: {e}")
-    
-    print(f"Matriz {i+1}/{min(num_matrices_to_process, len(mock_matrix))} completada")
+        print(f"  ✗ Error generando heatmaps: {e}")
 
-print("¡Proceso completado!")
+    print("¡Proceso completado!")
@@ -0,0 +1,306 @@
+# ukeire.py
+"""
+Ukeire de la mano del POV calculado para todas las filas de un dataset
+
+Para cada estado se buscan las fichas cuya robada baja el shanten de la
+mano (tras el mejor descarte si tiene 3k+2 fichas) y cuántas copias de
+ellas quedan sin ver según la mano, los descartes, los melds y los
+indicadores de dora del vector. Al robar una ficha solo cambia la consulta
+de su palo en las tablas de shanten.py, así que el resto de la mano se
+combina una vez por fila y las 34 robadas se evalúan con una consulta más
+por palo.
+"""
+
+import numpy as np
+
+from shanten import (
+    HONOR_WEIGHTS, MAX_COUNT, MAX_MELDS, SUIT_WEIGHTS, SUITS, TERMINALS_AND_HONORS, UNREACHABLE,
+    as_hands, combine_parts, load_tables, shanten
+)
+from sidecar import load_array, save_array
+
+UKEIRE_INDEX_KIND = 'ukeire'
+UKEIRE_INDEX_VERSION = 1
+
+NUM_TILES = 34
+# Filas evaluadas a la vez (acota la memoria de las opciones de descarte)
+BLOCK_ROWS = 4096
+
+IS_TERMINAL_OR_HONOR = np.zeros(NUM_TILES, dtype=bool)
+IS_TERMINAL_OR_HONOR[TERMINALS_AND_HONORS] = True
+
+# Un registro por fila con el mejor descarte y sus fichas aceptadas
+UKEIRE_DTYPE = np.dtype([
+    ('discard', np.int8),              # -1 si la mano no tiene que descartar
+    ('shanten', np.int8),              # tras el descarte
+    ('tile_types', np.int8),           # tipos de ficha que mejoran la mano
+    ('tiles', np.int16),               # copias sin ver de esos tipos
+    ('accepted', np.bool_, (NUM_TILES,)),
+])
+
+
+def visible_tiles(discards, melds, dora):
+    """
+    Copias de cada ficha visibles en la mesa (fuera de la mano del POV)
+
+    Se suman los descartes y los melds de los cuatro jugadores y los
+    indicadores de dora. El pond no se usa: las fichas cantadas siguen en
+    el pond de quien las descartó y también aparecen en el meld.
+
+    Args:
+        discards: Array (N, 4, 34) o (4, 34) de descartes por jugador
+        melds: Array (N, 4, 34) o (4, 34) de melds por jugador
+        dora: Array (N, 34) o (34,) de indicadores de dora
+
+    Returns:
+        Array int16 de forma (N, 34) o (34,)
+    """
+    return (np.sum(discards, axis=-2, dtype=np.int16)
+            + np.sum(melds, axis=-2, dtype=np.int16)
+            + np.asarray(dora, dtype=np.int16))
+
+
+def unseen_tiles(hands, visible):
+    """Copias sin ver de cada ficha: 4 menos las de la mano y las visibles"""
+    return np.clip(MAX_COUNT - as_hands(hands) - np.asarray(visible), 0, MAX_COUNT).astype(np.int8)
+
+
+def _draw_regular_shanten(hands):
+    """
+    Shanten de la forma normal tras robar cada una de las 34 fichas
+
+    Args:
+        hands: Array int8 (N, 34)
+
+    Returns:
+        Array int16 (N, 34); las fichas de las que ya hay 4 copias en la
+        mano quedan con un valor inalcanzable
+    """
+    suit_table, honor_table = load_tables()
+    num_rows = len(hands)
+    parts = []
+    lookups = []
+    for columns, sequences in SUITS:
+        table, weights = (suit_table, SUIT_WEIGHTS) if sequences else (honor_table, HONOR_WEIGHTS)
+        index = hands[:, columns].astype(np.int32) @ weights.astype(np.int32)
+        parts.append(np.take(table, index, axis=2).astype(np.int16))
+        lookups.append((table, weights.astype(np.int32), index))
+
+    # Resto de la mano sin cada palo (6 combinaciones en lugar de 12)
+    first = combine_parts(parts[0], parts[1])
+    second = combine_parts(parts[2], parts[3])
+    rests = (
+        combine_parts(parts[1], second),
+        combine_parts(parts[0], second),
+        combine_parts(first, parts[3]),
+        combine_parts(first, parts[2]),
+    )
+
+    melds = np.minimum((hands.sum(axis=1, dtype=np.int32) + 1) // 3, MAX_MELDS)
+    rows = np.arange(num_rows)
+    result = np.empty((num_rows, NUM_TILES), dtype=np.int16)
+    for (columns, _), (table, weights, index), rest in zip(SUITS, lookups, rests):
+        full = hands[:, columns] >= MAX_COUNT
+        # Índice del palo con una copia más de cada ficha: (2, 5, N, tamaño)
+        drawn = np.take(table, index[:, None] + np.where(full, 0, weights), axis=2).astype(np.int16)
+        best = np.full(full.shape, UNREACHABLE, dtype=np.int16)
+        for pair in (0, 1):
+            for meld_count in range(MAX_MELDS + 1):
+                other = melds - meld_count
+                needed = np.where(
+                    other >= 0, rest[1 - pair, np.maximum(other, 0), rows], UNREACHABLE
+                )
+                np.minimum(best, drawn[pair, meld_count] + needed[:, None], out=best)
+        best[full] = UNREACHABLE
+        result[:, columns] = best
+    return result - 1
+
+
+def draw_shanten(hands):
+    """
+    Shanten tras robar cada ficha (forma normal, siete parejas y trece huérfanos)
+
+    Coincide con shanten(hand + ficha) para cada una de las 34 fichas.
+
+    Args:
+        hands: Array (N, 34) o (34,) de conteos
+
+    Returns:
+        Array int16 (N, 34); UNREACHABLE en las fichas de las que ya hay 4
+        copias en la mano
+    """
+    hands = as_hands(hands)
+    result = _draw_regular_shanten(hands)
+    closed = hands.sum(axis=1, dtype=np.int32) + 1 >= 13
+    if closed.any():
+        # Sin melds cantados en todo el bloque se evita copiar con la máscara
+        counts = hands if closed.all() else hands[closed]
+        new_kind = counts == 0
+        new_pair = counts == 1
+        pairs = np.count_nonzero(counts >= 2, axis=1).astype(np.int16)[:, None] + new_pair
+        kinds = np.count_nonzero(counts >= 1, axis=1).astype(np.int16)[:, None] + new_kind
+        special = 6 - pairs + np.maximum(0, 7 - kinds)
+
+        terminals = counts[:, TERMINALS_AND_HONORS]
+        terminal_kinds = (np.count_nonzero(terminals >= 1, axis=1).astype(np.int16)[:, None]
+                          + (new_kind & IS_TERMINAL_OR_HONOR))
+        terminal_pair = (terminals >= 2).any(axis=1)[:, None] | (new_pair & IS_TERMINAL_OR_HONOR)
+        np.minimum(special, 13 - terminal_kinds - terminal_pair, out=special)
+
+        if counts is hands:
+            np.minimum(result, special, out=result)
+        else:
+            result[closed] = np.minimum(result[closed], special)
+    result[hands >= MAX_COUNT] = UNREACHABLE
+    return result
+
+
+def _acceptance(hands, unseen):
+    """
+    Shanten, fichas que lo bajan y copias sin ver de ellas (manos sin descartar)
+
+    Returns:
+        Tupla (shanten (N,), aceptadas bool (N, 34), copias sin ver (N,))
+    """
+    current = shanten(hands)
+    accepted = draw_shanten(hands) < current[:, None]
+    tiles = np.where(accepted, unseen, 0).sum(axis=1, dtype=np.int32)
+    return current, accepted, tiles
+
+
+def _discard_options(hands):
+    """
+    Manos resultantes de cada descarte posible (un tipo de ficha por opción)
+
+    Returns:
+        Tupla (fila de origen, ficha descartada, manos (K, 34))
+    """
+    rows, tiles = np.nonzero(hands > 0)
+    after = hands[rows]
+    after[np.arange(len(rows)), tiles] -= 1
+    return rows, tiles, after
+
+
+def _best_options(rows, shanten_values, tiles, discards):
+    """Posición de la mejor opción de cada fila: menor shanten, más copias, ficha más baja"""
+    order = np.lexsort((discards, -tiles, shanten_values, rows))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = rows[order[1:]] != rows[order[:-1]]
+    return order[first]
+
+
+def _fill_block(records, hands, unseen):
+    """Calcula los registros de un bloque de filas"""
+    must_discard = hands.sum(axis=1, dtype=np.int32) % 3 == 2
+
+    drawing = np.flatnonzero(~must_discard)
+    if len(drawing):
+        current, accepted, tiles = _acceptance(hands[drawing], unseen[drawing])
+        records['shanten'][drawing] = current
+        records['accepted'][drawing] = accepted
+        records['tiles'][drawing] = tiles
+
+    discarding = np.flatnonzero(must_discard)
+    if len(discarding):
+        rows, discards, after = _discard_options(hands[discarding])
+        # Solo los descartes que mantienen el shanten mínimo pueden ser los mejores
+        after_shanten = shanten(after)
+        minimum = np.full(len(discarding), UNREACHABLE, dtype=np.int8)
+        np.minimum.at(minimum, rows, after_shanten)
+        keep = after_shanten == minimum[rows]
+        rows, discards, after = rows[keep], discards[keep], after[keep]
+
+        current, accepted, tiles = _acceptance(after, unseen[discarding][rows])
+        best = _best_options(rows, current, tiles, discards)
+        target = discarding[rows[best]]
+        records['discard'][target] = discards[best]
+        records['shanten'][target] = current[best]
+        records['accepted'][target] = accepted[best]
+        records['tiles'][target] = tiles[best]
+
+    records['tile_types'] = np.count_nonzero(records['accepted'], axis=1)
+
+
+def compute_ukeire(hands, visible):
+    """
+    Mejor descarte y ukeire de cada mano
+
+    Args:
+        hands: Array (N, 34) de conteos de la mano del POV
+        visible: Array (N, 34) de copias visibles fuera de la mano (visible_tiles)
+
+    Returns:
+        Array estructurado de forma (N,) con dtype UKEIRE_DTYPE
+    """
+    hands = as_hands(hands)
+    unseen = unseen_tiles(hands, visible)
+    records = np.zeros(len(hands), dtype=UKEIRE_DTYPE)
+    records['discard'] = -1
+    for start in range(0, len(hands), BLOCK_ROWS):
+        stop = start + BLOCK_ROWS
+        _fill_block(records[start:stop], hands[start:stop], unseen[start:stop])
+    return records
+
+
+def build_ukeire_index(batch):
+    """Registros de ukeire de todas las filas de un MahjongBatchParser"""
+    return compute_ukeire(batch.hand, visible_tiles(batch.discards, batch.melds, batch.dora))
+
+
+def load_ukeire_index(filepath, build):
+    """
+    Carga el ukeire de un dataset, recalculándolo si no está al día
+
+    Se guarda como <dataset>.ukeire.npy junto al índice de resúmenes.
+
+    Args:
+        filepath: Ruta al archivo .npz
+        build: Función sin argumentos que retorna los registros (build_ukeire_index)
+
+    Returns:
+        Array estructurado con dtype UKEIRE_DTYPE
+    """
+    index = load_array(filepath, UKEIRE_INDEX_KIND, UKEIRE_INDEX_VERSION)
+    if index is not None and index.dtype == UKEIRE_DTYPE:
+        return index
+
+    index = build()
+    save_array(filepath, UKEIRE_INDEX_KIND, UKEIRE_INDEX_VERSION, index)
+    return index
+
+
+def ukeire_detail(hand, visible):
+    """
+    Ukeire de una mano para cada descarte posible
+
+    Args:
+        hand: Vector de 34 conteos
+        visible: Vector de 34 copias visibles fuera de la mano
+
+    Returns:
+        Lista de diccionarios (descarte, shanten, fichas aceptadas con sus
+        copias sin ver y total), de la mejor opción a la peor; si la mano
+        no tiene que descartar, una sola opción con descarte None
+    """
+    hands = as_hands(hand)
+    unseen = unseen_tiles(hands, np.asarray(visible)[None])
+    if int(hands.sum(dtype=np.int32)) % 3 == 2:
+        rows, discards, after = _discard_options(hands)
+        unseen = unseen[rows]
+    else:
+        discards, after = np.array([-1]), hands
+
+    current, accepted, tiles = _acceptance(after, unseen)
+    order = np.lexsort((discards, -tiles, current))
+    options = []
+    for i in order:
+        accepted_tiles = np.flatnonzero(accepted[i])
+        options.append({
+            'discard': int(discards[i]) if discards[i] >= 0 else None,
+            'shanten': int(current[i]),
+            'tiles': int(tiles[i]),
+            'accepted': [
+                {'type': int(tile), 'unseen': int(unseen[i, tile])} for tile in accepted_tiles
+            ]
+        })
+    return options
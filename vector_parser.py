@@ -3,12 +3,48 @@
 Utilidades para parsear vectores de estado de Mahjong
 """
 
+from collections.abc import Sequence
+
 import numpy as np
 from config import INDICES, LABELS, SYMBOLS
 
+# Secciones de un estado parseado
+SECTIONS = ('metadata', 'control', 'dora', 'hand', 'melds', 'discards', 'pond')
+
+
+class _lazy_section:
+    """Sección que se calcula en el primer acceso y se memoriza en el slot ``_<nombre>``
+
+    Equivalente a functools.cached_property para clases con ``__slots__``.
+    """
+
+    def __init__(self, compute):
+        self.compute = compute
+
+    def __set_name__(self, owner, name):
+        self.slot = owner.__dict__['_' + name]
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        try:
+            return self.slot.__get__(obj, objtype)
+        except AttributeError:
+            value = self.compute(obj)
+            self.slot.__set__(obj, value)
+            return value
+
+
 class MahjongVectorParser:
-    """Clase para parsear vectores de estado de Mahjong"""
-    
+    """Clase para parsear vectores de estado de Mahjong
+
+    Cada sección (metadata, control, dora, hand, melds, discards, pond) se
+    parsea la primera vez que se accede a ella, así que quien solo lee la
+    metadata no paga el parseo de las fichas.
+    """
+
+    __slots__ = ('vector',) + tuple('_' + name for name in SECTIONS)
+
     def __init__(self, vector):
         """
         Inicializa el parser con un vector de estado
@@ -17,13 +53,6 @@ class MahjongVectorParser:
             vector: Array numpy de 510 elementos representando el estado
         """
         self.vector = vector
-        self.metadata = self._parse_metadata()
-        self.control = self._parse_control()
-        self.dora = self._parse_dora()
-        self.hand = self._parse_hand()
-        self.melds = self._parse_melds()
-        self.discards = self._parse_discards()
-        self.pond = self._parse_pond()
     
     def _parse_metadata(self):
         """Parsea la sección de metadata"""
@@ -104,6 +133,14 @@ class MahjongVectorParser:
                 'total': np.sum(player_pond)
             }
         return pond
+
+    metadata = _lazy_section(_parse_metadata)
+    control = _lazy_section(_parse_control)
+    dora = _lazy_section(_parse_dora)
+    hand = _lazy_section(_parse_hand)
+    melds = _lazy_section(_parse_melds)
+    discards = _lazy_section(_parse_discards)
+    pond = _lazy_section(_parse_pond)
     
     def get_summary(self):
         """Retorna un resumen del estado parseado"""
@@ -120,6 +157,254 @@ class MahjongVectorParser:
             'melds_detail': {i: data['tiles'] for i, data in self.melds.items()}
         }
 
+def _tiles_from_counts(counts):
+    """Convierte un vector de 34 conteos en lista de tuplas (tipo, cantidad) no nulas"""
+    tile_types = np.flatnonzero(counts > 0)
+    return list(zip(tile_types.tolist(), counts[tile_types].tolist()))
+
+
+class MahjongBatchParser:
+    """Parser columnar para todas las filas de una matriz de estados de Mahjong
+
+    Cada sección se expone como un array de NumPy que abarca todas las filas:
+    ``hand`` y ``dora`` tienen forma (N, 34) y ``melds``, ``discards`` y
+    ``pond`` tienen forma (N, 4, 34). Con una matriz densa los arrays de
+    sección son vistas sobre ella; con un almacén disperso cada sección se
+    densifica por separado.
+    """
+
+    def __init__(self, matrix):
+        """
+        Inicializa el parser con la matriz completa
+
+        Args:
+            matrix: Array numpy de forma (N, 510) con un estado por fila, o un
+                almacén con método ``section(start, end)`` (p. ej.
+                matrix_loader.SparseMatrixStore)
+        """
+        if isinstance(matrix, np.memmap):
+            # Misma memoria mapeada sin el coste de la subclase al indexar
+            matrix = matrix.view(np.ndarray)
+        self.matrix = matrix
+        self.num_rows = matrix.shape[0]
+
+        # Metadata y control técnico
+        meta = self._section(INDICES['METADATA_START'], INDICES['DORA_START'])
+        self.round_wind = meta[:, INDICES['ROUND_WIND']]
+        self.dealer = meta[:, INDICES['DEALER']]
+        self.pov_player = meta[:, INDICES['POV_PLAYER']]
+        self.honba_sticks = meta[:, INDICES['HONBA_STICKS']]
+        self.riichi_sticks = meta[:, INDICES['RIICHI_STICKS']]
+        self.wall_tiles = meta[:, INDICES['WALL_TILES']]
+        self.scores = meta[:, INDICES['SCORES_START']:INDICES['SCORES_START'] + 4]
+        self.riichi_status = meta[:, INDICES['RIICHI_STATUS_START']:INDICES['RIICHI_STATUS_END'] + 1]
+        self.round_number = meta[:, INDICES['ROUND_NUMBER']]
+        self.step_number = meta[:, INDICES['STEP_NUMBER']]
+
+        # Secciones de fichas
+        self.dora = self._section(INDICES['DORA_START'], INDICES['DORA_END'] + 1)
+        self.hand = self._section(INDICES['HAND_START'], INDICES['HAND_END'] + 1)
+        self.melds = self._player_section(INDICES['MELDS_START'], INDICES['MELDS_SIZE'])
+        self.discards = self._player_section(INDICES['DISCARDS_START'], INDICES['DISCARDS_SIZE'])
+        self.pond = self._player_section(INDICES['POND_START'], INDICES['POND_SIZE'])
+
+        # Totales por fila (y por jugador en las secciones de 4 jugadores)
+        self.hand_totals = self.hand.sum(axis=1, dtype=np.int64)
+        self.hand_unique = np.count_nonzero(self.hand > 0, axis=1)
+        self.melds_totals = self.melds.sum(axis=2, dtype=np.int64)
+        self.discards_totals = self.discards.sum(axis=2, dtype=np.int64)
+        self.pond_totals = self.pond.sum(axis=2, dtype=np.int64)
+
+    def _section(self, start, end):
+        """Retorna las columnas [start, end) de todas las filas"""
+        if hasattr(self.matrix, 'section'):
+            return self.matrix.section(start, end)
+        return self.matrix[:, start:end]
+
+    def _player_section(self, start, size):
+        """Retorna una sección de 4 jugadores con forma (N, 4, size)"""
+        return self._section(start, start + 4 * size).reshape(self.num_rows, 4, size)
+
+    def tile_planes(self):
+        """
+        Secciones de fichas (mano, melds, descartes y pond) como un único array
+
+        Las cuatro secciones son columnas contiguas del vector, así que con una
+        matriz densa el resultado es una vista.
+
+        Returns:
+            Array de forma (N, 13, 34): plano 0 la mano, 1-4 melds, 5-8
+            descartes y 9-12 pond (un plano por jugador)
+        """
+        planes = self._section(INDICES['HAND_START'], INDICES['POND_END'] + 1)
+        return planes.reshape(self.num_rows, -1, INDICES['POND_SIZE'])
+
+    def __len__(self):
+        return self.num_rows
+
+    @property
+    def nbytes(self):
+        """Memoria de los arrays del parser (las vistas comparten base y cuentan una vez)"""
+        bases = {}
+        for value in vars(self).values():
+            if isinstance(value, np.ndarray):
+                base = value if value.base is None else value.base
+                # Las vistas sobre una matriz mapeada (sin datos propios) no
+                # ocupan memoria del proceso
+                if isinstance(base, np.ndarray) and base.flags.owndata:
+                    bases[id(base)] = base.nbytes
+        return sum(bases.values())
+
+    def row(self, index):
+        """Retorna una vista perezosa con la API de diccionarios de una fila"""
+        if index < 0:
+            index += self.num_rows
+        if not 0 <= index < self.num_rows:
+            raise IndexError(f"Fila {index} fuera de rango")
+        return ParsedRowView(self, index)
+
+
+class ParsedRowView:
+    """Vista de una fila de MahjongBatchParser compatible con MahjongVectorParser
+
+    Cada sección se construye al accederla a partir de los arrays del parser
+    por lotes y no se memoriza: la vista solo guarda el parser y el índice,
+    así que mantener una por fila cuesta unas decenas de bytes.
+    """
+
+    __slots__ = ('batch', 'index')
+
+    def __init__(self, batch, index):
+        self.batch = batch
+        self.index = index
+
+    @property
+    def vector(self):
+        return self.batch.matrix[self.index]
+
+    @property
+    def board(self):
+        """Estado como tablero 15x34 (vista sobre la matriz si es densa)"""
+        return self.vector.reshape(15, 34)
+
+    @property
+    def metadata(self):
+        b, i = self.batch, self.index
+        return {
+            'round_wind': int(b.round_wind[i]),
+            'dealer': int(b.dealer[i]),
+            'pov_player': int(b.pov_player[i]),
+            'honba_sticks': int(b.honba_sticks[i]),
+            'riichi_sticks': int(b.riichi_sticks[i]),
+            'wall_tiles': int(b.wall_tiles[i]),
+            'scores': b.scores[i].tolist(),
+            'riichi_status': b.riichi_status[i].tolist()
+        }
+
+    @property
+    def control(self):
+        b, i = self.batch, self.index
+        return {
+            'round_number': int(b.round_number[i]),
+            'step_number': int(b.step_number[i])
+        }
+
+    @property
+    def dora(self):
+        dora_indices = np.flatnonzero(self.batch.dora[self.index] == 1).tolist()
+        return {
+            'active_dora': dora_indices[0] if dora_indices else None,
+            'all_dora': dora_indices
+        }
+
+    @property
+    def hand(self):
+        b, i = self.batch, self.index
+        return {
+            'tiles': _tiles_from_counts(b.hand[i]),
+            'total_tiles': int(b.hand_totals[i]),
+            'unique_types': int(b.hand_unique[i])
+        }
+
+    def _players(self, section, totals):
+        counts = section[self.index]
+        players, tiles = np.nonzero(counts > 0)
+        per_player = {player: [] for player in range(4)}
+        for player, tile, count in zip(players.tolist(), tiles.tolist(), counts[players, tiles].tolist()):
+            per_player[player].append((tile, count))
+        player_totals = totals[self.index].tolist()
+        return {
+            player: {'tiles': per_player[player], 'total': player_totals[player]}
+            for player in range(4)
+        }
+
+    @property
+    def melds(self):
+        return self._players(self.batch.melds, self.batch.melds_totals)
+
+    @property
+    def discards(self):
+        return self._players(self.batch.discards, self.batch.discards_totals)
+
+    @property
+    def pond(self):
+        return self._players(self.batch.pond, self.batch.pond_totals)
+
+    def get_summary(self):
+        """Retorna un resumen del estado con el mismo formato que MahjongVectorParser"""
+        return MahjongVectorParser.get_summary(self)
+
+
+class LazyRowSequence(Sequence):
+    """Secuencia de tamaño fijo cuyos elementos se construyen y memorizan al accederlos"""
+
+    def __init__(self, length, factory):
+        """
+        Args:
+            length: Número de elementos
+            factory: Función que recibe el índice y construye el elemento
+        """
+        self._length = length
+        self._factory = factory
+        self._items = {}
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError(f"Índice {index} fuera de rango")
+        item = self._items.get(index)
+        if item is None:
+            item = self._items[index] = self._factory(index)
+        return item
+
+
+class MappedSequence(Sequence):
+    """Secuencia que aplica una función a cada elemento de otra al accederlo, sin guardar el resultado"""
+
+    def __init__(self, source, func):
+        """
+        Args:
+            source: Secuencia de origen
+            func: Función que recibe un elemento de source y retorna el valor
+        """
+        self._source = source
+        self._func = func
+
+    def __len__(self):
+        return len(self._source)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._func(item) for item in self._source[index]]
+        return self._func(self._source[index])
+
+
 def tiles_to_string(tiles_list, max_show=None):
     """
     Convierte una lista de (tipo, cantidad) a string legible